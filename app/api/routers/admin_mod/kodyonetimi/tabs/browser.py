@@ -0,0 +1,106 @@
+# app/api/routers/admin_mod/kodyonetimi/tabs/browser.py
+from typing import List
+from urllib.parse import urlencode
+
+from sqlalchemy.orm import Session
+
+from app.db.models import Prize
+from app.services import code_browser, exports
+from app.api.routers.admin_mod.kodyonetimi.helpers import _e as _esc, _tiers
+
+FILTERS = ("prefix", "username", "tier", "status", "since", "until")
+STATUS_LABELS = {"issued": "Verildi", "used": "Kullanıldı", "expired": "Süresi doldu"}
+
+
+def render_browser(db: Session, request_query_params) -> str:
+    """Kod tarayıcısı: filtreler + keyset sayfalama (Sonraki → imleçle; toplam adet yok)."""
+    q = {k: (request_query_params.get(k) or "").strip() for k in FILTERS}
+    try:
+        limit = int(request_query_params.get("limit") or code_browser.PAGE_SIZE)
+    except ValueError:
+        limit = code_browser.PAGE_SIZE
+    all_tiers = _tiers(db)
+    tier_label_by_key = {t.key: t.label for t in all_tiers}
+    prize_label_by_id = dict(db.query(Prize.id, Prize.label).all())
+
+    def opt(value: str, label: str, current: str) -> str:
+        sel = " selected" if value == current else ""
+        return f"<option value='{_esc(value)}'{sel}>{_esc(label)}</option>"
+
+    parts: List[str] = [
+        "<div class='card'>",
+        "<h1>Kod Ara</h1>",
+        "<form method='get' action='/admin/kod-yonetimi'>",
+        "<input type='hidden' name='tab' value='ara'>",
+        "<div class='grid'>",
+        f"<label class='field span-6'><span>Kod öneki</span><input name='prefix' value='{_esc(q['prefix'])}' placeholder='ör. AB12'></label>",
+        f"<label class='field span-6'><span>Kullanıcı (içinde geçen)</span><input name='username' value='{_esc(q['username'])}'></label>",
+        "<label class='field span-6'><span>Seviye</span><select name='tier'>",
+        opt("", "Tümü", q["tier"]),
+        *[opt(t.key, t.label, q["tier"]) for t in all_tiers],
+        "</select></label>",
+        "<label class='field span-6'><span>Durum</span><select name='status'>",
+        opt("", "Tümü", q["status"]),
+        *[opt(k, v, q["status"]) for k, v in STATUS_LABELS.items()],
+        "</select></label>",
+        f"<label class='field span-6'><span>Başlangıç (oluşturma, UTC)</span><input type='date' name='since' value='{_esc(q['since'])}'></label>",
+        f"<label class='field span-6'><span>Bitiş (dahil)</span><input type='date' name='until' value='{_esc(q['until'])}'></label>",
+        "</div>",
+        "<div class='formActions' style='display:flex;gap:8px;justify-content:flex-end;margin-top:10px'>",
+        "<a class='btn' href='/admin/kod-yonetimi?tab=ara'>Temizle</a>",
+        "<button class='btn primary' type='submit'>Ara</button>",
+        "</div>",
+        "</form>",
+        "</div>",
+    ]
+
+    try:
+        f = exports.parse_filter(q)
+    except exports.ExportError as e:
+        parts.append(f"<div class='card'><b style='color:#ff4d6d'>{_esc(str(e))}</b></div>")
+        return "".join(parts)
+
+    result = code_browser.page(db, f, request_query_params.get("cursor"), limit)
+    active = {k: v for k, v in q.items() if v}
+
+    parts += [
+        "<div class='card'>",
+        "<div class='table-wrap'>",
+        "<table>",
+        "<tr><th>Kod</th><th>Kullanıcı</th><th>Seviye</th><th>Durum</th><th>Kazanan</th>"
+        "<th>Oluşturma</th><th>Son Geçerlilik</th></tr>",
+    ]
+    for c in result.rows:
+        parts.append(
+            "<tr>"
+            f"<td><code>{_esc(c.code)}</code></td>"
+            f"<td>{_esc(c.username or '-')}</td>"
+            f"<td>{_esc(tier_label_by_key.get(c.tier_key, c.tier_key or '-'))}</td>"
+            f"<td>{_esc(STATUS_LABELS.get(c.status, c.status or '-'))}</td>"
+            f"<td>{_esc(prize_label_by_id.get(c.prize_id, '-'))}</td>"
+            f"<td>{c.created_at.strftime('%d.%m.%Y %H:%M') if c.created_at else '-'}</td>"
+            f"<td>{c.expires_at.strftime('%d.%m.%Y %H:%M') if c.expires_at else '-'}</td>"
+            "</tr>"
+        )
+    if not result.rows:
+        parts.append("<tr><td colspan='7' class='muted'>Kayıt yok.</td></tr>")
+    parts.append("</table></div>")
+
+    base = {"tab": "ara", **active}
+    if limit != code_browser.PAGE_SIZE:
+        base["limit"] = limit
+    nav = []
+    if request_query_params.get("cursor"):
+        nav.append(f"<a class='btn' href='/admin/kod-yonetimi?{_esc(urlencode(base))}'>İlk sayfa</a>")
+    if result.next_cursor:
+        nav.append(f"<a class='btn' href='/admin/kod-yonetimi?{_esc(urlencode({**base, 'cursor': result.next_cursor}))}'>Sonraki →</a>")
+    nav.append(f"<a class='btn' href='/admin/kod-yonetimi/export/codes?{_esc(urlencode(active))}'>Bu filtreyle CSV</a>")
+    parts += [
+        "<div style='display:flex;gap:8px;justify-content:flex-end;margin-top:10px'>",
+        *nav,
+        "</div>",
+        "<div class='muted'>Sayfa başına en fazla "
+        f"{max(1, min(code_browser.MAX_PAGE_SIZE, limit))} kod, en yeniden eskiye. Toplam adet hesaplanmaz.</div>",
+        "</div>",
+    ]
+    return "".join(parts)
@@ -1,18 +1,34 @@
 # app/api/routers/admin_mod/kodyonetimi/tabs/codes.py
 from typing import List
 from html import escape as _e
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.db.models import Prize, Code, PrizeTier
 from app.api.routers.admin_mod.kodyonetimi.helpers import _e as _esc, _tiers
 
+def _default_ttl() -> str:
+    h = settings.CODE_DEFAULT_TTL_HOURS
+    return f"varsayılan: {h:g}" if h > 0 else "süresiz"
+
 def render_codes(db: Session) -> str:
     prizes: List[Prize] = db.query(Prize).order_by(Prize.wheel_index).all()
     prize_label_by_id = {p.id: p.label for p in prizes}
     all_tiers: List[PrizeTier] = _tiers(db)
     enabled_tiers = [t for t in all_tiers if t.enabled]
 
-    last = db.query(Code).order_by(Code.created_at.desc()).limit(20).all()
+    # ix_codes_created_code üzerinden geriye tarama; tüm liste için "Kod Ara" sekmesi
+    last = db.query(Code).order_by(Code.created_at.desc(), Code.code.desc()).limit(20).all()
+    tier_label_by_key = {t.key: t.label for t in all_tiers}
+
+    # önceden çekilmiş (henüz kullanılmamış) ödüller: seviye × ödül adetleri
+    exposure = (
+        db.query(Code.tier_key, Code.drawn_prize_id, func.count(Code.code))
+        .filter(Code.status == "issued", Code.drawn_prize_id.isnot(None))
+        .group_by(Code.tier_key, Code.drawn_prize_id)
+        .all()
+    )
 
     # ========== KOD OLUŞTUR — minimal + butonun yanında "son kod" ==========#
     form = [
@@ -55,6 +71,16 @@ def render_codes(db: Session) -> str:
         "</select>",
         "</label>",
 
+        "<label class='field span-6'>",
+        "<span>Ödülü Şimdi Çek</span>",
+        "<label class='cb'><input type='checkbox' name='predraw' id='predrawCb'> Oluştururken dağılımdan çek</label>",
+        "</label>",
+
+        "<label class='field span-6'>",
+        "<span>Geçerlilik (saat, ops.)</span>",
+        f"<input name='ttl_hours' type='number' min='0' step='any' placeholder='{_default_ttl()}'>",
+        "</label>",
+
         "</div>",  # grid
         "<div class='hint muted'>Not: ‘Otomatik’ modda ödül, seçilen seviyeye ait dağılım yüzdelerine göre belirlenir.</div>",
 
@@ -71,13 +97,95 @@ def render_codes(db: Session) -> str:
         "</div>",  # card
     ]
 
+    # ========== TOPLU KOD ÜRET — oranla ya da satır satır; sonuç CSV indirilir ==========#
+    bulk = [
+        "<div class='card'>",
+        "<h1>Toplu Kod Üret</h1>",
+        "<form method='post' action='/admin/kod-yonetimi/codes/bulk'>",
+        "<div class='grid'>",
+        "<label class='field span-6'>",
+        "<span>Adet</span>",
+        f"<input name='count' type='number' min='1' max='{settings.BULK_ISSUE_MAX}' placeholder='ör. 100000'>",
+        "</label>",
+        "<label class='field span-6'>",
+        "<span>Geçerlilik (saat, ops.)</span>",
+        f"<input name='ttl_hours' type='number' min='0' step='any' placeholder='{_default_ttl()}'>",
+        "</label>",
+        *[
+            "<label class='field span-6'>"
+            f"<span>{_esc(t.label)} oranı</span>"
+            f"<input name='ratio_{_esc(t.key)}' type='number' min='0' step='any' placeholder='0'>"
+            "</label>"
+            for t in enabled_tiers
+        ],
+        "<label class='field span-6'>",
+        "<span>Ödülü Şimdi Çek</span>",
+        "<label class='cb'><input type='checkbox' name='predraw'> Oluştururken dağılımdan çek</label>",
+        "</label>",
+        "</div>",
+        "<label class='field'>",
+        "<span>Ya da satır satır (ops.): <code>kullanici,seviye</code> veya <code>seviye</code></span>",
+        "<textarea name='rows' rows='4' placeholder='kullanici1,gold&#10;bronze'></textarea>",
+        "</label>",
+        "<div class='hint muted'>Satır listesi doluysa adet/oranlar yok sayılır. Sonuç CSV olarak indirilir; "
+        "API: <code>POST /admin/kod-yonetimi/codes/bulk</code> (JSON, <code>?format=json</code>).</div>",
+        "<div class='formActions'><button class='btn primary' type='submit'>Üret ve İndir</button></div>",
+        "</form>",
+        "</div>",
+    ]
+
+    # ========== İÇE AKTAR — iş ortağı CSV'si (kullanıcı, seviye, kod) ==========#
+    imports = [
+        "<div class='card'>",
+        "<h1>CSV İçe Aktar</h1>",
+        "<form method='post' action='/admin/kod-yonetimi/codes/import' enctype='multipart/form-data'>",
+        "<div class='grid'>",
+        # ttl_hours dosyadan önce: gövde akışla işlenir, süre ilk satırdan önce bilinmeli
+        "<label class='field span-6'><span>Geçerlilik (saat, ops.)</span>"
+        f"<input name='ttl_hours' type='number' min='0' step='any' placeholder='{_default_ttl()}'></label>",
+        "<label class='field span-6'><span>Dosya (kullanici,seviye,kod)</span>"
+        "<input type='file' name='file' accept='.csv,text/csv' required></label>",
+        "</div>",
+        "<div class='hint muted'>Başlık satırı opsiyonel (username/kullanici, tier/seviye, code/kod). "
+        "Seviye anahtar ya da etiket olabilir. Hatalı satırlar atlanır ve rapor CSV olarak indirilir; "
+        "mevcut kodlara dokunulmaz.</div>",
+        "<div class='formActions'><button class='btn primary' type='submit'>İçe Aktar</button></div>",
+        "</form>",
+        "</div>",
+    ]
+
+    # ========== DIŞA AKTAR — codes / spins, filtreli akış ==========#
+    export = [
+        "<div class='card'>",
+        "<h1>Dışa Aktar</h1>",
+        "<form method='get' id='exportForm' action='/admin/kod-yonetimi/export/codes'>",
+        "<div class='grid'>",
+        "<label class='field span-6'><span>Tablo</span>"
+        "<select name='_kind' onchange=\"this.form.action='/admin/kod-yonetimi/export/'+this.value\">"
+        "<option value='codes'>Kodlar</option><option value='spins'>Spinler</option></select></label>",
+        "<label class='field span-6'><span>Biçim</span>"
+        "<select name='format'><option value='csv'>CSV</option><option value='ndjson'>NDJSON</option></select></label>",
+        "<label class='field span-6'><span>Seviye</span><select name='tier'><option value=''>Tümü</option>",
+        *[f"<option value='{_esc(t.key)}'>{_esc(t.label)}</option>" for t in all_tiers],
+        "</select></label>",
+        "<label class='field span-6'><span>Durum (yalnız kodlar)</span><select name='status'>"
+        "<option value=''>Tümü</option><option value='issued'>Verildi</option>"
+        "<option value='used'>Kullanıldı</option><option value='expired'>Süresi doldu</option></select></label>",
+        "<label class='field span-6'><span>Başlangıç (oluşturma, UTC)</span><input type='date' name='since'></label>",
+        "<label class='field span-6'><span>Bitiş (dahil)</span><input type='date' name='until'></label>",
+        "</div>",
+        "<div class='formActions'><button class='btn primary' type='submit'>İndir</button></div>",
+        "</form>",
+        "</div>",
+    ]
+
     # ========== SON 20 KOD — minimal tablo + durum ikonları ==========#
     table = [
         "<div class='card'>",
-        "<h1>Son 20 Kod</h1>",
+        "<h1>Son 20 Kod <a class='muted' href='/admin/kod-yonetimi?tab=ara'>tümü →</a></h1>",
         "<div class='table-wrap'>",
         "<table class='codesTable'>",
-        "<tr><th>Kod</th><th>Kullanıcı</th><th>Seviye</th><th>Manuel Ödül</th><th>Kazanan</th><th>Durum</th></tr>",
+        "<tr><th>Kod</th><th>Kullanıcı</th><th>Seviye</th><th>Manuel Ödül</th><th>Kazanan</th><th>Son Geçerlilik</th><th>Durum</th></tr>",
     ]
 
     def status_icon(st: str) -> str:
@@ -86,14 +194,13 @@ def render_codes(db: Session) -> str:
             return "<span class='st ok' title='Kullanıldı'>✓</span>"
         if s == "issued":  # Verildi (beklemede)
             return "<span class='st wait' title='Verildi (Beklemede)'>⏳</span>"
+        if s == "expired": # Süresi doldu
+            return "<span class='st bad' title='Süresi Doldu'>⌛</span>"
         return "<span class='st bad' title='Pasif/Geçersiz'>✕</span>"
 
     for c in last:
         # Seviye etiketi
-        tier_label = "-"
-        if c.tier_key:
-            t = next((x for x in all_tiers if x.key == c.tier_key), None)
-            tier_label = t.label if t else c.tier_key
+        tier_label = tier_label_by_key.get(c.tier_key, c.tier_key) if c.tier_key else "-"
 
         manual_label = "-"
         if getattr(c, "manual_prize_id", None):
@@ -110,12 +217,32 @@ def render_codes(db: Session) -> str:
             f"<td>{_esc(tier_label)}</td>"
             f"<td>{_esc(manual_label)}</td>"
             f"<td>{_esc(win_label)}</td>"
+            f"<td>{c.expires_at.strftime('%d.%m.%Y %H:%M') if c.expires_at else '-'}</td>"
             f"<td>{status_icon(getattr(c, 'status', ''))}</td>"
             "</tr>"
         )
 
     table.append("</table></div></div>")
 
+    # ========== ÖNCEDEN ÇEKİLMİŞ ÖDÜLLER (bekleyen taahhüt) ==========#
+    if exposure:
+        table += [
+            "<div class='card'>",
+            "<h1>Önceden Çekilmiş Ödüller (Bekleyen)</h1>",
+            "<div class='table-wrap'>",
+            "<table class='codesTable'>",
+            "<tr><th>Seviye</th><th>Ödül</th><th>Adet</th></tr>",
+        ]
+        for tk, pid, cnt in sorted(exposure, key=lambda r: (r[0] or "", r[1] or 0)):
+            table.append(
+                "<tr>"
+                f"<td>{_esc(tier_label_by_key.get(tk, tk or '-'))}</td>"
+                f"<td>{_esc(prize_label_by_id.get(pid, '-'))}</td>"
+                f"<td>{int(cnt)}</td>"
+                "</tr>"
+            )
+        table.append("</table></div></div>")
+
     # ========== Stil + JS ==========#
     style_js = """
     <style>
@@ -161,8 +288,10 @@ def render_codes(db: Session) -> str:
       function kMode(){
         var m=document.getElementById('modeSel');
         var s=document.getElementById('manualSel');
+        var p=document.getElementById('predrawCb');
         if(!m||!s) return;
         s.disabled = (m.value!=='manual');
+        if(p) p.disabled = (m.value==='manual');
       }
 
       // Oluşturulan kodu butonun yanında göster:
@@ -198,4 +327,4 @@ def render_codes(db: Session) -> str:
     </script>
     """
 
-    return "".join(form + table) + style_js
+    return "".join(form + bulk + imports + export + table) + style_js
@@ -0,0 +1,67 @@
+# app/api/routers/admin_mod/kodyonetimi/tabs/drift.py
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from sqlalchemy.orm import Session
+
+from app.services import drift
+from app.api.routers.admin_mod.kodyonetimi.helpers import _e as _esc
+
+OUTSIDE = " style='background:rgba(255,0,51,.08)'"
+
+def _pct(v) -> str:
+    return "-" if v is None else f"{v * 100:.2f}%"
+
+def render_drift(db: Session, request_query_params) -> str:
+    """Yapılandırılan ↔ gerçekleşen dağılım (spin_rollups_daily üzerinden)."""
+    try:
+        days = max(1, min(90, int(request_query_params.get("days") or 7)))
+    except ValueError:
+        days = 7
+    since = (datetime.now(timezone.utc) - timedelta(days=days - 1)).date()
+    tiers = drift.report(db, since)
+
+    parts: List[str] = [f"""
+    <div class='card'>
+      <h1>Dağılım Sapması</h1>
+      <form method='get' action='/admin/kod-yonetimi' style='display:flex;gap:8px;align-items:center;flex-wrap:wrap'>
+        <input type='hidden' name='tab' value='sapma'>
+        <span>Son</span><input name='days' type='number' min='1' max='90' value='{days}' style='width:90px'><span>gün</span>
+        <button class='btn' type='submit'>Göster</button>
+        <a class='btn' href='/admin/kod-yonetimi/reports/drift?days={days}'>JSON</a>
+      </form>
+      <div class='muted' style='margin-top:6px'>Gerçekleşen adetler özet tablolarından gelir; güncel ağırlıklarla karşılaştırılır.
+        p &lt; 0.01 → sapma. Pay, %95 Wilson aralığının dışındaysa satır işaretlenir.
+        Manuel atanan ve stoğu biten ödüller de gerçekleşene dahildir.</div>
+    </div>
+    """]
+
+    for t in tiers:
+        if t["drift"]:
+            badge = "<b style='color:#ff4d6d'>SAPMA</b>"
+        elif t["p_value"] is None:
+            badge = "<span class='muted'>yetersiz veri</span>"
+        else:
+            badge = "<b style='color:#3ddc84'>uyumlu</b>"
+        stat = (
+            f"χ²={t['chi2']:.2f} (sd={t['df']}) p={t['p_value']:.4g}"
+            if t["p_value"] is not None else "-"
+        )
+        rows = "".join(
+            f"<tr{OUTSIDE if r['outside'] else ''}>"
+            f"<td>{_esc(r['label'])}</td><td>{r['count']}</td><td>{r['expected']:.1f}</td>"
+            f"<td>{_pct(r['share'])}</td><td>{_pct(r['expected_share'])}</td>"
+            f"<td>{_pct(r['ci_low'])} – {_pct(r['ci_high'])}</td></tr>"
+            for r in t["prizes"]
+        )
+        parts.append(f"""
+        <div class='card'>
+          <h1>{_esc(t['label'])} <span class='muted'>({t['spins']} spin)</span> {badge}</h1>
+          <div class='muted'>{_esc(stat)}{' • ağırlığı olmayan ödül: ' + str(t['unconfigured']) if t['unconfigured'] else ''}</div>
+          <div class='table-wrap'><table>
+            <tr><th>Ödül</th><th>Gerçekleşen</th><th>Beklenen</th><th>Pay</th><th>Hedef pay</th><th>%95 aralık</th></tr>
+            {rows}
+          </table></div>
+        </div>
+        """)
+    return "".join(parts)
@@ -5,11 +5,13 @@ from sqlalchemy.orm import Session
 from sqlalchemy.exc import ProgrammingError
 
 from app.db.models import Prize, PrizeDistribution
+from app.services import prize_stock
 from app.api.routers.admin_mod.kodyonetimi.helpers import _e as _esc, _img_cell, _tiers
 
 def render_prizes(db: Session, request_query_params) -> str:
     prizes: List[Prize] = db.query(Prize).order_by(Prize.wheel_index).all()
     tiers = [t for t in _tiers(db) if t.enabled]
+    stock_left = prize_stock.remaining(db)
 
     parts: List[str] = []
     if not tiers:
@@ -43,7 +45,7 @@ def render_prizes(db: Session, request_query_params) -> str:
         "<tr>",
         "<th>Ad</th><th>Sıra</th><th>Görsel</th>",
         *[f"<th>{_esc(t.label)}<br/><small>%</small></th>" for t in tiers],
-        "<th>Aktif</th><th style='width:110px'>İşlem</th></tr>",
+        "<th>Stok</th><th>Aktif</th><th style='width:110px'>İşlem</th></tr>",
     ]
     for p in prizes:
         cells = [
@@ -57,6 +59,7 @@ def render_prizes(db: Session, request_query_params) -> str:
                 f"<td><input class='pct' data-tier='{_esc(t.key)}' name='w_{p.id}_{t.key}' "
                 f"value='{val_pct}' type='number' step='0.01' min='0' max='100' style='width:80px'></td>"
             )
+        cells.append(f"<td>{stock_left[p.id] if p.id in stock_left else '∞'}</td>")
         checked = "checked" if getattr(p, "enabled", True) else ""
         cells.append(f"<td><input type='checkbox' name='en_{p.id}' {checked}></td>")
         cells.append(
@@ -73,7 +76,7 @@ def render_prizes(db: Session, request_query_params) -> str:
     sum_cells = ["<td colspan='3' style='text-align:right'><b>Toplam (%)</b></td>"]
     for t in tiers:
         sum_cells.append(f"<td><b id='sum_{_esc(t.key)}'>{sums[t.key]/100:.2f}</b></td>")
-    sum_cells += ["<td></td><td></td>"]
+    sum_cells += ["<td></td><td></td><td></td>"]
     rows.append("<tr>" + "".join(sum_cells) + "</tr>")
 
     rows.append(
@@ -91,6 +94,7 @@ def render_prizes(db: Session, request_query_params) -> str:
     elabel = editing.label if editing else ""
     ewi = editing.wheel_index if editing else ""
     eurl = getattr(editing, "image_url", "") or ""
+    estock = stock_left.get(editing.id, "") if editing else ""
 
     form = f"""
     <div class='card'>
@@ -104,6 +108,10 @@ def render_prizes(db: Session, request_query_params) -> str:
         <div style='height:8px'></div>
         <div>Görsel URL</div>
         <input name='image_url' value='{_esc(eurl)}' placeholder='https://... veya /static/...'>
+        <div style='height:8px'></div>
+        <div>Stok (boş = sınırsız)</div>
+        <input name='stock' type='number' min='0' value='{estock}'>
+        <input type='hidden' name='stock_prev' value='{estock}'>
         <div style='height:10px'></div>
         <button class='btn primary' type='submit'>Kaydet</button>
       </form>
@@ -151,5 +159,79 @@ def render_prizes(db: Session, request_query_params) -> str:
     </script>
     """ % (str(tiers_keys_js).replace("'", "\""))
 
-    parts += rows + [form, js]
+    parts += rows + [form, js, _render_sim(tiers)]
     return "".join(parts)
+
+
+def _render_sim(tiers) -> str:
+    """Dağılım simülatörü paneli (POST /admin/kod-yonetimi/prizes/simulate, JSON)."""
+    if not tiers:
+        return ""
+    opts = "".join(f"<option value='{_esc(t.key)}'>{_esc(t.label)}</option>" for t in tiers)
+    panel = f"""
+    <div class='card'>
+      <h1>Dağılım Simülasyonu</h1>
+      <div class='muted'>Tutarlar ödül adından okunur (ör. ₺1000 → 1000). Canlı ağırlıklar verify-spin ile aynı katalogdan gelir.</div>
+      <div style='height:8px'></div>
+      <div class='grid'>
+        <div class='span-6'><div>Seviye</div><select id='simTier'>{opts}</select></div>
+        <div class='span-6'><div>Kampanya kod sayısı (K)</div><input id='simCodes' type='number' min='1' value='10000'></div>
+        <div class='span-6'><div>Tekrar</div><input id='simRuns' type='number' min='1' value='5000'></div>
+        <div class='span-6'><div>Eşik X (boş = beklenen isabet)</div><input id='simOver' type='number' min='0'></div>
+      </div>
+      <div style='height:8px'></div>
+      <label class='cb'><input id='simProposed' type='checkbox' style='width:auto'> Tablodaki (kaydedilmemiş) yüzdeleri kullan</label>
+      <div style='height:8px'></div>
+      <button class='btn primary' type='button' onclick='runSim()'>Simüle Et</button>
+      <div id='simOut' style='margin-top:10px'></div>
+    </div>
+    """
+    js = """
+    <script>
+    function _fmt(v){ return Number(v).toLocaleString('tr-TR', {maximumFractionDigits: 2}); }
+    function _escH(s){ var d=document.createElement('div'); d.textContent=String(s); return d.innerHTML; }
+    async function runSim(){
+      var tk = document.getElementById('simTier').value;
+      var body = {
+        tier: tk,
+        codes: parseInt(document.getElementById('simCodes').value || '0', 10),
+        runs: parseInt(document.getElementById('simRuns').value || '0', 10),
+        over: document.getElementById('simOver').value
+      };
+      if(document.getElementById('simProposed').checked){
+        body.weights = {};
+        document.querySelectorAll("input.pct[data-tier='"+tk+"']").forEach(function(el){
+          var pid = el.name.split('_')[1];
+          var row = el.closest('tr'); var en = row && row.querySelector("input[name='en_"+pid+"']");
+          if(en && !en.checked) return;
+          body.weights[pid] = parseFloat(el.value || '0') || 0;
+        });
+      }
+      var out = document.getElementById('simOut');
+      out.textContent = 'Çalışıyor...';
+      var r = await fetch('/admin/kod-yonetimi/prizes/simulate', {
+        method: 'POST', credentials: 'same-origin',
+        headers: {'Content-Type': 'application/json'}, body: JSON.stringify(body)
+      });
+      var d = await r.json();
+      if(!r.ok){ out.textContent = d.error || ('Hata: ' + r.status); return; }
+      var b = d.total_bands;
+      var h = "<div class='muted'>" + _fmt(d.spins) + " spin (" + d.runs + " tekrar × " + _fmt(d.codes) + " kod), "
+        + d.elapsed_ms + " ms, motor: " + d.engine + "</div>"
+        + "<p>Beklenen ödeme: <b>" + _fmt(d.expected_total) + "</b> (spin başına " + _fmt(d.expected_per_spin)
+        + ", σ ≈ " + _fmt(d.std_total) + ")</p>"
+        + "<div class='table-wrap'><table><tr><th>p1</th><th>p5</th><th>p25</th><th>p50</th><th>p75</th><th>p95</th><th>p99</th></tr><tr>"
+        + ['p1','p5','p25','p50','p75','p95','p99'].map(function(k){ return '<td>' + _fmt(b[k]) + '</td>'; }).join('')
+        + "</tr></table></div><div style='height:8px'></div>"
+        + "<div class='table-wrap'><table><tr><th>Ödül</th><th>Tutar</th><th>Olasılık</th><th>Beklenen</th>"
+        + "<th>İsabet p5 / p50 / p95</th><th>X</th><th>P(isabet &gt; X)</th></tr>";
+      d.prizes.forEach(function(p){
+        h += "<tr><td>" + _escH(p.label) + "</td><td>" + _fmt(p.value) + "</td><td>" + (p.p * 100).toFixed(2) + "%</td><td>"
+          + _fmt(p.expected_hits) + "</td><td>" + _fmt(p.hits_p5) + " / " + _fmt(p.hits_p50) + " / " + _fmt(p.hits_p95)
+          + "</td><td>" + p.over + "</td><td>" + (p.p_over * 100).toFixed(2) + "%</td></tr>";
+      });
+      out.innerHTML = h + "</table></div>";
+    }
+    </script>
+    """
+    return panel + js
@@ -0,0 +1,80 @@
+# app/api/routers/admin_mod/kodyonetimi/tabs/reports.py
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.db.models import Prize
+from app.services import spin_rollup
+from app.api.routers.admin_mod.kodyonetimi.helpers import _e as _esc, _tiers
+
+def render_reports(db: Session, request_query_params) -> str:
+    """Spin raporları: yalnızca spin_rollups_* özet tablolarından okunur (ham spins taranmaz)."""
+    try:
+        days = max(1, min(90, int(request_query_params.get("days") or 14)))
+    except ValueError:
+        days = 14
+    now = datetime.now(timezone.utc)
+    prizes: List[Prize] = db.query(Prize).order_by(Prize.wheel_index).all()
+    tier_label = {t.key: t.label for t in _tiers(db)}
+    daily = spin_rollup.daily(db, (now - timedelta(days=days - 1)).date())
+    hourly = spin_rollup.hourly(db, now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=23))
+    # worker'ın bellekteki STATS'ı değil, site_config'teki kalıcı işaret (her worker aynı değeri görür)
+    done = spin_rollup.processed_until(db)
+    hwm = done.strftime("%Y-%m-%d %H:%M:%S") if done else None
+
+    # gün × seviye satırları, ödül sütunları
+    grid: Dict[Tuple[object, str], Dict[int, int]] = {}
+    for r in daily:
+        grid.setdefault((r.day, r.tier_key), {})[r.prize_id] = r.spins
+    known = {p.id for p in prizes}
+    other = any(pid not in known for cells in grid.values() for pid in cells)
+
+    head = (
+        "<tr><th>Gün</th><th>Seviye</th>"
+        + "".join(f"<th>{_esc(p.label)}</th>" for p in prizes)
+        + ("<th>Diğer</th>" if other else "")
+        + "<th>Toplam</th></tr>"
+    )
+    body: List[str] = []
+    for (day, tier) in sorted(grid, key=lambda k: (k[0], k[1]), reverse=True):
+        cells = grid[(day, tier)]
+        row = [f"<td>{day:%d.%m.%Y}</td>", f"<td>{_esc(tier_label.get(tier, tier or '-'))}</td>"]
+        row += [f"<td>{cells.get(p.id, 0)}</td>" for p in prizes]
+        if other:
+            row.append(f"<td>{sum(v for pid, v in cells.items() if pid not in known)}</td>")
+        row.append(f"<td><b>{sum(cells.values())}</b></td>")
+        body.append("<tr>" + "".join(row) + "</tr>")
+    if not body:
+        body.append(f"<tr><td colspan='{len(prizes) + 3}' class='muted'>Bu aralıkta özet yok.</td></tr>")
+
+    # son 24 saat (saatlik toplam)
+    per_hour: Dict[datetime, int] = {}
+    for r in hourly:
+        per_hour[r.bucket] = per_hour.get(r.bucket, 0) + r.spins
+    hours = "".join(
+        f"<tr><td>{b:%d.%m %H:00}</td><td>{n}</td></tr>" for b, n in sorted(per_hour.items(), reverse=True)
+    ) or "<tr><td colspan='2' class='muted'>Son 24 saatte özet yok.</td></tr>"
+
+    return f"""
+    <div class='card'>
+      <h1>Spin Raporu (günlük, seviye × ödül)</h1>
+      <form method='get' action='/admin/kod-yonetimi' style='display:flex;gap:8px;align-items:center;flex-wrap:wrap'>
+        <input type='hidden' name='tab' value='raporlar'>
+        <span>Son</span><input name='days' type='number' min='1' max='90' value='{days}' style='width:90px'><span>gün</span>
+        <button class='btn' type='submit'>Göster</button>
+        <a class='btn' href='/admin/kod-yonetimi/reports/export.csv?grain=daily&days={days}'>CSV (günlük)</a>
+        <a class='btn' href='/admin/kod-yonetimi/reports/export.csv?grain=hourly&days={days}'>CSV (saatlik)</a>
+      </form>
+      <form method='post' action='/admin/kod-yonetimi/reports/refresh' style='margin-top:8px'>
+        <button class='btn small' type='submit'>Özetleri şimdi güncelle</button>
+        <span class='muted'>Son işlenen an: {_esc(hwm or '-')} (UTC). Özetler arka planda periyodik güncellenir.</span>
+      </form>
+      <div style='height:8px'></div>
+      <div class='table-wrap'><table>{head}{''.join(body)}</table></div>
+    </div>
+    <div class='card'>
+      <h1>Son 24 Saat</h1>
+      <div class='table-wrap'><table style='min-width:0'><tr><th>Saat (UTC)</th><th>Spin</th></tr>{hours}</table></div>
+    </div>
+    """
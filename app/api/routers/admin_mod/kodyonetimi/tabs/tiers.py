@@ -3,27 +3,31 @@ from typing import List
 from html import escape as _e
 from sqlalchemy.orm import Session
 
-from app.db.models import PrizeTier
+from app.db.models import PrizeDeck, PrizeTier
 from app.api.routers.admin_mod.kodyonetimi.helpers import _e as _esc, _tiers
 
 def render_tiers(db: Session, request_query_params) -> str:
     tiers: List[PrizeTier] = _tiers(db)
     edit_key = (request_query_params.get("edit") or "").strip()
     editing = next((t for t in tiers if t.key == edit_key), None)
+    decks = {d.tier_key: d for d in db.query(PrizeDeck).all()}
 
     # liste
     rows = [
         "<div class='card'><h1>Seviye Yönetimi</h1>",
         "<div class='table-wrap'><table>",
-        "<tr><th>Anahtar</th><th>Etiket</th><th>Sıra</th><th>Aktif</th><th style='width:160px'>İşlem</th></tr>",
+        "<tr><th>Anahtar</th><th>Etiket</th><th>Sıra</th><th>Aktif</th><th>Deste</th><th style='width:160px'>İşlem</th></tr>",
     ]
     for t in tiers:
+        d = decks.get(t.key)
+        deck_txt = f"{d.pos} / {d.size}" if d and d.enabled and d.size else "-"
         rows.append(
             f"<tr>"
             f"<td><code>{_esc(t.key)}</code></td>"
             f"<td>{_esc(t.label)}</td>"
             f"<td>{t.sort}</td>"
             f"<td>{'Evet' if t.enabled else 'Hayır'}</td>"
+            f"<td>{deck_txt}</td>"
             f"<td>"
             f"<a class='btn small' href='/admin/kod-yonetimi?tab=seviyeler&edit={_esc(t.key)}'>Düzenle</a> "
             f"<form method='post' action='/admin/kod-yonetimi/tiers/delete' style='display:inline' onsubmit=\"return confirm('Silinsin mi? (İlgili dağılımlar da silinir)')\">"
@@ -39,6 +43,8 @@ def render_tiers(db: Session, request_query_params) -> str:
     elabel = editing.label if editing else ""
     esort = editing.sort if editing else 0
     echecked = "checked" if (editing.enabled if editing else True) else ""
+    edeck = decks.get(editing.key) if editing else None
+    edeck_size = edeck.size if (edeck and edeck.enabled) else 0
 
     form = f"""
     <div class='card'>
@@ -59,6 +65,15 @@ def render_tiers(db: Session, request_query_params) -> str:
           <div class='span-6'><div>Sıra</div><input name='sort' type='number' value='{esort}' required></div>
           <div class='span-6'><div>Aktif</div><label class='cb'><input type='checkbox' name='enabled' {echecked}> Aktif</label></div>
         </div>
+        <div style='height:8px'></div>
+        <div class='grid'>
+          <div class='span-6'>
+            <div>Deste boyutu (0 = kapalı)</div>
+            <input name='deck_size' type='number' min='0' value='{edeck_size}'>
+          </div>
+          <div class='span-6 muted'>Deste modunda dağılım bu kadar slotluk karıştırılmış bir diziye dökülür;
+            her tam deste turunda oranlar birebir tutar. Kaydetmek desteyi yeniden karıştırır.</div>
+        </div>
         <div style='height:10px'></div>
         <button class='btn primary' type='submit'>Kaydet</button>
         {"<a class='btn' href='/admin/kod-yonetimi?tab=seviyeler'>Yeni</a>" if editing else ""}
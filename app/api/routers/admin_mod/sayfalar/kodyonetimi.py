@@ -1,24 +1,39 @@
 # app/api/routers/admin_mod/sayfalar/kodyonetimi.py
-# SAYFA: Kod Yönetimi (Kodlar + Ödüller + Seviyeler)
+# SAYFA: Kod Yönetimi (Kodlar + Kod Ara + Ödüller + Seviyeler + Raporlar + Sapma)
 # URL: /admin/kod-yonetimi
 
-from typing import Annotated, Dict, List
+from typing import Annotated, AsyncIterator, Dict, Iterator, List, Tuple
 from html import escape as _e
+from datetime import datetime, timedelta, timezone
+import csv
+import io
 from fastapi import APIRouter, Depends, Request
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+try:
+    import python_multipart as multipart
+    from python_multipart.multipart import parse_options_header
+except ModuleNotFoundError:  # python-multipart < 0.0.13
+    import multipart
+    from multipart.multipart import parse_options_header
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import ProgrammingError  # aksiyonlarda kullanılabilir
 
 from app.db.session import get_db
 from app.db.models import Prize, Code, PrizeDistribution, PrizeTier, AdminUser, AdminRole
-from app.services.codes import gen_code
+from app.services.codes import IssueError, bulk_issue, gen_code, rows_by_ratio
 from app.services.auth import require_role
+from app.services import code_expiry, code_import, drift, exports, prize_catalog, prize_deck, prize_sim, prize_stock, spin_rollup
+from app.services.spin import SpinError, draw_for_tier
 from app.api.routers.admin_mod.yerlesim import _layout, _render_flash_blocks, flash
 
 # yeni: modüler render ve yardımcılar
 from app.api.routers.admin_mod.kodyonetimi.tabs.codes import render_codes
+from app.api.routers.admin_mod.kodyonetimi.tabs.browser import render_browser
 from app.api.routers.admin_mod.kodyonetimi.tabs.prizes import render_prizes
 from app.api.routers.admin_mod.kodyonetimi.tabs.tiers import render_tiers
+from app.api.routers.admin_mod.kodyonetimi.tabs.reports import render_reports
+from app.api.routers.admin_mod.kodyonetimi.tabs.drift import render_drift
 from app.api.routers.admin_mod.kodyonetimi.helpers import _normalize, _tiers
 
 router = APIRouter()
@@ -31,7 +46,7 @@ def kod_yonetimi(
     current: Annotated[AdminUser, Depends(require_role(AdminRole.admin))],
     tab: str = "kodlar",
 ):
-    tabs = [("kodlar", "Kodlar"), ("oduller", "Ödüller"), ("seviyeler", "Seviyeler")]
+    tabs = [("kodlar", "Kodlar"), ("ara", "Kod Ara"), ("oduller", "Ödüller"), ("seviyeler", "Seviyeler"), ("raporlar", "Raporlar"), ("sapma", "Sapma")]
     t_html = ["<div class='tabs'>"]
     for key, label in tabs:
         cls = "tab active" if tab == key else "tab"
@@ -46,8 +61,14 @@ def kod_yonetimi(
     # İçerik (modüler render)
     if tab == "kodlar":
         parts.append(render_codes(db))
+    elif tab == "ara":
+        parts.append(render_browser(db, request.query_params))
     elif tab == "oduller":
         parts.append(render_prizes(db, request.query_params))
+    elif tab == "raporlar":
+        parts.append(render_reports(db, request.query_params))
+    elif tab == "sapma":
+        parts.append(render_drift(db, request.query_params))
     else:  # seviyeler
         parts.append(render_tiers(db, request.query_params))
 
@@ -91,6 +112,13 @@ async def create_code(
     mode = (form.get("mode") or "auto").strip()
     manual_prize_id = (form.get("manual_prize_id") or "").strip()
     manual_pid = int(manual_prize_id) if (manual_prize_id and manual_prize_id.isdigit()) else None
+    predraw = mode != "manual" and (form.get("predraw") or "").lower() in ("1","true","on","yes","checked")
+    ttl_raw = (form.get("ttl_hours") or "").strip().replace(",", ".")
+    try:
+        ttl_hours = float(ttl_raw) if ttl_raw else None
+    except ValueError:
+        flash(request, "Geçerlilik süresi sayı olmalıdır.", "error")
+        return RedirectResponse(url="/admin/kod-yonetimi?tab=kodlar", status_code=303)
 
     # seviye doğrulama
     if tier_key:
@@ -103,19 +131,270 @@ async def create_code(
         return RedirectResponse(url="/admin/kod-yonetimi?tab=kodlar", status_code=303)
 
     code = gen_code()
+
+    # Ödülü şimdi çek (opsiyonel): verify-spin salt okuma olur, kampanya riski önceden görülür
+    drawn_pid = None
+    if predraw:
+        try:
+            # slot/stok kodu yazan transaction'da: commit edilmezse geri gelir
+            drawn_pid = draw_for_tier(prize_catalog.get(db), tier_key, code, db.connection()).id
+        except SpinError:
+            flash(request, "Bu seviye için tanımlı dağılım yok.", "error")
+            return RedirectResponse(url="/admin/kod-yonetimi?tab=kodlar", status_code=303)
+
     db.add(Code(
         code=code,
         username=username,
         tier_key=tier_key,
         status="issued",
         manual_prize_id=manual_pid if mode == "manual" else None,
+        drawn_prize_id=drawn_pid,
         prize_id=None,
+        expires_at=code_expiry.expires_at(ttl_hours),
     ))
     db.commit()
     flash(request, "Kod oluşturuldu.", "success")
     return RedirectResponse(url="/admin/kod-yonetimi?tab=kodlar", status_code=303)
 
 
+def _bulk_rows(body: Dict) -> List:
+    """Gövdeden (kullanıcı, seviye) satırları: "rows" (satır başına) ya da "count" + "ratios"."""
+    rows = body.get("rows")
+    if isinstance(rows, str):
+        # form: her satır "kullanici,seviye" ya da yalnız "seviye"
+        out = []
+        for line in rows.splitlines():
+            parts = [x.strip() for x in line.split(",")]
+            if not parts[-1]:
+                continue
+            out.append((parts[0] or None, parts[1]) if len(parts) > 1 else (None, parts[0]))
+        return out
+    if rows:
+        return [((r.get("username") or "").strip() or None, str(r.get("tier_key") or "").strip()) for r in rows]
+    ratios = {str(k): float(v) for k, v in (body.get("ratios") or {}).items() if str(v).strip() != ""}
+    return rows_by_ratio(int(body.get("count") or 0), ratios)
+
+
+@router.post("/admin/kod-yonetimi/codes/bulk", response_model=None)
+async def codes_bulk(
+    request: Request,
+    db: Annotated[Session, Depends(get_db)],
+    current: Annotated[AdminUser, Depends(require_role(AdminRole.admin))],
+    format: str = "csv",
+):
+    """Toplu kod üretimi; sonuç CSV (varsayılan) ya da ?format=json.
+
+    JSON gövde: {"count": 100000, "ratios": {"gold": 70, "bronze": 30}} ya da
+                {"rows": [{"username": "u1", "tier_key": "gold"}, ...]}
+                + ops. "ttl_hours", "predraw". Form: count, ratio_<seviye>, rows (metin), ttl_hours, predraw.
+    """
+    is_json = (request.headers.get("content-type") or "").startswith("application/json")
+    try:
+        if is_json:
+            body = await request.json()
+        else:
+            form = await request.form()
+            body = {
+                "count": form.get("count"),
+                "ratios": {k[6:]: v for k, v in form.items() if k.startswith("ratio_")},
+                "rows": (form.get("rows") or "").strip() or None,
+                "ttl_hours": (form.get("ttl_hours") or "").strip().replace(",", ".") or None,
+                "predraw": (form.get("predraw") or "").lower() in ("1", "true", "on", "yes", "checked"),
+            }
+        rows = _bulk_rows(body)
+        ttl = float(body["ttl_hours"]) if body.get("ttl_hours") not in (None, "") else None
+        issued = await run_in_threadpool(bulk_issue, db, rows, ttl, bool(body.get("predraw")))
+    except (IssueError, ValueError, TypeError, AttributeError) as e:
+        db.rollback()
+        msg = str(e) if isinstance(e, IssueError) else "Geçersiz parametre."
+        if is_json or format == "json":
+            return JSONResponse({"error": msg}, status_code=400)
+        flash(request, msg, "error")
+        return RedirectResponse(url="/admin/kod-yonetimi?tab=kodlar", status_code=303)
+
+    if format == "json":
+        return {"count": len(issued), "codes": [
+            {"code": r["code"], "username": r["username"], "tier_key": r["tier_key"],
+             "drawn_prize_id": r["drawn_prize_id"], "expires_at": r["expires_at"]}
+            for r in issued
+        ]}
+    labels = {p.id: p.label for p in db.query(Prize).all()}
+    fname = f"kodlar_{datetime.now(timezone.utc):%Y%m%d_%H%M%S}_{len(issued)}.csv"
+    return StreamingResponse(
+        _bulk_csv(issued, labels),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f"attachment; filename={fname}", "Cache-Control": "no-store"},
+    )
+
+
+def _bulk_csv(issued: List[Dict], labels: Dict) -> Iterator[bytes]:
+    """Toplu üretim sonucunu exports.CHUNK satırlık CSV blokları halinde yazar.
+
+    Satırlar zaten bellektedir (en fazla BULK_ISSUE_MAX; kodlar ancak commit'ten sonra kesinleşir);
+    bloklama yalnız CSV metninin tek parça kurulmasını önler.
+    """
+    yield "\ufeffkod,kullanici,seviye,cekilen_odul,son_gecerlilik_utc\r\n".encode("utf-8")
+    for i in range(0, len(issued), exports.CHUNK):
+        buf = io.StringIO()
+        w = csv.writer(buf)
+        for r in issued[i:i + exports.CHUNK]:
+            w.writerow([
+                r["code"], r["username"] or "", r["tier_key"], labels.get(r["drawn_prize_id"], ""),
+                r["expires_at"].strftime("%Y-%m-%d %H:%M:%S") if r["expires_at"] else "",
+            ])
+        yield buf.getvalue().encode("utf-8")
+
+
+async def _multipart_parts(request: Request) -> AsyncIterator[Tuple[str, str, bytes]]:
+    """multipart gövdeyi geldikçe ayrıştırır: (alan adı, dosya adı, bayt) üçlüleri.
+
+    Dosya diske/belleğe toplanmaz; her alanın verisi ağdan geldiği parçalarla döner, alanın
+    sonu boş bayt (b"") ile bildirilir. Alanlar gövdedeki sırayla gelir.
+    """
+    _, params = parse_options_header(request.headers.get("content-type") or "")
+    boundary = params.get(b"boundary")
+    if not boundary:
+        raise ValueError("Geçersiz form gövdesi.")
+    events: List[Tuple[str, str, bytes]] = []
+    part = {"field": b"", "value": b"", "name": "", "filename": ""}
+
+    def on_part_begin() -> None:
+        part.update(name="", filename="")
+
+    def on_header_field(data: bytes, start: int, end: int) -> None:
+        part["field"] += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int) -> None:
+        part["value"] += data[start:end]
+
+    def on_header_end() -> None:
+        if part["field"].lower() == b"content-disposition":
+            _, opts = parse_options_header(part["value"])
+            part["name"] = opts.get(b"name", b"").decode("utf-8", "replace")
+            part["filename"] = opts.get(b"filename", b"").decode("utf-8", "replace")
+        part.update(field=b"", value=b"")
+
+    def on_part_data(data: bytes, start: int, end: int) -> None:
+        if end > start:
+            events.append((part["name"], part["filename"], data[start:end]))
+
+    def on_part_end() -> None:
+        events.append((part["name"], part["filename"], b""))
+
+    parser = multipart.MultipartParser(boundary, {
+        "on_part_begin": on_part_begin, "on_header_field": on_header_field,
+        "on_header_value": on_header_value, "on_header_end": on_header_end,
+        "on_part_data": on_part_data, "on_part_end": on_part_end,
+    })
+    async for chunk in request.stream():
+        if chunk:
+            parser.write(chunk)
+        while events:
+            yield events.pop(0)
+    parser.finalize()
+    while events:
+        yield events.pop(0)
+
+
+async def _importer(db: Session, ttl_hours: str) -> code_import.Importer:
+    ttl = float(ttl_hours.replace(",", ".")) if ttl_hours.strip() else None
+    catalog = await run_in_threadpool(prize_catalog.get, db)
+    return code_import.Importer(catalog.tiers, code_expiry.expires_at(ttl))
+
+
+@router.post("/admin/kod-yonetimi/codes/import", response_model=None)
+async def codes_import(
+    request: Request,
+    db: Annotated[Session, Depends(get_db)],
+    current: Annotated[AdminUser, Depends(require_role(AdminRole.admin))],
+    ttl_hours: str = "",
+):
+    """Önceden atanmış kod CSV'si (kullanıcı, seviye, kod) içe aktarımı.
+
+    API: gövde doğrudan CSV (Content-Type: text/csv), geldikçe işlenir → JSON rapor.
+    Form: multipart 'file' (+ ttl_hours), o da geldikçe işlenir; ttl_hours dosyadan önce gelmeli
+    (ya da sorgu parametresi). Hatalı satır varsa hata raporu CSV olarak indirilir.
+    """
+    is_form = (request.headers.get("content-type") or "").startswith("multipart/form-data")
+    imp = None
+    try:
+        if is_form:
+            fields: Dict[str, bytes] = {}
+            async for name, filename, data in _multipart_parts(request):
+                if name != "file":
+                    if imp is not None and name == "ttl_hours" and data.strip():
+                        raise ValueError("Geçerlilik süresi dosyadan önce gönderilmeli.")
+                    fields[name] = (fields.get(name, b"") + data)[:1024]  # küçük metin alanları
+                    continue
+                if not filename:
+                    break
+                if imp is None:
+                    ttl_raw = fields.get("ttl_hours", b"").decode("utf-8", "replace").strip()
+                    imp = await _importer(db, ttl_raw or ttl_hours)
+                if data:
+                    await run_in_threadpool(imp.feed, data)
+            if imp is None:
+                flash(request, "Dosya seçilmedi.", "error")
+                return RedirectResponse(url="/admin/kod-yonetimi?tab=kodlar", status_code=303)
+        else:
+            imp = await _importer(db, ttl_hours)
+            async for chunk in request.stream():
+                if chunk:
+                    await run_in_threadpool(imp.feed, chunk)
+        report = await run_in_threadpool(imp.finish)
+    except ValueError as e:
+        # önceki parçalar yazılmış olabilir; ne kadarının yazıldığı raporda
+        if not is_form:
+            return JSONResponse({"error": str(e), **(imp.report() if imp else {})}, status_code=400)
+        flash(request, f"İçe aktarma durdu: {e}", "error")
+        return RedirectResponse(url="/admin/kod-yonetimi?tab=kodlar", status_code=303)
+
+    if not is_form:
+        return report
+    if not report["errors"]:
+        flash(request, f"{report['inserted']} kod içe aktarıldı.", "success")
+        return RedirectResponse(url="/admin/kod-yonetimi?tab=kodlar", status_code=303)
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    w.writerow(["satir", "kod", "hata"])
+    for r in report["error_rows"]:
+        w.writerow([r["line"], r["code"], r["error"]])
+    if report["errors"] > len(report["error_rows"]):
+        w.writerow(["", "", f"... toplam {report['errors']} hatalı satır"])
+    w.writerow(["", "", f"özet: {report['total']} satır, {report['inserted']} eklendi, {report['errors']} hata"])
+    return Response(
+        content=buf.getvalue().encode("utf-8-sig"),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": "attachment; filename=kod_import_hatalar.csv"},
+    )
+
+
+@router.get("/admin/kod-yonetimi/export/{kind}", response_model=None)
+def export_rows(
+    kind: str,
+    request: Request,
+    current: Annotated[AdminUser, Depends(require_role(AdminRole.admin))],
+    format: str = "csv",
+):
+    """codes / spins dışa aktarımı (CSV ya da NDJSON), sabit bellekte akış.
+
+    Filtreler: ?prefix=AB12&username=ali&tier=gold&status=issued|used|expired (yalnız codes)
+    &since=YYYY-MM-DD&until=YYYY-MM-DD
+    """
+    if kind not in ("codes", "spins") or format not in ("csv", "ndjson"):
+        return JSONResponse({"error": "Geçersiz tür ya da biçim."}, status_code=400)
+    try:
+        f = exports.parse_filter(request.query_params)
+    except exports.ExportError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    fname = f"{kind}_{datetime.now(timezone.utc):%Y%m%d_%H%M%S}.{format}"
+    return StreamingResponse(
+        exports.stream(kind, format, f),
+        media_type="text/csv; charset=utf-8" if format == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": f"attachment; filename={fname}", "Cache-Control": "no-store"},
+    )
+
+
 @router.post("/admin/kod-yonetimi/prizes/upsert", response_model=None)
 async def prizes_upsert(
     request: Request,
@@ -128,6 +407,9 @@ async def prizes_upsert(
     wheel_index = int(form.get("wheel_index"))
     image_url_raw = (form.get("image_url") or "").strip()
     image_url = _normalize(image_url_raw)
+    stock_raw = (form.get("stock") or "").strip()
+    stock_changed = stock_raw != (form.get("stock_prev") or "").strip()
+    stock = int(stock_raw) if stock_raw.isdigit() else None
 
     if not label:
         flash(request, "Ad zorunludur.", "error")
@@ -144,10 +426,16 @@ async def prizes_upsert(
         db.add(prize)
         msg = "Ödül güncellendi."
     else:
-        db.add(Prize(label=label, wheel_index=wheel_index, image_url=image_url))
+        prize = Prize(label=label, wheel_index=wheel_index, image_url=image_url)
+        db.add(prize)
         msg = "Yeni Ödül eklendi."
 
-    db.commit()
+    # stok yalnızca değiştiyse yeniden parçalanır (aksi halde eşzamanlı düşümler ezilirdi)
+    if stock_changed:
+        db.flush()
+        prize_stock.set_stock(db, prize.id, stock)
+
+    prize_catalog.commit(db)  # katalog sürümünü artır + yerel önbelleği düşür
     flash(request, msg, "success")
     return RedirectResponse(url="/admin/kod-yonetimi?tab=oduller", status_code=303)
 
@@ -166,8 +454,9 @@ async def prizes_delete(
         return RedirectResponse(url="/admin/kod-yonetimi?tab=oduller", status_code=303)
 
     db.query(Code).filter(Code.prize_id == pid).delete(synchronize_session=False)
+    db.query(Code).filter(Code.drawn_prize_id == pid).update({Code.drawn_prize_id: None}, synchronize_session=False)
     db.delete(prize)
-    db.commit()
+    prize_catalog.commit(db)
     flash(request, "Ödül silindi.", "success")
     return RedirectResponse(url="/admin/kod-yonetimi?tab=oduller", status_code=303)
 
@@ -218,11 +507,56 @@ async def prizes_dist_save(
         flash(request, msg, "error")
         return RedirectResponse(url="/admin/kod-yonetimi?tab=oduller", status_code=303)
 
-    db.commit()
+    prize_deck.rebuild_enabled(db)  # ağırlıklar değişti: açık desteler yeniden karıştırılır
+    prize_catalog.commit(db)
     flash(request, "Dağılımlar kaydedildi.", "success")
     return RedirectResponse(url="/admin/kod-yonetimi?tab=oduller", status_code=303)
 
 
+@router.post("/admin/kod-yonetimi/prizes/simulate", response_model=None)
+async def prizes_simulate(
+    request: Request,
+    db: Annotated[Session, Depends(get_db)],
+    current: Annotated[AdminUser, Depends(require_role(AdminRole.admin))],
+):
+    """Dağılım simülasyonu (JSON). weights verilmezse seviyenin canlı (verify-spin) ağırlıkları.
+
+    Gövde: {"tier": "gold", "codes": 10000, "runs": 2000, "over": 12 | {"<prize_id>": 12},
+            "weights": {"<prize_id>": yüzde, ...}, "values": {"<prize_id>": tutar}, "seed": 1}
+    """
+    def run(body: Dict) -> Dict:
+        # katalog okuması (DB) ve simülasyon (CPU) thread havuzunda: event loop bloklanmasın
+        tier = str(body.get("tier") or "").strip()
+        codes = int(body.get("codes") or 10000)
+        runs = int(body.get("runs") or 2000)
+        over_raw = body.get("over")
+        values = {int(k): float(v) for k, v in (body.get("values") or {}).items()}
+        seed = int(body["seed"]) if body.get("seed") not in (None, "") else None
+        catalog = prize_catalog.get(db)
+        if body.get("weights"):
+            weights = prize_sim.proposed_weights(catalog, {int(k): float(v) for k, v in body["weights"].items()})
+        else:
+            weights = prize_sim.tier_weights(catalog, tier)
+        if isinstance(over_raw, dict):
+            over = {int(k): int(v) for k, v in over_raw.items() if str(v).strip() != ""}
+        elif over_raw not in (None, ""):
+            over = {pid: int(over_raw) for pid, _ in weights}
+        else:
+            over = None
+        result = prize_sim.simulate(catalog, weights, codes, runs, over=over, values=values, seed=seed)
+        result["tier"] = tier
+        return result
+
+    try:
+        body = await request.json()
+        result = await run_in_threadpool(run, body)
+    except prize_sim.SimError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    except (ValueError, TypeError, AttributeError):
+        return JSONResponse({"error": "Geçersiz parametre."}, status_code=400)
+    return result
+
+
 @router.post("/admin/kod-yonetimi/tiers/upsert", response_model=None)
 async def tiers_upsert(
     request: Request,
@@ -238,6 +572,10 @@ async def tiers_upsert(
         sort = int(sort_raw)
     except ValueError:
         sort = 0
+    try:
+        deck_size = max(0, int((form.get("deck_size") or "0").strip()))
+    except ValueError:
+        deck_size = 0
 
     if not key or not label:
         flash(request, "Anahtar ve Etiket zorunludur.", "error")
@@ -253,8 +591,16 @@ async def tiers_upsert(
     else:
         db.add(PrizeTier(key=key, label=label, sort=sort, enabled=enabled))
         msg = "Seviye eklendi."
+    db.flush()
 
-    db.commit()
+    # deste modu: boyut > 0 ise güncel dağılımdan yeniden karıştır, 0 ise kapat
+    if deck_size > 0:
+        if not prize_deck.build(db, key, deck_size):
+            msg += " (Deste kurulamadı: bu seviye için dağılım yok.)"
+    else:
+        prize_deck.disable(db, key)
+
+    prize_catalog.commit(db)
     flash(request, msg, "success")
     return RedirectResponse(url="/admin/kod-yonetimi?tab=seviyeler", status_code=303)
 
@@ -273,6 +619,59 @@ async def tiers_delete(
         return RedirectResponse(url="/admin/kod-yonetimi?tab=seviyeler", status_code=303)
 
     db.delete(row)
-    db.commit()
+    prize_catalog.commit(db)
     flash(request, "Seviye silindi.", "success")
     return RedirectResponse(url="/admin/kod-yonetimi?tab=seviyeler", status_code=303)
+
+
+@router.post("/admin/kod-yonetimi/reports/refresh", response_model=None)
+def reports_refresh(
+    request: Request,
+    current: Annotated[AdminUser, Depends(require_role(AdminRole.admin))],
+):
+    n = spin_rollup.run()
+    flash(request, f"Özetler güncellendi ({n} yeni spin).", "success")
+    return RedirectResponse(url="/admin/kod-yonetimi?tab=raporlar", status_code=303)
+
+
+@router.get("/admin/kod-yonetimi/reports/export.csv", response_model=None)
+def reports_export(
+    db: Annotated[Session, Depends(get_db)],
+    current: Annotated[AdminUser, Depends(require_role(AdminRole.admin))],
+    grain: str = "daily",
+    days: int = 30,
+):
+    """Özet tablolarından CSV (ham spins okunmaz)."""
+    days = max(1, min(366, days))
+    now = datetime.now(timezone.utc)
+    labels = {p.id: p.label for p in db.query(Prize).all()}
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    if grain == "hourly":
+        w.writerow(["saat_utc", "seviye", "odul_id", "odul", "spin"])
+        for r in spin_rollup.hourly(db, now - timedelta(days=days)):
+            w.writerow([r.bucket.strftime("%Y-%m-%d %H:00"), r.tier_key, r.prize_id, labels.get(r.prize_id, ""), r.spins])
+    else:
+        grain = "daily"
+        w.writerow(["gun", "seviye", "odul_id", "odul", "spin"])
+        for r in spin_rollup.daily(db, (now - timedelta(days=days - 1)).date()):
+            w.writerow([r.day.isoformat(), r.tier_key, r.prize_id, labels.get(r.prize_id, ""), r.spins])
+    fname = f"spin_{grain}_{now:%Y%m%d}.csv"
+    return Response(
+        content=buf.getvalue().encode("utf-8-sig"),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f"attachment; filename={fname}"},
+    )
+
+
+@router.get("/admin/kod-yonetimi/reports/drift", response_model=None)
+def reports_drift(
+    db: Annotated[Session, Depends(get_db)],
+    current: Annotated[AdminUser, Depends(require_role(AdminRole.admin))],
+    days: int = 7,
+    alpha: float = 0.01,
+):
+    """Yapılandırılan ↔ gerçekleşen dağılım (JSON); özet tablolarından tek GROUP BY."""
+    days = max(1, min(366, days))
+    since = (datetime.now(timezone.utc) - timedelta(days=days - 1)).date()
+    return {"since": since.isoformat(), "alpha": alpha, "tiers": drift.report(db, since, alpha=alpha)}
@@ -2,7 +2,7 @@
 # SAYFA: Dashboard (Genel Özet) • URL: /admin
 from typing import Annotated
 from html import escape as _e
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import HTMLResponse
@@ -16,6 +16,7 @@ from app.db.models import (
     SiteConfig,
 )
 from app.services.auth import require_role
+from app.services import metrics
 from app.api.routers.admin_mod.yerlesim import _layout, _render_flash_blocks
 
 router = APIRouter()
@@ -88,6 +89,14 @@ def dashboard(
         </div>
         """
 
+    # ---- Spin hunisi (metric_rollups; tüm worker'lar, son flush'a kadar) ----
+    try:
+        spin24 = metrics.funnel(metrics.last(db, 24))
+        e1001 = metrics.read_series(db, "spin.verify.err.E1001", now - timedelta(hours=1))
+    except Exception:
+        db.rollback()
+        spin24, e1001 = None, []
+
     # ---- Sayılar formatı ----
     def fmt(n: int) -> str:
         try:
@@ -149,6 +158,33 @@ def dashboard(
     </section>
     """
 
+    funnel_html = ""
+    if spin24:
+        def ms(v):
+            return "-" if v is None else f"{v:g} ms"
+        conv = spin24["conversion"]
+        stage_rows = "".join(
+            f"<tr><td>{_e(label)}</td><td>{fmt(spin24[key]['ok'])}</td>"
+            f"<td>{_e(', '.join(f'{k}: {fmt(v)}' for k, v in spin24[key]['errors'].items()) or '-')}</td>"
+            f"<td>{ms(spin24[key]['p50_ms'])} / {ms(spin24[key]['p95_ms'])} / {ms(spin24[key]['p99_ms'])}</td></tr>"
+            for key, label in (("spin.verify", "Doğrulama"), ("spin.commit", "Kaydet"), ("spin.redeem", "Tek adım"))
+        )
+        peak = max((v for _, v in e1001), default=0)
+        funnel_html = f"""
+        <section class="card funnelCard">
+          <div class="upHead">SPIN HUNİSİ (SON 24 SAAT)</div>
+          <div class="kpiSplitRow">
+            <div class="kpiMini"><span>Doğrulama → Kayıt</span><b>{'-' if conv is None else f'%{conv * 100:.1f}'}</b></div>
+            <div class="kpiMini"><span>Terk (süresi dolan)</span><b>{fmt(spin24['abandoned'])}</b></div>
+            <div class="kpiMini"><span>E1001 / dk (son 1 saat, tepe)</span><b>{fmt(peak)}</b></div>
+          </div>
+          <table class="funnelTbl">
+            <tr><th>Aşama</th><th>Başarılı</th><th>Hatalar</th><th>p50 / p95 / p99</th></tr>
+            {stage_rows}
+          </table>
+        </section>
+        """
+
     # Kompozisyon
     layout = f"""
     <div class="dashGrid">
@@ -161,6 +197,7 @@ def dashboard(
       </div>
     </div>
     {nxt_html}
+    {funnel_html}
     """
 
     style = """
@@ -209,6 +246,12 @@ def dashboard(
       .upRow{ display:flex; justify-content:space-between; align-items:center }
       .upLabel{ font-size:16px; font-weight:800; color:#fff }
       .upVal{ font-size:18px; font-weight:900; color:#fff }
+
+      /* --- SPIN HUNİSİ --- */
+      .funnelCard{ margin-top:16px; background:#0b0d13; }
+      .funnelTbl{ width:100%; border-collapse:collapse; margin-top:12px }
+      .funnelTbl th,.funnelTbl td{ padding:8px 6px; border-bottom:1px solid var(--line); text-align:left; white-space:nowrap }
+      .funnelTbl th{ color:var(--muted); font-size:12px; letter-spacing:.4px }
     </style>
     """
 
@@ -0,0 +1,54 @@
+# app/api/routers/outbox_sink.py
+# Yerel test alıcısı (OUTBOX_SINK=1): outbox dağıtıcısının gönderdiklerini imza kontrolüyle alır,
+# olay id'si ile tekilleştirir ve son olayları bellekte tutar. Üretimde açılmaz.
+#   OUTBOX_WEBHOOK_URL=http://127.0.0.1:8000/api/outbox/sink
+#   OUTBOX_SINK_FAIL_RATE=0.3 → isteklerin ~%30'u 500 döner (yeniden deneme/geri çekilme denemesi)
+import hmac
+import json
+import random
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Set
+
+from fastapi import APIRouter, Header, HTTPException, Request
+
+from app.core.config import settings
+from app.services import outbox
+
+router = APIRouter(prefix="/api/outbox/sink", tags=["outbox-sink"])
+
+_events: Deque[Dict] = deque(maxlen=1000)
+_seen: Set[int] = set()
+_stats = {"requests": 0, "received": 0, "duplicates": 0, "rejected": 0, "failed": 0}
+
+@router.post("")
+async def receive(
+    request: Request,
+    x_outbox_timestamp: Optional[str] = Header(default=None, alias="X-Outbox-Timestamp"),
+    x_outbox_signature: Optional[str] = Header(default=None, alias="X-Outbox-Signature"),
+):
+    body = await request.body()
+    _stats["requests"] += 1
+    ts = x_outbox_timestamp or ""
+    if (
+        not ts.isdigit()
+        or abs(time.time() - int(ts)) > 300
+        or not hmac.compare_digest(outbox.sign(body, ts), x_outbox_signature or "")
+    ):
+        _stats["rejected"] += 1
+        raise HTTPException(status_code=401, detail="invalid signature")
+    if random.random() < settings.OUTBOX_SINK_FAIL_RATE:
+        _stats["failed"] += 1
+        raise HTTPException(status_code=500, detail="injected failure")
+    for ev in json.loads(body).get("events", []):
+        if ev.get("id") in _seen:
+            _stats["duplicates"] += 1
+            continue
+        _seen.add(ev.get("id"))
+        _events.append(ev)
+        _stats["received"] += 1
+    return {"ok": True}
+
+@router.get("")
+def received(limit: int = 50):
+    return {**_stats, "events": list(_events)[-max(0, min(limit, 1000)):]}
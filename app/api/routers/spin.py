@@ -1,19 +1,26 @@
 # app/api/routers/spin.py
-from datetime import datetime, timezone
-from typing import Annotated, List, Optional, Tuple
-import secrets
+from typing import Annotated, Dict, List, Optional, Tuple
+import functools
+import hashlib
+import hmac
+import json
+import math
+import time
 
 from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import JSONResponse, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
 
-from app.db.models import Code, Prize, Spin, PrizeDistribution
+from app.core.config import settings
 from app.db.session import get_db
 # Şemalar type-hint için kalabilir ama response_model KULLANMIYORUZ
 from app.schemas.spin import VerifyIn, CommitIn  # VerifyOut yerine dict döneceğiz
 from app.schemas.prize import PrizeOut  # sadece referans
 
-from app.services.spin import RESERVED, new_token  # RESERVED: dict[code] -> token
+from app.services.spin import STORE, SpinError, check_code, claim_code, find_code, redeem, reserve, new_token, verify_draw  # STORE: code -> Reservation (TTL'li)
+from app.services.auth import get_current_admin
+from app.services.codes import check_failed, code_candidates
+from app.services import admission, metrics, outbox, prize_catalog, ratelimit, spin_audit, spin_partitions, spin_token
 
 router = APIRouter()
 
@@ -25,10 +32,17 @@ ERRORS = {
     "E1004": "Bu seviye için tanımlı dağılım yok.",
     "E1005": "Geçersiz veya süresi dolmuş doğrulama tokenı.",
     "E1006": "Kullanıcı adı ve kodu tekrar kontrol edin.",
+    "E1007": "Çok fazla deneme. Lütfen biraz sonra tekrar deneyin.",
+    "E1008": "Sistem şu an yoğun. Lütfen birkaç saniye sonra tekrar deneyin.",  # giriş kontrolü (503)
 }
-def raise_err(code: str, http_status: int) -> None:
-    msg = ERRORS.get(code, "Beklenmeyen hata.")
-    raise HTTPException(status_code=http_status, detail=f"{code}: {msg}")
+def err_detail(code: str) -> str:
+    return f"{code}: {ERRORS.get(code, 'Beklenmeyen hata.')}"
+
+def raise_err(code: str, http_status: int, headers: Optional[dict] = None) -> None:
+    raise HTTPException(status_code=http_status, detail=err_detail(code), headers=headers)
+
+def _retry_after(wait: float) -> dict:
+    return {"Retry-After": str(max(1, math.ceil(wait)))}
 
 # -------------------- helpers --------------------
 def _abs_url(request: Request, u: Optional[str]) -> Optional[str]:
@@ -46,11 +60,46 @@ def _abs_url(request: Request, u: Optional[str]) -> Optional[str]:
         return base + u
     return f"{base}/{u.lstrip('/')}"
 
-def _utcnow() -> datetime:
-    return datetime.now(timezone.utc)
+def _client_ip(request: Request) -> Optional[str]:
+    """İstemci IP'si: güvenilir proxy'nin eklediği hop (sağdan TRUSTED_PROXY_HOPS'uncu).
+
+    İlk hop'u istemci kendisi yazar; ona güvenilirse her istekte yeni bir IP kovası alınır.
+    Başlık yoksa ya da beklenenden kısaysa bağlantının karşı ucu.
+    """
+    peer = request.client.host if request.client else None
+    hops = settings.TRUSTED_PROXY_HOPS
+    if hops <= 0:
+        return peer
+    chain = [h.strip() for h in (request.headers.get("x-forwarded-for") or "").split(",") if h.strip()]
+    return chain[-hops] if len(chain) >= hops else peer
 
-# token -> (prize_id, wheel_index)
-CHOSEN: dict[str, Tuple[int, int]] = {}
+def _outcome(result) -> str:
+    # redeem hataları HTTP 200 + {"status": "E100x: ..."} döner; 429 JSONResponse ile
+    if isinstance(result, JSONResponse):
+        return "E1007" if result.status_code == 429 else "ok"
+    status = result.get("status") if isinstance(result, dict) else None
+    if isinstance(status, str) and status[:1] == "E" and ":" in status:
+        return status.split(":", 1)[0]
+    return "ok"
+
+def _observed(stage: str):
+    """Handler'ı metrics sayaçlarına bağlar: sonuç (ok / hata kodu) + gecikme."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            outcome = "exception"
+            try:
+                result = fn(*args, **kwargs)
+                outcome = _outcome(result)
+                return result
+            except HTTPException as e:
+                outcome = str(e.detail).split(":", 1)[0]
+                raise
+            finally:
+                metrics.observe(stage, outcome, time.perf_counter() - t0)
+        return wrapper
+    return deco
 
 # =========================================================
 # 1) PRİZELER: /api/prizes  (FE camelCase bekliyor)
@@ -60,93 +109,83 @@ def list_prizes(
     request: Request,
     db: Annotated[Session, Depends(get_db)],
 ):
-    rows = db.query(Prize).order_by(Prize.wheel_index).all()
-    # FE tipi: { id, label, wheelIndex, imageUrl }
-    return [
-        {
-            "id": p.id,
-            "label": p.label,
-            "wheelIndex": int(p.wheel_index),
-            "imageUrl": _abs_url(request, getattr(p, "image_url", None)),
-        }
-        for p in rows
-    ]
+    # FE tipi: { id, label, wheelIndex, imageUrl } — katalogdan, içerik sürümlü + ETag'li
+    body, etag = _prizes_snapshot(request, prize_catalog.get(db))
+    version = etag.strip('"')
+    if request.query_params.get("v") == version:
+        cache = "public, max-age=31536000, immutable"
+    else:
+        cache = f"public, max-age={settings.PRIZES_MAX_AGE}, stale-while-revalidate={settings.PRIZES_MAX_AGE * 10}"
+    headers = {"ETag": etag, "Cache-Control": cache, "X-Prizes-Version": version}
+    if _etag_match(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# base URL -> (katalog.prizes nesnesi, gövde, etag); katalog yeniden kurulunca prizes nesnesi değişir
+_PRIZES_SNAPSHOTS: Dict[str, Tuple[object, bytes, str]] = {}
+
+def _prizes_snapshot(request: Request, catalog) -> Tuple[bytes, str]:
+    base = _abs_url(request, "/") or ""
+    hit = _PRIZES_SNAPSHOTS.get(base)
+    if hit and hit[0] is catalog.prizes:
+        return hit[1], hit[2]
+    rows = sorted(catalog.prizes.values(), key=lambda p: (p.wheel_index, p.id))
+    body = json.dumps(
+        [
+            {"id": p.id, "label": p.label, "wheelIndex": int(p.wheel_index), "imageUrl": _abs_url(request, p.image_url)}
+            for p in rows
+        ],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+    etag = '"' + hashlib.sha256(body).hexdigest()[:20] + '"'
+    if len(_PRIZES_SNAPSHOTS) >= 16:  # host başlığı başına bir kopya; sınırsız büyümesin
+        _PRIZES_SNAPSHOTS.clear()
+    _PRIZES_SNAPSHOTS[base] = (catalog.prizes, body, etag)
+    return body, etag
+
+def _etag_match(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or any(t.removeprefix("W/") == etag for t in tags)
 
 # =========================================================
 # 2) DOĞRULAMA + ÖDÜL SEÇİMİ: /api/verify-spin (camelCase)
 # =========================================================
 @router.post("/verify-spin")
+@_observed("spin.verify")
 def verify_spin(
     payload: VerifyIn,
     db: Annotated[Session, Depends(get_db)],
     request: Request,
 ):
-    code = (payload.code or "").strip()
+    candidates = code_candidates(payload.code)
     username = (payload.username or "").strip()
 
-    row = db.get(Code, code)
-    if not row:
-        raise_err("E1001", 400)
-    if row.status == "used":
-        raise_err("E1002", 409)
-    if row.expires_at and row.expires_at < _utcnow():
-        raise_err("E1003", 410)
-    if row.username and row.username.strip() and row.username != username:
-        raise_err("E1006", 400)
-
-    # --- ÖDÜL SEÇİMİ ---
-    prize: Optional[Prize] = None
-
-    # 1) Manuel ödül
-    if getattr(row, "manual_prize_id", None):
-        pr = db.get(Prize, row.manual_prize_id)
-        if not pr or getattr(pr, "enabled", True) is False:
-            raise_err("E1004", 400)
-        prize = pr
-
-    # 2) Otomatik dağılım
-    if prize is None:
-        tier = (row.tier_key or "").strip()
-        if not tier:
-            if row.prize_id:
-                prize = db.get(Prize, row.prize_id)
-            else:
-                raise_err("E1004", 400)
-        else:
-            q = (
-                db.query(PrizeDistribution, Prize)
-                .join(Prize, Prize.id == PrizeDistribution.prize_id)
-                .filter(
-                    and_(
-                        PrizeDistribution.tier_key == tier,
-                        PrizeDistribution.enabled == True,  # noqa: E712
-                        Prize.enabled == True,              # noqa: E712
-                        PrizeDistribution.weight_bp > 0,
-                    )
-                )
-            )
-            items = q.all()
-            if not items:
-                raise_err("E1004", 400)
-
-            total = sum(int(pd.weight_bp or 0) for pd, _ in items)
-            pick = secrets.randbelow(total)
-            acc = 0
-            chosen: Optional[Prize] = None
-            for pd, pr in items:
-                acc += int(pd.weight_bp or 0)
-                if pick < acc:
-                    chosen = pr
-                    break
-            prize = chosen or items[-1][1]
-
-    if not prize:
-        raise_err("E1004", 400)
-
-    # Front animasyonu için token-kayıt
-    token = new_token()
-    RESERVED[code] = token
-    CHOSEN[token] = (prize.id, prize.wheel_index)
+    # Hız sınırı: DB'ye gitmeden ucuz 429 (uydurma kodlar da jeton harcar)
+    wait = ratelimit.check(_client_ip(request), username, candidates[0])
+    if wait > 0:
+        raise_err("E1007", 429, _retry_after(wait))
+
+    try:
+        found = find_code(db, candidates)
+        if found is None and check_failed(payload.code):
+            metrics.incr("codes.check_rejected")
+        row = check_code(found, username)
+        code = row.code
+        # --- ÖDÜL SEÇİMİ (önbellekli katalog + alias tablosu; join yok) ---
+        # deste slotu / stok adedi harcayan çekiliş koda bağlanır: tekrar verify aynı ödülü görür
+        prize = verify_draw(db, prize_catalog.get(db), row, username)
+    except SpinError as e:
+        raise_err(e.code, e.http_status)
+
+    # Front animasyonu için token: imzalı modda sunucuda durum tutulmaz
+    if spin_token.enabled():
+        token = spin_token.sign(code, prize.id, prize.wheel_index)
+    else:
+        token = new_token()
+        reserve(code, token, prize.id, prize.wheel_index)
 
     # FE beklediği camelCase alanları döndürüyoruz
     return {
@@ -160,55 +199,63 @@ def verify_spin(
 # 3) KULLANIMI TAMAMLA (KAYDET): /api/commit-spin
 # =========================================================
 @router.post("/commit-spin", response_model=None)
+@_observed("spin.commit")
 def commit_spin(
     payload: CommitIn,
     request: Request,
     db: Annotated[Session, Depends(get_db)],
 ):
-    code = (payload.code or "").strip()
+    candidates = code_candidates(payload.code)
     token = (payload.spinToken or "").strip()
 
-    row = db.get(Code, code)
-    if not row:
-        raise_err("E1001", 400)
-
-    # İdempotent
-    if row.status == "used":
-        return {"ok": True}
-
-    saved = RESERVED.get(code)
-    if not saved or saved != token:
-        raise_err("E1005", 400)
-
-    chosen = CHOSEN.get(token)
-    if chosen:
-        prize_id, _ = chosen
+    # 1) Token -> ödül (DB'ye gitmeden); kod, verify'da bulunan biçimdir
+    # İmzalı token (mod fark etmeksizin kabul: geçişte eski/yeni tokenlar birlikte yaşar)
+    prize_id: Optional[int] = None
+    code = candidates[0]
+    if spin_token.looks_signed(token):
+        claim = spin_token.load(token)
+        if claim and claim["c"] in candidates:
+            code, prize_id, spin_id = claim["c"], claim["p"], claim["s"]
     else:
-        prize_id = row.prize_id
-
+        for c in candidates:
+            saved = STORE.get(c)
+            if saved and saved.token == token:
+                code, prize_id, spin_id = c, saved.prize_id, token
+                break
     if not prize_id:
-        raise_err("E1004", 400)
+        return _unclaimed(db, candidates, "E1005", 400)
 
-    row.status = "used"
-    row.used_at = _utcnow()
-    row.prize_id = prize_id
-    db.add(row)
+    # 2) Atomik claim: tek koşullu UPDATE ... RETURNING; eşzamanlı commit'lerde tek kazanan
+    claimed = claim_code(db, code, prize_id)
+    if claimed is None:
+        return _unclaimed(db, [code], "E1003", 410)
 
-    spin = Spin(
-        id=token,
+    spin_audit.record(
+        db,
+        id=spin_id,
         code=code,
-        username=row.username or "",
+        username=claimed.username or "",
         prize_id=prize_id,
-        client_ip=request.headers.get("x-forwarded-for") or (request.client.host if request.client else None),
+        client_ip=_client_ip(request),
         user_agent=request.headers.get("user-agent"),
     )
-    db.add(spin)
+    outbox.spin_won(db, spin_id, code, claimed.username, prize_id, "commit")
     db.commit()
 
-    RESERVED.pop(code, None)
-    CHOSEN.pop(token, None)
+    STORE.pop(code)
     return {"ok": True}
 
+def _unclaimed(db: Session, candidates: List[str], err: str, http_status: int) -> dict:
+    """Claim yapılamadıysa nedeni: kod yok (E1001), zaten kullanılmış (idempotent ok) ya da `err`."""
+    db.rollback()
+    row = find_code(db, candidates)
+    if not row:
+        raise_err("E1001", 400)
+    if row.status == "used":
+        metrics.incr("spin.commit.replay")
+        return {"ok": True}
+    raise_err(err, http_status)
+
 # =========================================================
 # 4) UYUMLULUK KISAYOLLARI (opsiyonel)
 # =========================================================
@@ -220,15 +267,65 @@ class RedeemIn(VerifyIn):
   pass
 
 @router.post("/spin/redeem")
+@_observed("spin.redeem")
 def redeem_one_step(payload: RedeemIn, request: Request, db: Annotated[Session, Depends(get_db)]):
-  # verify
-  try:
-    vo = verify_spin(payload, db, request)
-  except HTTPException as e:
-    return {"status": str(e.detail)}
-  # commit
+  candidates = code_candidates(payload.code)
+  username = (payload.username or "").strip()
+  wait = ratelimit.check(_client_ip(request), username, candidates[0])
+  if wait > 0:
+    return JSONResponse({"status": err_detail("E1007")}, status_code=429, headers=_retry_after(wait))
+
+  # tek transaction: kilitle → çek → yaz (verify/commit ve token deposu yok)
   try:
-    commit_spin(CommitIn(code=payload.code, spinToken=vo["spinToken"]), request, db)
-  except HTTPException as e:
-    return {"status": str(e.detail)}
-  return {"status": "Tebrikler!", "prize": vo["prizeLabel"]}
+    prize = redeem(db, candidates, username, _client_ip(request), request.headers.get("user-agent"))
+  except SpinError as e:
+    db.rollback()
+    return {"status": err_detail(e.code)}
+  return {"status": "Tebrikler!", "prize": prize.label}
+
+# =========================================================
+# 5) İZLEME (process içi sayaçlar; worker başına) — admin oturumu ya da METRICS_TOKEN
+# =========================================================
+def _monitoring(request: Request, db: Annotated[Session, Depends(get_db)]) -> None:
+  token = settings.METRICS_TOKEN
+  if token:
+    auth = request.headers.get("authorization") or ""
+    given = auth[7:].strip() if auth[:7].lower() == "bearer " else (request.headers.get("x-metrics-token") or "")
+    if given and hmac.compare_digest(given.encode("utf-8"), token.encode("utf-8")):
+      return
+  get_current_admin(request, db)  # 401
+
+_MONITORING = [Depends(_monitoring)]
+
+@router.get("/spin/metrics", dependencies=_MONITORING)
+def spin_metrics():
+  live = metrics.snapshot()
+  return {
+    "funnel": metrics.funnel(live),
+    "counters": live,
+    "catalog": prize_catalog.stats(),
+    "audit": spin_audit.stats(),
+    "ratelimit": ratelimit.stats(),
+    "admission": admission.stats(),
+    "partitions": spin_partitions.stats(),
+  }
+
+@router.get("/spin/catalog/stats", dependencies=_MONITORING)
+def catalog_stats():
+  return prize_catalog.stats()
+
+@router.get("/spin/audit/stats", dependencies=_MONITORING)
+def audit_stats():
+  return spin_audit.stats()
+
+@router.get("/spin/admission/stats", dependencies=_MONITORING)
+def admission_stats():
+  return admission.stats()
+
+@router.get("/spin/outbox/stats", dependencies=_MONITORING)
+def outbox_stats():
+  return outbox.stats()
+
+@router.get("/spin/ratelimit/stats", dependencies=_MONITORING)
+def ratelimit_stats():
+  return ratelimit.stats()
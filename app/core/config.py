@@ -15,4 +15,102 @@ class Settings:
 
     CORS_ALLOW_ORIGINS: List[str] = ["*"]  # prod'da daralt
 
+    # Spin rezervasyon deposu: memory | postgres | redis
+    SPIN_STORE: str = os.getenv("SPIN_STORE", "memory")
+    SPIN_TOKEN_TTL: int = int(os.getenv("SPIN_TOKEN_TTL", "900"))          # sn
+    SPIN_STORE_SWEEP_SECONDS: int = int(os.getenv("SPIN_STORE_SWEEP_SECONDS", "60"))
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    # Spin token modu: store (rezervasyon deposu) | signed (HMAC imzalı, durumsuz)
+    SPIN_TOKEN_MODE: str = os.getenv("SPIN_TOKEN_MODE", "store")
+    # Ödül kataloğu sürüm kontrol aralığı (sn); diğer worker'lardaki admin değişiklikleri için
+    CATALOG_CHECK_SECONDS: float = float(os.getenv("CATALOG_CHECK_SECONDS", "5"))
+    # /api/prizes tarayıcı/CDN önbelleği (sn); ?v=<sürüm> ile çağrılırsa immutable (1 yıl)
+    PRIZES_MAX_AGE: int = int(os.getenv("PRIZES_MAX_AGE", "300"))
+    # Stoklu ödüllerde sayaç parça sayısı (eşzamanlı düşümde kilit çekişmesini böler)
+    PRIZE_STOCK_SHARDS: int = int(os.getenv("PRIZE_STOCK_SHARDS", "8"))
+
+    # Spin denetim kayıtları: async (write-behind kuyruk) | sync (istek içinde)
+    SPIN_AUDIT_MODE: str = os.getenv("SPIN_AUDIT_MODE", "async")
+    SPIN_AUDIT_BATCH: int = int(os.getenv("SPIN_AUDIT_BATCH", "500"))
+    SPIN_AUDIT_FLUSH_MS: int = int(os.getenv("SPIN_AUDIT_FLUSH_MS", "250"))
+    SPIN_AUDIT_QUEUE_MAX: int = int(os.getenv("SPIN_AUDIT_QUEUE_MAX", "50000"))
+    SPIN_AUDIT_FALLBACK_PATH: str = os.getenv("SPIN_AUDIT_FALLBACK_PATH", "spin_audit_fallback.ndjson")
+
+    # verify-spin / redeem hız sınırı: memory | postgres | off ; limitler "adet/saniye"
+    RATE_LIMIT_MODE: str = os.getenv("RATE_LIMIT_MODE", "memory")
+    RATE_LIMIT_IP: str = os.getenv("RATE_LIMIT_IP", "20/60")
+    RATE_LIMIT_USER: str = os.getenv("RATE_LIMIT_USER", "10/60")
+    RATE_LIMIT_PREFIX: str = os.getenv("RATE_LIMIT_PREFIX", "120/60")
+    RATE_LIMIT_PREFIX_LEN: int = int(os.getenv("RATE_LIMIT_PREFIX_LEN", "3"))
+    RATE_LIMIT_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+    # Uygulamanın önündeki güvenilir proxy sayısı: istemci IP'si X-Forwarded-For'un sağdan
+    # N'inci hop'u (her proxy sağa bir hop ekler; soldakiler istemcinin yazdığı, güvenilmez).
+    # 0 → başlık yok sayılır, bağlantının karşı ucu (request.client.host) kullanılır.
+    TRUSTED_PROXY_HOPS: int = int(os.getenv("TRUSTED_PROXY_HOPS", "1"))
+
+    # Admin dağılım simülatörü: istek başına üst sınır (kod × tekrar); numpy yoksa saf Python sınırı
+    PRIZE_SIM_MAX_SPINS: int = int(os.getenv("PRIZE_SIM_MAX_SPINS", "50000000"))
+    PRIZE_SIM_FALLBACK_MAX_SPINS: int = int(os.getenv("PRIZE_SIM_FALLBACK_MAX_SPINS", "1000000"))
+
+    # Spin hunisi sayaçlarının metric_rollups tablosuna yazılma aralığı (sn)
+    METRICS_FLUSH_SECONDS: float = float(os.getenv("METRICS_FLUSH_SECONDS", "60"))
+    # /api/spin/metrics ve /api/spin/*/stats: admin oturumu ya da bu token
+    # (Authorization: Bearer <token> veya X-Metrics-Token); boşsa yalnız admin oturumu
+    METRICS_TOKEN: str = os.getenv("METRICS_TOKEN", "")
+
+    # spins → saatlik/günlük özet işi: aralık (sn), gecikme payı (sn), tur başına parça (saat)
+    SPIN_ROLLUP_SECONDS: float = float(os.getenv("SPIN_ROLLUP_SECONDS", "300"))
+    SPIN_ROLLUP_LAG_SECONDS: int = int(os.getenv("SPIN_ROLLUP_LAG_SECONDS", "120"))
+    SPIN_ROLLUP_CHUNK_HOURS: int = int(os.getenv("SPIN_ROLLUP_CHUNK_HOURS", "24"))
+
+    # spins aylık partition (yalnız postgres; açıkken startup'ta bir kez çevrilir) + saklama/arşiv
+    SPINS_PARTITIONING: bool = os.getenv("SPINS_PARTITIONING", "0") == "1"
+    SPINS_PARTITION_AHEAD: int = int(os.getenv("SPINS_PARTITION_AHEAD", "2"))      # ay
+    SPINS_RETENTION_MONTHS: int = int(os.getenv("SPINS_RETENTION_MONTHS", "12"))   # 0 = arşivleme yok
+    SPINS_ARCHIVE_DIR: str = os.getenv("SPINS_ARCHIVE_DIR", "archive/spins")
+    SPINS_MAINTENANCE_SECONDS: float = float(os.getenv("SPINS_MAINTENANCE_SECONDS", "21600"))
+
+    # Kod süresi: formda boş bırakılırsa varsayılan TTL (saat; 0 = süresiz) + süpürücü aralık/parça
+    CODE_DEFAULT_TTL_HOURS: float = float(os.getenv("CODE_DEFAULT_TTL_HOURS", "0"))
+    CODE_EXPIRY_SWEEP_SECONDS: float = float(os.getenv("CODE_EXPIRY_SWEEP_SECONDS", "60"))
+    CODE_EXPIRY_BATCH: int = int(os.getenv("CODE_EXPIRY_BATCH", "1000"))
+    CODE_EXPIRY_MAX_BATCHES: int = int(os.getenv("CODE_EXPIRY_MAX_BATCHES", "50"))   # tur başına
+
+    # Spin uçları giriş kontrolü (worker başına): eşzamanlı işlem sınırı, FIFO kuyruk, bekleme (ms).
+    # Sınır DB havuzunun (5 + 10 taşma) altında tutulur ki admin/arka plan işleri de bağlantı bulsun.
+    SPIN_ADMISSION: bool = os.getenv("SPIN_ADMISSION", "1") == "1"
+    SPIN_ADMISSION_LIMIT: int = int(os.getenv("SPIN_ADMISSION_LIMIT", "12"))
+    SPIN_ADMISSION_QUEUE: int = int(os.getenv("SPIN_ADMISSION_QUEUE", "200"))
+    SPIN_ADMISSION_WAIT_MS: int = int(os.getenv("SPIN_ADMISSION_WAIT_MS", "2000"))
+    SPIN_ADMISSION_RETRY_AFTER: int = int(os.getenv("SPIN_ADMISSION_RETRY_AFTER", "2"))  # sn, en az
+
+    # Spin sonuçları outbox → ödeme/CRM webhook'u (URL boşsa outbox yazılmaz, dağıtıcı çalışmaz)
+    OUTBOX_WEBHOOK_URL: str = os.getenv("OUTBOX_WEBHOOK_URL", "")
+    OUTBOX_WEBHOOK_SECRET: str = os.getenv("OUTBOX_WEBHOOK_SECRET", "")   # boşsa SECRET_KEY
+    OUTBOX_DISPATCH_SECONDS: float = float(os.getenv("OUTBOX_DISPATCH_SECONDS", "2"))
+    OUTBOX_BATCH: int = int(os.getenv("OUTBOX_BATCH", "100"))
+    OUTBOX_MAX_BATCHES: int = int(os.getenv("OUTBOX_MAX_BATCHES", "20"))     # tur başına
+    OUTBOX_TIMEOUT: float = float(os.getenv("OUTBOX_TIMEOUT", "5"))
+    OUTBOX_LEASE_SECONDS: int = int(os.getenv("OUTBOX_LEASE_SECONDS", "60"))
+    OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "12"))
+    OUTBOX_BACKOFF_BASE: float = float(os.getenv("OUTBOX_BACKOFF_BASE", "2"))     # sn
+    OUTBOX_BACKOFF_MAX: float = float(os.getenv("OUTBOX_BACKOFF_MAX", "900"))     # sn
+    OUTBOX_RETENTION_HOURS: int = int(os.getenv("OUTBOX_RETENTION_HOURS", "72"))
+    # Toplu kod üretimi: istek başına üst sınır, çakışma denetimi parça boyu, çakışma turu
+    BULK_ISSUE_MAX: int = int(os.getenv("BULK_ISSUE_MAX", "500000"))
+    BULK_ISSUE_BATCH: int = int(os.getenv("BULK_ISSUE_BATCH", "2000"))
+    BULK_ISSUE_RETRIES: int = int(os.getenv("BULK_ISSUE_RETRIES", "5"))
+
+    # Kod biçimi: legacy (8 karakter) | checked (XXXX-XXXX-CC, anahtarlı kontrol karakterli; bkz. services/codes)
+    CODE_FORMAT: str = os.getenv("CODE_FORMAT", "legacy")
+    CODE_CHECK_SECRET: str = os.getenv("CODE_CHECK_SECRET", "")   # boşsa SECRET_KEY
+
+    # Kod CSV içe aktarımı: yazma parça boyu, raporda saklanan en fazla hatalı satır
+    IMPORT_BATCH: int = int(os.getenv("IMPORT_BATCH", "2000"))
+    IMPORT_MAX_ERRORS: int = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+
+    # Yerel test alıcısı /api/outbox/sink (yalnız geliştirme) + yapay hata oranı
+    OUTBOX_SINK: bool = os.getenv("OUTBOX_SINK", "0") == "1"
+    OUTBOX_SINK_FAIL_RATE: float = float(os.getenv("OUTBOX_SINK_FAIL_RATE", "0"))
+
 settings = Settings()
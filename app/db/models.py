@@ -1,10 +1,10 @@
 # app/db/models.py
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 import enum
 
 from sqlalchemy import (
-    Column, Integer, String, Text, DateTime, Boolean, ForeignKey,
-    text, Enum, JSON, Numeric
+    Column, Integer, BigInteger, String, Text, DateTime, Boolean, ForeignKey,
+    text, Enum, JSON, Numeric, Date, Index
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -54,12 +54,28 @@ class Code(Base):
     tier_key: Mapped[str | None] = mapped_column(String(32), nullable=True)
     # Kod oluştururken manuel ödül atanırsa (opsiyonel, tek seferlik)
     manual_prize_id: Mapped[int | None] = mapped_column(ForeignKey("prizes.id"), nullable=True)
+    # Kod oluştururken dağılımdan önceden çekilen ödül (verify'da çekiliş yapılmaz)
+    drawn_prize_id: Mapped[int | None] = mapped_column(ForeignKey("prizes.id", ondelete="SET NULL"), nullable=True)
 
     status: Mapped[str] = mapped_column(String(16), default="issued")  # issued|used|expired
     used_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     expires_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=text("now()"))
 
+    # Süre süpürücüsü yalnızca bekleyen kodların bitişine bakar (kısmi indeks).
+    # Kod tarayıcısı (created_at, code) DESC keyset'i; seviye/durum filtresi aynı sırayla.
+    # Postgres'e özel önek/trigram indeksleri main.py'deki migration'da.
+    __table_args__ = (
+        Index(
+            "ix_codes_issued_expires", "expires_at",
+            postgresql_where=text("status = 'issued'"),
+            sqlite_where=text("status = 'issued'"),
+        ),
+        Index("ix_codes_created_code", "created_at", "code"),
+        Index("ix_codes_tier_created", "tier_key", "created_at", "code"),
+        Index("ix_codes_status_created", "status", "created_at", "code"),
+    )
+
     # İLİŞKİLER
     prize = relationship(
         "Prize",
@@ -74,7 +90,7 @@ class Spin(Base):
     code: Mapped[str] = mapped_column(String(64))
     username: Mapped[str] = mapped_column(String(128))
     prize_id: Mapped[int] = mapped_column(Integer)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=text("now()"))
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=text("now()"), index=True)
     client_ip: Mapped[str | None] = mapped_column(Text, nullable=True)
     user_agent: Mapped[str | None] = mapped_column(Text, nullable=True)
 
@@ -227,3 +243,69 @@ class PrizeDistribution(Base):
 
     prize = relationship("Prize", back_populates="distributions")
     tier  = relationship("PrizeTier", back_populates="distributions")
+
+# --- DESTE MODU (seviye başına karıştırılmış ödül dizisi; kesin oranlar) ---
+class PrizeDeck(Base):
+    __tablename__ = "prize_decks"
+    tier_key: Mapped[str] = mapped_column(ForeignKey("prize_tiers.key", ondelete="CASCADE"), primary_key=True)
+    size: Mapped[int] = mapped_column(Integer, default=0)
+    pos: Mapped[int] = mapped_column(Integer, default=0)      # sıradaki slot (0..size-1, döner)
+    enabled: Mapped[bool] = mapped_column(Boolean, default=True)
+    built_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=text("now()"))
+
+class PrizeDeckSlot(Base):
+    __tablename__ = "prize_deck_slots"
+    tier_key: Mapped[str] = mapped_column(ForeignKey("prize_decks.tier_key", ondelete="CASCADE"), primary_key=True)
+    pos: Mapped[int] = mapped_column(Integer, primary_key=True)
+    prize_id: Mapped[int] = mapped_column(Integer)
+
+# --- STOK (ödül başına N parçalı sayaç; tek sıcak satır yerine rastgele parça düşülür) ---
+class PrizeStockShard(Base):
+    __tablename__ = "prize_stock_shards"
+    prize_id: Mapped[int] = mapped_column(ForeignKey("prizes.id", ondelete="CASCADE"), primary_key=True)
+    shard: Mapped[int] = mapped_column(Integer, primary_key=True)
+    remaining: Mapped[int] = mapped_column(Integer, default=0)
+
+# --- METRİKLER (process içi sayaçların dakikalık toplamları; bkz. services/metrics) ---
+class MetricRollup(Base):
+    __tablename__ = "metric_rollups"
+    bucket: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    name: Mapped[str] = mapped_column(String(96), primary_key=True)
+    value: Mapped[int] = mapped_column(BigInteger, default=0)
+
+# --- SPIN ÖZETLERİ (spins ⋈ codes.tier_key; artımlı toplanır, bkz. services/spin_rollup) ---
+class SpinRollupHourly(Base):
+    __tablename__ = "spin_rollups_hourly"
+    bucket: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)  # saat başı (UTC)
+    tier_key: Mapped[str] = mapped_column(String(32), primary_key=True)  # kod silinmişse ''
+    prize_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    spins: Mapped[int] = mapped_column(Integer, default=0)
+
+class SpinRollupDaily(Base):
+    __tablename__ = "spin_rollups_daily"
+    day: Mapped[date] = mapped_column(Date, primary_key=True)  # UTC gün
+    tier_key: Mapped[str] = mapped_column(String(32), primary_key=True)
+    prize_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    spins: Mapped[int] = mapped_column(Integer, default=0)
+
+# --- OUTBOX (spin sonuçları; claim ile aynı transaction'da yazılır, bkz. services/outbox) ---
+class OutboxEvent(Base):
+    __tablename__ = "spin_outbox"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    event: Mapped[str] = mapped_column(String(32))                      # spin.won
+    payload: Mapped[dict] = mapped_column(JSON)
+    status: Mapped[str] = mapped_column(String(16), default="pending")  # pending|sent|dead
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_utcnow)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_utcnow)
+    sent_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    # dağıtıcı yalnızca bekleyenleri sırayla okur
+    __table_args__ = (
+        Index(
+            "ix_spin_outbox_pending", "next_attempt_at", "id",
+            postgresql_where=text("status = 'pending'"),
+            sqlite_where=text("status = 'pending'"),
+        ),
+    )
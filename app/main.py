@@ -16,6 +16,8 @@ from sqlalchemy import text
 from app.core.config import settings
 from app.db.session import SessionLocal, engine
 from app.db.models import Base, Prize, Code
+from app.services import admission, code_expiry, jobs, metrics, outbox, ratelimit, spin_audit, spin_partitions, spin_rollup
+from app.services.spin_store import STORE as SPIN_STORE
 
 # ----------------------------- helpers -----------------------------
 def _normalize_origins(val: Union[str, List[str]]) -> List[str]:
@@ -39,15 +41,59 @@ def _is_postgres() -> bool:
         return False
 
 def _run_safe(conn, sql: str) -> None:
+    # her ifade kendi SAVEPOINT'inde: biri hata verirse (ör. yetki yok) transaction'daki
+    # önceki migration'lar geri alınmaz
     try:
-        conn.execute(text(sql))
+        with conn.begin_nested():
+            conn.execute(text(sql))
     except Exception:
         # İsterseniz burada print/log yapabilirsiniz
         pass
 
+# Büyük tablolardaki (codes, spins) indeksler: CREATE INDEX CONCURRENTLY yazmaları kilitlemez ama
+# transaction içinde çalışamaz → autocommit bağlantıda, her biri ayrı. Yarıda kalmış (INVALID)
+# bir önceki deneme IF NOT EXISTS'i atlatacağından önce silinir.
+_CONCURRENT_INDEXES = (
+    # spins.created_at: özet işi yalnızca yüksek su işaretinden sonrasını okur
+    ("ix_spins_created_at", "spins(created_at)"),
+    # kod süresi süpürücüsü: yalnız bekleyen kodlar (kısmi indeks)
+    ("ix_codes_issued_expires", "codes(expires_at) WHERE status = 'issued'"),
+    # kod tarayıcısı: keyset sırası + filtreler; önek araması (LIKE 'X%') ve kullanıcı içinde arama
+    ("ix_codes_created_code", "codes(created_at, code)"),
+    ("ix_codes_tier_created", "codes(tier_key, created_at, code)"),
+    ("ix_codes_status_created", "codes(status, created_at, code)"),
+    ("ix_codes_code_pattern", "codes(code text_pattern_ops)"),
+    ("ix_codes_username_trgm", "codes USING gin (lower(username) gin_trgm_ops)"),
+)
+
+def _run_autocommit(conn, sql: str) -> None:
+    # autocommit bağlantıda her ifade zaten ayrı; SAVEPOINT kullanılamaz
+    try:
+        conn.execute(text(sql))
+    except Exception:
+        pass
+
+def _create_indexes_concurrently() -> None:
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        # eklenti yoksa/yetki yoksa yalnız trigram indeksi oluşmaz
+        _run_autocommit(conn, "CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+        for name, target in _CONCURRENT_INDEXES:
+            invalid = conn.execute(text(
+                "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "JOIN pg_class t ON t.oid = i.indrelid "
+                "WHERE c.relname = :n AND t.relkind = 'r' AND NOT i.indisvalid"
+            ), {"n": name}).first()
+            if invalid:
+                _run_autocommit(conn, f"DROP INDEX CONCURRENTLY IF EXISTS {name};")
+            _run_autocommit(conn, f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {target};")
+
 # ----------------------------- app -----------------------------
 app = FastAPI()
 
+# Spin uçları giriş kontrolü (en içte: 503 yanıtları da CORS başlıklarını alır)
+if settings.SPIN_ADMISSION:
+    app.add_middleware(admission.AdmissionMiddleware)
+
 # CORS
 origins = _normalize_origins(settings.CORS_ALLOW_ORIGINS)
 app.add_middleware(
@@ -55,6 +101,7 @@ app.add_middleware(
     allow_origins=origins,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Prizes-Version"],  # /prizes: istemci katalog sürümünü okuyabilsin
     allow_credentials=True,
 )
 
@@ -142,6 +189,14 @@ try:
 except Exception:
     pass
 
+# Outbox test alıcısı (yalnız OUTBOX_SINK=1)
+if settings.OUTBOX_SINK:
+    try:
+        from app.api.routers.outbox_sink import router as outbox_sink_router
+        app.include_router(outbox_sink_router)  # /api/outbox/sink
+    except Exception:
+        pass
+
 # admin router en son (auth ve şablonlar buna bağlı)
 try:
     from app.api.routers.admin_mod import admin_router
@@ -169,7 +224,7 @@ async def _admin_auth_redirect(request: Request, exc: StarletteHTTPException):
         qs = ("?" + request.url.query) if request.url.query else ""
         nxt = quote(path + qs, safe="/:=&?")
         return RedirectResponse(url=f"/admin/login?next={nxt}", status_code=303)
-    return JSONResponse({"detail": exc.detail}, status_code=exc.status_code)
+    return JSONResponse({"detail": exc.detail}, status_code=exc.status_code, headers=getattr(exc, "headers", None))
 
 # ----------------------------- startup (safe migrations) -----------------------------
 @app.on_event("startup")
@@ -408,6 +463,44 @@ def on_startup() -> None:
               END IF;
             END $$;""")
 
+            # codes.drawn_prize_id (yoksa ekle) — kod oluştururken önceden çekilen ödül
+            _run_safe(conn, """
+            DO $$
+            BEGIN
+              IF NOT EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name='codes' AND column_name='drawn_prize_id'
+              ) THEN
+                EXECUTE 'ALTER TABLE codes ADD COLUMN drawn_prize_id INTEGER REFERENCES prizes(id) ON DELETE SET NULL';
+              END IF;
+            END $$;""")
+
+            # spin_reservations (verify→commit arası, çok worker için; WAL'a yazılmaz)
+            _run_safe(conn, """
+            CREATE UNLOGGED TABLE IF NOT EXISTS spin_reservations (
+              code VARCHAR(64) PRIMARY KEY,
+              token VARCHAR(64) NOT NULL,
+              prize_id INTEGER NOT NULL,
+              wheel_index INTEGER NOT NULL,
+              expires_at TIMESTAMPTZ NOT NULL
+            );""")
+            _run_safe(conn, "CREATE INDEX IF NOT EXISTS ix_spin_res_exp ON spin_reservations(expires_at);")
+
+            # rate_limits (paylaşılan token-bucket; RATE_LIMIT_MODE=postgres)
+            _run_safe(conn, """
+            CREATE UNLOGGED TABLE IF NOT EXISTS rate_limits (
+              key VARCHAR(200) PRIMARY KEY,
+              tokens DOUBLE PRECISION NOT NULL,
+              ts DOUBLE PRECISION NOT NULL
+            );""")
+
+    if _is_postgres():
+        _create_indexes_concurrently()
+
+    # spins aylık partition (SPINS_PARTITIONING=1); kendi transaction'ında, hata startup'ı durdurmasın
+    if spin_partitions.enabled():
+        spin_partitions.migrate()
+
     # Seed örnekleri (uygulama önce ayağa kalksın)
     with SessionLocal() as db:
         if db.query(Prize).count() == 0:
@@ -440,6 +533,41 @@ def on_startup() -> None:
                   SELECT 1 FROM prize_distributions pd WHERE pd.tier_key = pt.key
               );""")
 
+# ----------------------------- arka plan işleri -----------------------------
+@app.on_event("startup")
+def start_jobs() -> None:
+    # süresi dolan spin rezervasyonlarını temizle (commit'e dönmeyen verify = terk)
+    jobs.start_periodic(
+        "spin-reservations",
+        settings.SPIN_STORE_SWEEP_SECONDS,
+        lambda: metrics.incr("spin.abandoned", SPIN_STORE.sweep()),
+    )
+    # paylaşılan hız sınırı kovalarını temizle (yalnız postgres modunda iş yapar)
+    jobs.start_periodic("ratelimit-sweep", 600, ratelimit.sweep)
+    # spins write-behind kuyruğu; DB yazılamadığında dosyaya düşenler geri yazılır
+    spin_audit.replay()
+    spin_audit.start()
+    jobs.start_periodic("spin-audit-replay", 300, spin_audit.replay)
+    # spin hunisi sayaçları -> metric_rollups
+    jobs.start_periodic("metrics-flush", settings.METRICS_FLUSH_SECONDS, metrics.flush)
+    # spins -> saatlik/günlük özetler (raporlar bunlardan okur)
+    jobs.start_periodic("spin-rollup", settings.SPIN_ROLLUP_SECONDS, spin_rollup.run)
+    # süresi dolan kodlar -> status='expired' (parça parça, kısa transaction'lar)
+    jobs.start_periodic("code-expiry", settings.CODE_EXPIRY_SWEEP_SECONDS, code_expiry.sweep)
+    # spin sonuçları outbox -> webhook (+ gönderilmişleri saklama süresinden sonra sil)
+    if outbox.enabled():
+        jobs.start_periodic("outbox-dispatch", settings.OUTBOX_DISPATCH_SECONDS, outbox.dispatch)
+        jobs.start_periodic("outbox-purge", 3600, outbox.purge)
+    # spins bölümleri: ileri ay bölümleri + saklama süresi dolanları arşivle/sil
+    if spin_partitions.enabled():
+        jobs.start_periodic("spin-partitions", settings.SPINS_MAINTENANCE_SECONDS, spin_partitions.maintain)
+
+@app.on_event("shutdown")
+def stop_jobs() -> None:
+    jobs.stop_all()
+    spin_audit.stop()
+    metrics.flush()
+
 # ----------------------------- run dev -----------------------------
 if __name__ == "__main__":
     import uvicorn
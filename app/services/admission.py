@@ -0,0 +1,131 @@
+# app/services/admission.py
+# Spin uçları için giriş kontrolü (ASGI middleware): kampanya anında threadpool ve DB havuzu
+# tıkanmasın diye aynı anda en fazla SPIN_ADMISSION_LIMIT istek işlenir.
+#   - limit doluysa istek FIFO kuyruğunda en fazla SPIN_ADMISSION_WAIT_MS bekler
+#   - kuyruk (SPIN_ADMISSION_QUEUE) doluysa ya da bekleme süresi aşılırsa hemen 503 + Retry-After
+# Sınırlar worker başınadır (her uvicorn worker'ının kendi event loop'u ve kapısı vardır).
+# Sayaçlar: spin.admission.{admitted,queued,rejected,timeout} + spin.admission.wait.ms.* histogramı
+# (bekleme sonucu spin.admission.wait.ok / .err.timeout / .err.cancelled olarak ayrı sayılır).
+import asyncio
+import json
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, Tuple
+
+from app.core.config import settings
+from app.services import metrics
+
+PATHS: Tuple[str, ...] = ("/api/verify-spin", "/api/commit-spin", "/api/spin/redeem")
+BUSY = "E1008: Sistem şu an yoğun. Lütfen birkaç saniye sonra tekrar deneyin."  # spin router ERRORS ile aynı
+
+
+class Gate:
+    """Sabit kapasiteli kapı + sınırlı FIFO bekleme kuyruğu (tek event loop içinde, kilitsiz)."""
+
+    def __init__(self, limit: int, queue: int, wait: float) -> None:
+        self.limit = max(1, limit)
+        self.queue = max(0, queue)
+        self.wait = max(0.0, wait)
+        self.active = 0
+        self._waiters: "Deque[asyncio.Future[bool]]" = deque()
+
+    async def acquire(self) -> str:
+        """'ok' → slot alındı (release şart); 'rejected' / 'timeout' → alınmadı."""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return "ok"
+        if len(self._waiters) >= self.queue:
+            return "rejected"
+        fut: "asyncio.Future[bool]" = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        metrics.incr("spin.admission.queued")
+        t0 = time.perf_counter()
+        outcome = "ok"
+        try:
+            await asyncio.wait_for(fut, self.wait)
+            return outcome
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if fut.done() and not fut.cancelled():
+                # slot tam bu anda devredildi; kullanmadan geri ver
+                self.release()
+            try:
+                self._waiters.remove(fut)
+            except ValueError:
+                pass
+            if isinstance(e, asyncio.CancelledError):
+                outcome = "cancelled"
+                raise
+            outcome = "timeout"
+            return outcome
+        finally:
+            # bekleme histogramı sonuca göre: ok / timeout (503) / cancelled (istemci gitti)
+            metrics.observe("spin.admission.wait", outcome, time.perf_counter() - t0)
+
+    def release(self) -> None:
+        # slot boşalmadan sıradakine devredilir (active değişmez); sırada kimse yoksa düşer
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(True)
+                return
+        self.active -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"active": self.active, "waiting": len(self._waiters), "limit": self.limit, "queue": self.queue}
+
+
+GATE = Gate(
+    settings.SPIN_ADMISSION_LIMIT,
+    settings.SPIN_ADMISSION_QUEUE,
+    settings.SPIN_ADMISSION_WAIT_MS / 1000.0,
+)
+
+
+def _retry_after() -> str:
+    # kuyruk boyu / kapasite kadar tur; en az SPIN_ADMISSION_RETRY_AFTER sn
+    rounds = len(GATE._waiters) / GATE.limit
+    return str(max(settings.SPIN_ADMISSION_RETRY_AFTER, math.ceil(rounds * GATE.wait)))
+
+
+class AdmissionMiddleware:
+    """Yalnızca PATHS'e gelen HTTP isteklerini kapıdan geçirir; diğerleri doğrudan akar."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope.get("path") not in PATHS:
+            await self.app(scope, receive, send)
+            return
+        outcome = await GATE.acquire()
+        if outcome != "ok":
+            metrics.incr(f"spin.admission.{outcome}")
+            await _busy(scope, send)
+            return
+        metrics.incr("spin.admission.admitted")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            GATE.release()
+
+
+async def _busy(scope, send) -> None:
+    # redeem hataları {"status": ...}, diğer spin uçları HTTPException gibi {"detail": ...} döner
+    key = "status" if scope["path"].endswith("/redeem") else "detail"
+    body = json.dumps({key: BUSY}, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", _retry_after().encode()),
+            (b"cache-control", b"no-store"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def stats() -> Dict[str, object]:
+    return {**GATE.stats(), "enabled": settings.SPIN_ADMISSION}
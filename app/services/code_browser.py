@@ -0,0 +1,60 @@
+# app/services/code_browser.py
+# Admin kod tarayıcısı: filtreli, keyset sayfalı kod listesi.
+#
+# Sıra (created_at DESC, code DESC); sonraki sayfa OFFSET yerine son satırın (created_at, code)
+# ikilisinden devam eder: WHERE (created_at, code) < (:c, :k). Böylece derin sayfalar da ilk sayfa
+# kadar ucuzdur (ix_codes_created_code, seviye/durum filtresinde ix_codes_tier_created /
+# ix_codes_status_created üzerinden geriye indeks taraması, LIMIT n+1 satırda durur).
+# Toplam adet bilerek hesaplanmaz: on milyonlarca satırda COUNT(*) sayfanın kendisinden pahalıdır.
+# Filtreler dışa aktarımla ortaktır (exports.ExportFilter / code_filters).
+import base64
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+
+from app.db.models import Code
+from app.services.exports import ExportFilter, code_filters
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+@dataclass
+class Page:
+    rows: List[Code]
+    next_cursor: Optional[str]
+
+
+def encode_cursor(created_at: datetime, code: str) -> str:
+    raw = f"{created_at.isoformat()}|{code}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, str]]:
+    """Geçersiz imleç → None (ilk sayfa)."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        ts, code = raw.split("|", 1)
+        return datetime.fromisoformat(ts), code
+    except ValueError:
+        return None
+
+
+def page(db: Session, f: ExportFilter, cursor: Optional[str] = None, limit: int = PAGE_SIZE) -> Page:
+    limit = max(1, min(MAX_PAGE_SIZE, limit))
+    stmt = code_filters(select(Code), f)
+    after = decode_cursor(cursor)
+    if after:
+        stmt = stmt.where(tuple_(Code.created_at, Code.code) < after)
+    stmt = stmt.order_by(Code.created_at.desc(), Code.code.desc()).limit(limit + 1)
+    rows = list(db.scalars(stmt))
+    more = len(rows) > limit
+    rows = rows[:limit]
+    last = rows[-1] if rows else None
+    nxt = encode_cursor(last.created_at, last.code) if more and last.created_at else None
+    return Page(rows=rows, next_cursor=nxt)
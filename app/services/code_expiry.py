@@ -0,0 +1,100 @@
+# app/services/code_expiry.py
+# Süresi dolan kodları (status='issued' AND expires_at <= now()) 'expired' yapar.
+# Her parça kendi kısa transaction'ında en fazla CODE_EXPIRY_BATCH satırı günceller:
+#   postgres: UPDATE ... WHERE ctid IN (SELECT ctid ... LIMIT n FOR UPDATE SKIP LOCKED)
+#             (kısmi indeks ix_codes_issued_expires üzerinden; o an spin'de kilitli satırlar atlanır)
+#   diğer   : rowid ile aynı kalıp
+# Tur başına en fazla CODE_EXPIRY_MAX_BATCHES parça; kalan bir sonraki tura kalır.
+# Ödülü koda bağlanmış (verify'da ya da üretimde çekilmiş) stoklu ödüllerin adedi aynı
+# transaction'da stoğa geri verilir; stok döndüyse katalog sürümü artırılır. Seviye deste modundaysa
+# ödülün slotu da desteye geri konur (prize_deck.give_back). Slot ancak destenin o turda tüketilmiş
+# bölgesindeyse döner; önceki turdan kalan slot dönülmez ve tur o kadar kayar, bir sonraki
+# karıştırmada deste yine tam adetlerle başlar.
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.session import SessionLocal, engine
+from app.services import metrics, prize_catalog, prize_deck, prize_stock, spin
+
+_PG_SWEEP = text("""
+UPDATE codes SET status = 'expired'
+WHERE ctid IN (
+  SELECT ctid FROM codes
+  WHERE status = 'issued' AND expires_at <= now()
+  LIMIT :n
+  FOR UPDATE SKIP LOCKED
+)
+RETURNING drawn_prize_id, tier_key
+""")
+
+_LITE_SWEEP = text("""
+UPDATE codes SET status = 'expired'
+WHERE rowid IN (
+  SELECT rowid FROM codes
+  WHERE status = 'issued' AND expires_at <= :now
+  LIMIT :n
+)
+RETURNING drawn_prize_id, tier_key
+""")
+
+STATS = {"runs": 0, "expired": 0, "batches": 0, "stock_returned": 0, "slots_returned": 0}
+
+
+def _pg() -> bool:
+    return engine.dialect.name.lower() in ("postgresql", "postgres")
+
+
+def expires_at(ttl_hours: Optional[float]) -> Optional[datetime]:
+    """Verilen TTL (saat) ya da CODE_DEFAULT_TTL_HOURS'tan bitiş zamanı; 0/boş → süresiz."""
+    hours = settings.CODE_DEFAULT_TTL_HOURS if ttl_hours is None else ttl_hours
+    if not hours or hours <= 0:
+        return None
+    return datetime.now(timezone.utc) + timedelta(hours=hours)
+
+
+def sweep() -> int:
+    """Bir tur süpürme; 'expired' yapılan kod sayısı."""
+    n = max(1, settings.CODE_EXPIRY_BATCH)
+    total = 0
+    returned = 0
+    with SessionLocal() as db:
+        catalog = prize_catalog.get(db)
+    for _ in range(max(1, settings.CODE_EXPIRY_MAX_BATCHES)):
+        with engine.begin() as conn:
+            if _pg():
+                drawn = conn.execute(_PG_SWEEP, {"n": n}).all()
+            else:
+                # sqlite: DateTime sütunu metin; karşılaştırma SQLAlchemy'nin yazdığı biçimle
+                now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")
+                drawn = conn.execute(_LITE_SWEEP, {"n": n, "now": now}).all()
+            bound = [(int(p), (t or "").strip()) for p, t in drawn if p is not None]
+            slots: Dict[str, Counter] = {}
+            for pid, tier in bound:
+                if spin.uses_deck(catalog, tier):
+                    slots.setdefault(tier, Counter())[pid] += 1
+            for tier, counts in slots.items():
+                STATS["slots_returned"] += prize_deck.give_back(conn, tier, counts)
+            returned += prize_stock.give_back(conn, Counter(pid for pid, _ in bound))
+        done = len(drawn)
+        total += done
+        STATS["batches"] += 1
+        if done < n:
+            break
+    STATS["runs"] += 1
+    STATS["expired"] += total
+    if total:
+        metrics.incr("codes.expired", total)
+    if returned:
+        # tükenmiş sayılan ödül yeniden çekilebilir olsun (tüm worker'lar kataloğu yeniden kurar)
+        STATS["stock_returned"] += returned
+        with SessionLocal() as db:
+            prize_catalog.commit(db)
+    return total
+
+
+def stats() -> Dict[str, object]:
+    return dict(STATS)
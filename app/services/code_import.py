@@ -0,0 +1,152 @@
+# app/services/code_import.py
+# İş ortaklarından gelen önceden atanmış kod CSV'lerinin (kullanıcı, seviye, kod) akışla içe aktarımı.
+#
+# Gövde geldikçe parça parça beslenir (feed): artımlı UTF-8 çözücü, satırlara bölme, satır
+# doğrulama; geçerli satırlar IMPORT_BATCH'lik parçalarla INSERT ... ON CONFLICT (code) DO NOTHING
+# ile yazılır ve her parça ayrı commit edilir. Hatalı satır dosyayı durdurmaz; rapora eklenir
+# (ilk IMPORT_MAX_ERRORS tanesi saklanır, tümü sayılır). Bellekte en fazla bir parça tutulur.
+#
+# Başlık satırı varsa sütunlar adla eşlenir (username|kullanici, tier|tier_key|seviye, code|kod);
+# yoksa sıra: kullanıcı, seviye, kod. Seviye anahtar ya da etiketle verilebilir (katalogdan).
+# Not: satırlar satır sonundan bölünür; tırnak içinde satır sonu içeren alanlar desteklenmez.
+import codecs
+import csv
+import re
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services.codes import insert_new, normalize_code
+from app.services.prize_catalog import CatalogTier
+
+_HEADERS = {
+    "username": "username", "kullanici": "username", "kullanıcı": "username", "user": "username",
+    "tier": "tier", "tier_key": "tier", "seviye": "tier",
+    "code": "code", "kod": "code",
+}
+_SPACE = re.compile(r"\s")
+
+
+class Importer:
+    """Akış içe aktarıcı: feed(bayt) ... finish() → rapor."""
+
+    def __init__(self, tiers: Dict[str, CatalogTier], expires_at: Optional[datetime] = None) -> None:
+        self.tiers = {k: t for k, t in tiers.items() if t.enabled}
+        self.by_label = {t.label.casefold(): k for k, t in self.tiers.items()}
+        self.expires_at = expires_at
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="strict")
+        self._tail = ""
+        self._line = 0
+        self._cols: Optional[Tuple[int, int, int]] = None
+        self._batch: List[Dict] = []
+        self._lines: Dict[str, int] = {}  # parçadaki kod → satır no (parça içi tekrar + rapor)
+        self.total = 0
+        self.inserted = 0
+        self.error_count = 0
+        self.errors: List[Tuple[int, str, str]] = []
+
+    # ---- besleme ----
+    def feed(self, data: bytes) -> None:
+        try:
+            text = self._tail + self._decoder.decode(data)
+        except UnicodeDecodeError:
+            raise ValueError("Dosya UTF-8 değil.")
+        lines = text.split("\n")
+        self._tail = lines.pop()
+        for line in lines:
+            self._take(line)
+
+    def finish(self) -> Dict[str, object]:
+        try:
+            rest = self._tail + self._decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            raise ValueError("Dosya UTF-8 değil.")
+        self._tail = ""
+        if rest:
+            self._take(rest)
+        self._flush()
+        return self.report()
+
+    def report(self) -> Dict[str, object]:
+        return {
+            "total": self.total,
+            "inserted": self.inserted,
+            "errors": self.error_count,
+            "error_rows": [{"line": n, "code": c, "error": e} for n, c, e in self.errors],
+        }
+
+    # ---- satır ----
+    def _error(self, line: int, code: str, msg: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < settings.IMPORT_MAX_ERRORS:
+            self.errors.append((line, code, msg))
+
+    def _take(self, line: str) -> None:
+        self._line += 1
+        line = line.rstrip("\r")
+        if not line.strip():
+            return
+        try:
+            # tırnaksız satırda csv modülüne gerek yok (sıcak yol)
+            raw = line.split(",") if '"' not in line else next(csv.reader([line]))
+            fields = [f.strip() for f in raw]
+        except csv.Error as e:
+            self.total += 1
+            self._error(self._line, "", f"CSV hatası: {e}")
+            return
+        if self._cols is None:
+            self._cols = (0, 1, 2)
+            names = [_HEADERS.get(f.casefold()) for f in fields]
+            if "code" in names:
+                if "tier" not in names:
+                    raise ValueError("Başlıkta seviye sütunu yok.")
+                self._cols = (
+                    names.index("username") if "username" in names else -1,
+                    names.index("tier"),
+                    names.index("code"),
+                )
+                return
+        self.total += 1
+        u, t, c = self._cols
+        if len(fields) <= max(t, c):
+            self._error(self._line, "", "Eksik sütun.")
+            return
+        code, tier_raw = fields[c], fields[t]
+        username = (fields[u] if 0 <= u < len(fields) else "") or None
+        if not code or len(code) > 64 or _SPACE.search(code):
+            self._error(self._line, code, "Geçersiz kod.")
+            return
+        # kontrolü tutan checked kodlar kanonik yazılır; diğerleri (iş ortağı kodları) olduğu gibi
+        code = normalize_code(code)
+        tier = tier_raw if tier_raw in self.tiers else self.by_label.get(tier_raw.casefold())
+        if tier is None:
+            self._error(self._line, code, f"Geçersiz seviye: {tier_raw}")
+            return
+        if username and len(username) > 128:
+            self._error(self._line, code, "Kullanıcı adı çok uzun.")
+            return
+        if code in self._lines:
+            self._error(self._line, code, f"Dosyada tekrar (satır {self._lines[code]}).")
+            return
+        self._lines[code] = self._line
+        self._batch.append({
+            "code": code, "username": username, "tier_key": tier, "status": "issued",
+            "expires_at": self.expires_at,
+        })
+        if len(self._batch) >= settings.IMPORT_BATCH:
+            self._flush()
+
+    # ---- yazma ----
+    def _flush(self) -> None:
+        if not self._batch:
+            return
+        with SessionLocal() as db:
+            written = insert_new(db.connection(), self._batch)
+            db.commit()
+        self.inserted += len(written)
+        for r in self._batch:
+            if r["code"] not in written:
+                self._error(self._lines[r["code"]], r["code"], "Kod zaten var.")
+        self._batch = []
+        self._lines = {}
@@ -1,5 +1,287 @@
-import secrets, string
+# app/services/codes.py
+# Kod üretimi: tekil (gen_code) ve toplu (bulk_issue) + kod biçimi (normalize_code).
+#
+# CODE_FORMAT=legacy  : 8 karakter A-Z0-9 (eski davranış)
+# CODE_FORMAT=checked : XXXX-XXXX-CC, Crockford base32 (I/L/O/U yok). CC gövdenin anahtarlı
+#                       HMAC'inin ilk 10 biti: üretilen kodlar bununla tanınır (rastgele
+#                       tahminin geçme olasılığı 1/1024).
+#                       Kontrolü tutan girdi normalize edilir: büyük harf, boşluklar atılır,
+#                       O→0, I/L→1. Tutmayan ya da bu biçimde olmayan (eski/içe aktarılmış)
+#                       kodlar olduğu gibi DB'ye sorulur (bkz. code_candidates); aynı biçimdeki
+#                       iş ortağı kodları checked moda geçince de kullanılabilir kalır.
+#                       CODE_CHECK_SECRET değişirse verilmiş kodların hepsi geçersiz olur.
+#
+# Toplu üretim: kodlar parça parça (BULK_ISSUE_BATCH) çok satırlı
+# INSERT ... ON CONFLICT (code) DO NOTHING RETURNING code ile yazılır; dönmeyen (çakışan)
+# kodlar için yalnız o satırlara yeni kod üretilip tekrar denenir. Kodların yazımı tek
+# transaction'dır: hata olursa hiçbir kod yazılmaz. predraw çekilişleri parça başına kısa ayrı
+# transaction'larda alınır (deste/stok kilitleri canlı spin'leri bekletmez); kodlar yazılamazsa
+# slot ve adetler geri verilir.
+import hashlib
+import hmac
+import re
+import secrets
+import string
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models import Code, PrizeTier
+from app.db.session import SessionLocal, engine
+from app.services import code_expiry, prize_catalog, prize_deck, prize_stock
+from app.services.spin import SpinError, draw_many
+
+ALPHABET = string.ascii_uppercase + string.digits
+CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+
+def _byte_map(alphabet: str) -> Tuple[bytes, bytes]:
+    # bayt → alfabe: 256'nın alfabe boyuna bölünebilen kısmı eşit dağılır, üstü atılır
+    # (36 için 252; 32 için hepsi) → modulo yanlılığı yok
+    limit = 256 - 256 % len(alphabet)
+    return bytes(ord(alphabet[b % len(alphabet)]) for b in range(256)), bytes(range(limit, 256))
+
+
+_MAPS = {ALPHABET: _byte_map(ALPHABET), CROCKFORD: _byte_map(CROCKFORD)}
+# checked biçim (boşluklar atıldıktan sonra): tireli kesin, tiresiz 10 karakter olası
+_CHECKED = re.compile(r"^[0-9A-Z]{4}-[0-9A-Z]{4}-[0-9A-Z]{2}$")
+_COMPACT = re.compile(r"^[0-9A-Z]{10}$")
+_AMBIGUOUS = str.maketrans({"O": "0", "I": "1", "L": "1"})
+
+
+class IssueError(ValueError):
+    pass
+
+
+def checked_format() -> bool:
+    return (settings.CODE_FORMAT or "").strip().lower() == "checked"
+
+
+def _check(body: str) -> str:
+    secret = (settings.CODE_CHECK_SECRET or settings.SECRET_KEY).encode("utf-8")
+    v = int.from_bytes(hmac.new(secret, f"code:{body}".encode("ascii"), hashlib.sha256).digest()[:2], "big") >> 6
+    return CROCKFORD[v >> 5] + CROCKFORD[v & 31]
+
+
+def _checked(body: str) -> str:
+    return f"{body[:4]}-{body[4:]}-{_check(body)}"
+
+
+def _parse(raw: Optional[str]) -> Tuple[str, Optional[str], bool]:
+    """(kırpılmış girdi, kontrolü tutuyorsa kanonik checked biçim, girdi tireli checked biçimde mi)."""
+    code = (raw or "").strip()
+    if not checked_format():
+        return code, None, False
+    compact = "".join(code.split()).upper()
+    dashed = bool(_CHECKED.match(compact))
+    if not dashed and not _COMPACT.match(compact):
+        return code, None, False
+    body = compact.replace("-", "").translate(_AMBIGUOUS)
+    if all(ch in CROCKFORD for ch in body) and hmac.compare_digest(_check(body[:8]), body[8:]):
+        return code, _checked(body[:8]), dashed
+    return code, None, dashed
+
+
+def normalize_code(raw: Optional[str]) -> str:
+    """Kodun yazılacağı biçim (içe aktarma): tireli ve kontrolü tutan girdi kanonik biçime çevrilir.
+
+    Diğer her şey (kontrolü tutmayan, tiresiz 10 karakterlik) yalnızca kırpılır: eski ya da iş
+    ortağı kodu olabilir ve olduğu gibi saklanmalıdır.
+    """
+    code, canonical, dashed = _parse(raw)
+    return canonical if canonical and dashed else code
+
+
+def code_candidates(raw: Optional[str]) -> List[str]:
+    """İstemciden gelen kod için DB'de sırayla aranacak biçimler (ilki bulunan geçerlidir).
+
+    Kontrolü tutan girdi önce kanonik biçimde, sonra olduğu gibi aranır: kontrolü tesadüfen tutan
+    (~1/1024) 10 karakterlik eski kod da bulunur. Kontrolü tutmayan girdi reddedilmez, olduğu
+    gibi aranır (bkz. check_failed).
+    """
+    code, canonical, _ = _parse(raw)
+    return [canonical, code] if canonical and canonical != code else [code]
+
+
+def check_failed(raw: Optional[str]) -> bool:
+    """Girdi tireli checked biçimde ama kontrolü tutmuyor (büyük olasılıkla yazım hatası/uydurma)."""
+    _, canonical, dashed = _parse(raw)
+    return dashed and canonical is None
+
 
 def gen_code(n: int = 8) -> str:
+    if checked_format():
+        return _checked("".join(secrets.choice(CROCKFORD) for _ in range(8)))
     alphabet = string.ascii_uppercase + string.digits
     return "".join(secrets.choice(alphabet) for _ in range(n))
+
+
+def gen_codes(count: int, n: int = 8) -> List[str]:
+    """`count` adet birbirinden farklı rastgele kod (gen_code ile aynı biçim, toplu üretim)."""
+    checked = checked_format()
+    if checked:
+        n = 8
+    table, reject = _MAPS[CROCKFORD if checked else ALPHABET]
+    out: Dict[str, None] = {}
+    while len(out) < count:
+        need = (count - len(out)) * n
+        raw = secrets.token_bytes(need + need // 40 + 16).translate(table, reject).decode("ascii")
+        for i in range(0, len(raw) - n + 1, n):
+            out[_checked(raw[i:i + n]) if checked else raw[i:i + n]] = None
+            if len(out) == count:
+                break
+    return list(out)
+
+
+def split_by_ratio(total: int, ratios: Dict[str, float]) -> Dict[str, int]:
+    """En büyük kalan yöntemiyle `total`'ı oranlara böler (toplam tam olarak `total`)."""
+    weights = {k: float(v) for k, v in ratios.items() if float(v) > 0}
+    s = sum(weights.values())
+    if total <= 0 or s <= 0:
+        return {}
+    exact = {k: total * w / s for k, w in weights.items()}
+    out = {k: int(x) for k, x in exact.items()}
+    rest = total - sum(out.values())
+    for k in sorted(exact, key=lambda k: exact[k] - out[k], reverse=True)[:rest]:
+        out[k] += 1
+    return out
+
+
+def rows_by_ratio(total: int, ratios: Dict[str, float]) -> List[Tuple[Optional[str], str]]:
+    """(kullanıcı, seviye) satırları: seviyeler oranlara göre, sırayla."""
+    return [(None, tier) for tier, n in split_by_ratio(total, ratios).items() for _ in range(n)]
+
+
+def _pg() -> bool:
+    return engine.dialect.name.lower() in ("postgresql", "postgres")
+
+
+# executemany + RETURNING: SQLAlchemy "insertmanyvalues" ile çok satırlı VALUES'a paketlenir
+# (derlenmiş ifade önbellekte kalır; her parça için yeniden derleme yok)
+_INSERT = (
+    (postgresql.insert if _pg() else sqlite.insert)(Code.__table__)
+    .on_conflict_do_nothing(index_elements=["code"])
+    .returning(Code.__table__.c.code)
+)
+
+
+def _single_writer() -> bool:
+    # sqlite'ta ayrı bir yazma transaction'ı, kodları yazan açık transaction'ı bekler
+    return engine.dialect.name.lower() == "sqlite"
+
+
+def insert_new(conn, rows: List[Dict]) -> set:
+    """Çakışmayanları yazar; yazılan kodların kümesi."""
+    return set(conn.execute(_INSERT, rows).scalars())
+
+
+def bulk_issue(
+    db: Session,
+    rows: Iterable[Tuple[Optional[str], str]],
+    ttl_hours: Optional[float] = None,
+    predraw: bool = False,
+) -> List[Dict]:
+    """(kullanıcı, seviye) satırları için kod üretir, yazar ve commit eder; yazılan satırlar (sırayla).
+
+    Seviyeler etkin olmalı. `predraw` açıksa her kodun ödülü dağılımdan şimdi çekilir
+    (stoklu ödülde stok düşer): her parçanın çekilişi toplu (draw_many) ve kendi kısa
+    transaction'ında yapılır, deste/stok kilitleri canlı spin'leri toplu iş boyunca bekletmez.
+    Kodlar yazılamazsa alınan slot ve adetler geri verilir. Çakışan kodlar
+    BULK_ISSUE_RETRIES kez yeniden üretilir.
+    """
+    rows = list(rows)
+    if not rows:
+        raise IssueError("Üretilecek kod yok.")
+    if len(rows) > settings.BULK_ISSUE_MAX:
+        raise IssueError(f"En fazla {settings.BULK_ISSUE_MAX} kod üretilebilir.")
+    enabled = {t.key for t in db.query(PrizeTier).filter(PrizeTier.enabled.is_(True))}
+    bad = sorted({tier for _, tier in rows if tier not in enabled})
+    if bad:
+        raise IssueError(f"Geçersiz seviye: {', '.join(bad)}")
+
+    expires: Optional[datetime] = code_expiry.expires_at(ttl_hours)
+    catalog = prize_catalog.get(db) if predraw else None
+    decks: Dict[str, Dict[int, int]] = {}  # geri vermek için: seviye → {prize_id: slot}
+    stock: Dict[int, int] = {}
+    out: List[Dict] = []
+    batch = max(1, settings.BULK_ISSUE_BATCH)
+    try:
+        conn = db.connection()
+        for i in range(0, len(rows), batch):
+            part = rows[i:i + batch]
+            pending: List[Dict] = [
+                {"code": code, "username": username, "tier_key": tier, "status": "issued",
+                 "drawn_prize_id": None, "expires_at": expires}
+                for (username, tier), code in zip(part, gen_codes(len(part)))
+            ]
+            if catalog is not None:
+                _predraw(catalog, pending, decks, stock, conn if _single_writer() else None)
+            out += pending
+            for _ in range(settings.BULK_ISSUE_RETRIES + 1):
+                written = insert_new(conn, pending)
+                pending = [r for r in pending if r["code"] not in written]
+                if not pending:
+                    break
+                # yalnız çakışanlara yeni kod (sırası korunur; out aynı dict'leri tutar)
+                for r, code in zip(pending, gen_codes(len(pending))):
+                    r["code"] = code
+            else:
+                raise IssueError("Kod çakışmaları çözülemedi; kod uzunluğunu artırın.")
+        db.commit()
+    except BaseException:
+        db.rollback()
+        if decks or stock:
+            _give_back(decks, stock)
+        raise
+    return out
+
+
+def _predraw(catalog, pending: List[Dict], decks: Dict[str, Dict[int, int]], stock: Dict[int, int], conn=None) -> None:
+    """Parçanın ödüllerini seviye başına tek draw_many ile çeker.
+
+    `conn` verilmezse kendi kısa transaction'ında commit eder ve alınan slot/adetleri geri verme
+    listelerine yazar; verilirse (sqlite: tek yazar) kodlarla aynı transaction'dadır, geri alınınca
+    kendiliğinden döner.
+    """
+    if conn is None:
+        with engine.begin() as own:
+            drawn = _draw_part(catalog, pending, own)
+        # yalnız commit edilen çekilişler geri verilecekler listesine girer
+        for tier, deck, taken in drawn:
+            counts = decks.setdefault(tier, {})
+            for pid, n in deck.items():
+                counts[pid] = counts.get(pid, 0) + n
+            for pid, n in taken.items():
+                stock[pid] = stock.get(pid, 0) + n
+    else:
+        _draw_part(catalog, pending, conn)
+
+
+def _draw_part(catalog, pending: List[Dict], conn) -> List[Tuple[str, Dict[int, int], Dict[int, int]]]:
+    by_tier: Dict[str, List[Dict]] = {}
+    for r in pending:
+        by_tier.setdefault(r["tier_key"], []).append(r)
+    drawn = []
+    for tier, rs in by_tier.items():
+        try:
+            prizes, deck, taken = draw_many(catalog, tier, [r["code"] for r in rs], conn)
+        except SpinError:
+            raise IssueError(f"'{tier}' seviyesi için tanımlı dağılım yok.")
+        for r, pr in zip(rs, prizes):
+            r["drawn_prize_id"] = pr.id
+        drawn.append((tier, deck, taken))
+    return drawn
+
+
+def _give_back(decks: Dict[str, Dict[int, int]], stock: Dict[int, int]) -> None:
+    """Yazılamayan kodların slot ve adetlerini geri verir (stok döndüyse katalog sürümü artar)."""
+    with engine.begin() as conn:
+        for tier, counts in decks.items():
+            prize_deck.give_back(conn, tier, counts)
+        returned = prize_stock.give_back(conn, stock)
+    if returned:
+        with SessionLocal() as db:
+            prize_catalog.commit(db)
@@ -0,0 +1,131 @@
+# app/services/drift.py
+# Yapılandırılmış (weight_bp) ↔ gerçekleşen ödül dağılımı sapma raporu.
+#
+# Gerçekleşen adetler spin_rollups_daily'den tek GROUP BY ile okunur (ham spins taranmaz).
+# Seviye başına Pearson ki-kare uyum testi (p-değeri), ödül başına %95 Wilson güven aralığı.
+# Not: manuel atanan ödüller ve stoğu biten ödüller de gerçekleşene dahildir; rapor güncel
+# ağırlıklarla karşılaştırır (aralık içinde ağırlık değiştiyse sapma beklenir).
+import math
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.db.models import SpinRollupDaily
+from app.services import prize_catalog
+
+Z95 = 1.959963984540054
+
+
+def _gammainc_upper(a: float, x: float) -> float:
+    """Düzenlenmiş üst eksik gama Q(a, x) (seri / sürekli kesir)."""
+    if x <= 0:
+        return 1.0
+    lg = math.lgamma(a)
+    if x < a + 1:
+        term = total = 1.0 / a
+        n = a
+        for _ in range(1000):
+            n += 1
+            term *= x / n
+            total += term
+            if abs(term) < abs(total) * 1e-15:
+                break
+        return max(0.0, 1.0 - total * math.exp(-x + a * math.log(x) - lg))
+    # Lentz sürekli kesir
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for i in range(1, 1000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-15:
+            break
+    return min(1.0, math.exp(-x + a * math.log(x) - lg) * h)
+
+
+def chi2_sf(stat: float, df: int) -> float:
+    """Ki-kare dağılımının sağ kuyruğu: P(X ≥ stat)."""
+    if df <= 0:
+        return 1.0
+    return _gammainc_upper(df / 2.0, stat / 2.0)
+
+
+def wilson(k: int, n: int, z: float = Z95) -> Tuple[float, float]:
+    if n <= 0:
+        return 0.0, 1.0
+    p = k / n
+    den = 1 + z * z / n
+    mid = (p + z * z / (2 * n)) / den
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / den
+    return max(0.0, mid - half), min(1.0, mid + half)
+
+
+def actual_counts(db: Session, since: date, until: Optional[date] = None) -> Dict[str, Dict[int, int]]:
+    q = db.query(SpinRollupDaily.tier_key, SpinRollupDaily.prize_id, func.sum(SpinRollupDaily.spins)).filter(
+        SpinRollupDaily.day >= since
+    )
+    if until is not None:
+        q = q.filter(SpinRollupDaily.day < until)
+    out: Dict[str, Dict[int, int]] = {}
+    for tier, pid, n in q.group_by(SpinRollupDaily.tier_key, SpinRollupDaily.prize_id).all():
+        out.setdefault(tier, {})[int(pid)] = int(n or 0)
+    return out
+
+
+def report(db: Session, since: date, until: Optional[date] = None, alpha: float = 0.01) -> List[Dict[str, object]]:
+    """Seviye başına: toplam, ki-kare, p-değeri, uyarı ve ödül satırları (pay, beklenen, Wilson CI)."""
+    catalog = prize_catalog.get(db)
+    actual = actual_counts(db, since, until)
+    out: List[Dict[str, object]] = []
+    for tier in sorted(set(catalog.weights) | set(actual), key=lambda k: (catalog.tiers[k].sort if k in catalog.tiers else 1 << 30, k)):
+        weights = dict(catalog.weights.get(tier, []))
+        counts = actual.get(tier, {})
+        n = sum(counts.values())
+        total_w = sum(weights.values())
+        rows = []
+        stat = 0.0
+        df = -1
+        for pid in sorted(set(weights) | set(counts), key=lambda p: (catalog.prizes[p].wheel_index if p in catalog.prizes else 1 << 30, p)):
+            k = counts.get(pid, 0)
+            exp_share = weights.get(pid, 0) / total_w if total_w else 0.0
+            lo, hi = wilson(k, n)
+            if exp_share > 0 and n:
+                e = n * exp_share
+                stat += (k - e) ** 2 / e
+                df += 1
+            rows.append({
+                "prize_id": pid,
+                "label": catalog.prizes[pid].label if pid in catalog.prizes else str(pid),
+                "count": k,
+                "share": k / n if n else None,
+                "expected_share": exp_share,
+                "expected": n * exp_share,
+                "ci_low": lo,
+                "ci_high": hi,
+                # yapılandırılmış pay güven aralığının dışında mı (ağırlığı olmayan ama verilen ödül dahil)
+                "outside": bool(n) and not (lo <= exp_share <= hi),
+            })
+        p_value = chi2_sf(stat, df) if n and df > 0 else None
+        out.append({
+            "tier": tier,
+            "label": catalog.tiers[tier].label if tier in catalog.tiers else (tier or "-"),
+            "spins": n,
+            "chi2": stat if df > 0 else None,
+            "df": max(df, 0),
+            "p_value": p_value,
+            "drift": p_value is not None and p_value < alpha,
+            "unconfigured": sum(counts.get(pid, 0) for pid in counts if pid not in weights),
+            "prizes": rows,
+        })
+    return out
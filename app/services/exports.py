@@ -0,0 +1,145 @@
+# app/services/exports.py
+# codes / spins dışa aktarımı (CSV, NDJSON) — sabit bellekte akış.
+#
+# Sorgu sunucu taraflı imleçle (stream_results + yield_per) parça parça okunur; her parça tek
+# bir bayt bloğu olarak üretilir, böylece StreamingResponse ilk blokla hemen indirmeye başlar.
+# Üreteç kendi bağlantısını açar/kapatır (istek oturumu yanıt gönderilmeden kapanır).
+# Filtreler (kod öneki, kullanıcı, seviye, durum, tarih aralığı) ExportFilter ile paylaşılır;
+# bkz. code_query/spin_query (admin kod tarayıcısı da aynı filtreyi kullanır).
+import csv
+import io
+import json
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import Select, func, select
+
+from app.db.models import Code, Prize, Spin
+from app.db.session import engine
+
+CHUNK = 2000
+
+CODE_COLUMNS = ("code", "username", "tier_key", "status", "prize_id", "prize_label",
+                "manual_prize_id", "drawn_prize_id", "created_at", "used_at", "expires_at")
+SPIN_COLUMNS = ("id", "code", "username", "tier_key", "prize_id", "prize_label",
+                "created_at", "client_ip", "user_agent")
+
+
+class ExportError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class ExportFilter:
+    prefix: Optional[str] = None          # kod öneki
+    username: Optional[str] = None        # kullanıcı adı içinde geçen (büyük/küçük harf duyarsız)
+    tier: Optional[str] = None
+    status: Optional[str] = None          # yalnız codes
+    since: Optional[datetime] = None      # created_at >= since
+    until: Optional[datetime] = None      # created_at <  until
+
+
+def _day(raw: Optional[str], end: bool = False) -> Optional[datetime]:
+    """'YYYY-MM-DD' ya da ISO zaman; bitiş günü dahil (gün verilirse ertesi gün 00:00 UTC)."""
+    raw = (raw or "").strip()
+    if not raw:
+        return None
+    try:
+        if len(raw) == 10:
+            d = date.fromisoformat(raw) + timedelta(days=1 if end else 0)
+            return datetime.combine(d, time.min, tzinfo=timezone.utc)
+        dt = datetime.fromisoformat(raw)
+    except ValueError:
+        raise ExportError(f"Geçersiz tarih: {raw}")
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def parse_filter(params) -> ExportFilter:
+    """Sorgu parametrelerinden (prefix, username, tier, status, since, until) filtre."""
+    status = (params.get("status") or "").strip() or None
+    if status and status not in ("issued", "used", "expired"):
+        raise ExportError(f"Geçersiz durum: {status}")
+    return ExportFilter(
+        prefix=(params.get("prefix") or "").strip() or None,
+        username=(params.get("username") or "").strip() or None,
+        tier=(params.get("tier") or "").strip() or None,
+        status=status,
+        since=_day(params.get("since")),
+        until=_day(params.get("until"), end=True),
+    )
+
+
+def _esc(s: str) -> str:
+    return s.replace("/", "//").replace("%", "/%").replace("_", "/_")
+
+
+def code_filters(stmt: Select, f: ExportFilter) -> Select:
+    # desen Python'da kurulur (sabit): önek → ix_codes_code_pattern (text_pattern_ops),
+    # kullanıcı → ix_codes_username_trgm (lower(username) gin_trgm_ops); ikisi de yalnız postgres
+    if f.prefix:
+        stmt = stmt.where(Code.code.like(_esc(f.prefix) + "%", escape="/"))
+    if f.username:
+        stmt = stmt.where(func.lower(Code.username).like("%" + _esc(f.username.lower()) + "%", escape="/"))
+    if f.tier:
+        stmt = stmt.where(Code.tier_key == f.tier)
+    if f.status:
+        stmt = stmt.where(Code.status == f.status)
+    if f.since:
+        stmt = stmt.where(Code.created_at >= f.since)
+    if f.until:
+        stmt = stmt.where(Code.created_at < f.until)
+    return stmt
+
+
+def code_query(f: ExportFilter) -> Select:
+    return code_filters(select(*(getattr(Code, c) for c in CODE_COLUMNS if c != "prize_label")), f)
+
+
+def spin_query(f: ExportFilter) -> Select:
+    # seviye kodda tutulur; silinmiş kodların spinleri için outer join
+    stmt = select(
+        Spin.id, Spin.code, Spin.username, Code.tier_key, Spin.prize_id,
+        Spin.created_at, Spin.client_ip, Spin.user_agent,
+    ).outerjoin(Code, Code.code == Spin.code)
+    if f.prefix:
+        stmt = stmt.where(Spin.code.like(_esc(f.prefix) + "%", escape="/"))
+    if f.username:
+        stmt = stmt.where(func.lower(Spin.username).like("%" + _esc(f.username.lower()) + "%", escape="/"))
+    if f.tier:
+        stmt = stmt.where(Code.tier_key == f.tier)
+    if f.since:
+        stmt = stmt.where(Spin.created_at >= f.since)
+    if f.until:
+        stmt = stmt.where(Spin.created_at < f.until)
+    return stmt
+
+
+def _csv_block(rows: List[Dict], columns) -> bytes:
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    for r in rows:
+        w.writerow(["" if r.get(c) is None else r[c] for c in columns])
+    return buf.getvalue().encode("utf-8")
+
+
+def _ndjson_block(rows: List[Dict]) -> bytes:
+    return "".join(json.dumps(r, default=str, ensure_ascii=False) + "\n" for r in rows).encode("utf-8")
+
+
+def stream(kind: str, fmt: str, f: ExportFilter) -> Iterator[bytes]:
+    """kind: codes|spins, fmt: csv|ndjson. Bağlantı üreteç bitince (ya da kapanınca) bırakılır."""
+    columns = CODE_COLUMNS if kind == "codes" else SPIN_COLUMNS
+    stmt = code_query(f) if kind == "codes" else spin_query(f)
+    with engine.connect() as conn:
+        labels = dict(conn.execute(select(Prize.id, Prize.label)).all())
+        if fmt == "csv":
+            yield "\ufeff".encode("utf-8") + _csv_block([dict(zip(columns, columns))], columns)
+        result = conn.execution_options(stream_results=True, yield_per=CHUNK).execute(stmt)
+        for part in result.mappings().partitions():
+            rows = []
+            for m in part:
+                r = dict(m)
+                r["prize_label"] = labels.get(r.get("prize_id"))
+                rows.append(r)
+            yield _csv_block(rows, columns) if fmt == "csv" else _ndjson_block(rows)
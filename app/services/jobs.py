@@ -0,0 +1,36 @@
+# app/services/jobs.py
+# Arka plan periyodik işleri (daemon thread). Startup'ta başlatılır, shutdown'da durdurulur.
+import logging
+import threading
+from typing import Callable, Dict
+
+logger = logging.getLogger("uvicorn")
+
+_STOP = threading.Event()
+_THREADS: Dict[str, threading.Thread] = {}
+
+
+def start_periodic(name: str, interval: float, fn: Callable[[], object]) -> None:
+    """`fn`'i her `interval` saniyede bir çalıştırır; hata işi durdurmaz."""
+    t = _THREADS.get(name)
+    if t and t.is_alive():
+        return
+
+    def _loop() -> None:
+        while not _STOP.wait(interval):
+            try:
+                fn()
+            except Exception:
+                logger.exception(f"[JOB] {name} hata verdi")
+
+    t = threading.Thread(target=_loop, name=f"job:{name}", daemon=True)
+    _THREADS[name] = t
+    t.start()
+
+
+def stop_all(timeout: float = 5.0) -> None:
+    _STOP.set()
+    for t in list(_THREADS.values()):
+        t.join(timeout)
+    _THREADS.clear()
+    _STOP.clear()
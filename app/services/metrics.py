@@ -0,0 +1,151 @@
+# app/services/metrics.py
+# Process içi sayaçlar + gecikme histogramları (spin hunisi, hata kodları).
+#
+# Sıcak yolda kilit yok: her thread kendi sayaç sözlüğüne yazar (tek yazar), okuma tüm thread
+# sözlüklerini toplar. Kilit yalnız bir thread'in ilk yazışında (kayıt) alınır. Histogram da
+# sabit kovalı (ms) sayaç kümesidir. Periyodik `flush()` son flush'tan bu yana oluşan farkları
+# metric_rollups tablosuna dakika kovası başına toplayarak yazar (worker'lar aynı satırı artırır).
+#
+# Adlar: spin.<aşama>.ok | spin.<aşama>.err.<E100x> | spin.<aşama>.ms.le_<kova> | spin.abandoned ...
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.db.session import engine
+
+logger = logging.getLogger("uvicorn")
+
+# histogram kova üst sınırları (ms); sonuncusu taşma
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+_LABELS = tuple(f"le_{b}" for b in BUCKETS_MS) + ("le_inf",)
+
+_local = threading.local()
+_shards: List[Dict[str, int]] = []  # thread başına sayaçlar (thread bitse de değerleri kalır)
+_shards_lock = threading.Lock()
+_flushed: Dict[str, int] = {}
+_flush_lock = threading.Lock()
+
+_UPSERT = text("""
+INSERT INTO metric_rollups(bucket, name, value) VALUES (:b, :n, :v)
+ON CONFLICT (bucket, name) DO UPDATE SET value = metric_rollups.value + EXCLUDED.value
+""")
+
+
+def _mine() -> Dict[str, int]:
+    d = getattr(_local, "counts", None)
+    if d is None:
+        d = _local.counts = {}
+        with _shards_lock:
+            _shards.append(d)
+    return d
+
+
+def incr(name: str, n: int = 1) -> None:
+    d = _mine()
+    d[name] = d.get(name, 0) + n
+
+
+def observe(stage: str, outcome: str, seconds: float) -> None:
+    """Aşama sonucu + gecikme: outcome 'ok' ya da hata kodu (E1001...)."""
+    incr(f"{stage}.ok" if outcome == "ok" else f"{stage}.err.{outcome}")
+    ms = seconds * 1000.0
+    for b, label in zip(BUCKETS_MS, _LABELS):
+        if ms <= b:
+            break
+    else:
+        label = _LABELS[-1]
+    incr(f"{stage}.ms.{label}")
+
+
+def snapshot() -> Dict[str, int]:
+    with _shards_lock:
+        shards = list(_shards)
+    out: Dict[str, int] = {}
+    for d in shards:
+        for k, v in list(d.items()):  # sahibi yazarken de güvenli kopya (C düzeyinde tek adım)
+            out[k] = out.get(k, 0) + v
+    return out
+
+
+def _minute(now: datetime) -> datetime:
+    return now.replace(second=0, microsecond=0)
+
+
+def flush() -> int:
+    """Son flush'tan beri artan sayaçları metric_rollups'a ekler; yazılan satır sayısını döner."""
+    with _flush_lock:
+        cur = snapshot()
+        deltas = {k: v - _flushed.get(k, 0) for k, v in cur.items()}
+        rows = [{"b": _minute(datetime.now(timezone.utc)), "n": k, "v": d} for k, d in deltas.items() if d > 0]
+        if not rows:
+            return 0
+        try:
+            with engine.begin() as conn:
+                conn.execute(_UPSERT, rows)
+        except Exception:
+            logger.exception("[METRICS] flush başarısız; farklar bir sonraki turda denenecek")
+            return 0
+        _flushed.update(cur)
+        return len(rows)
+
+
+def percentile(hist: Dict[str, int], p: float) -> Optional[float]:
+    """Kova sayılarından yaklaşık yüzdelik (kova üst sınırı, ms); taşma kovası → None."""
+    total = sum(hist.get(l, 0) for l in _LABELS)
+    if not total:
+        return None
+    rank = p / 100.0 * total
+    acc = 0
+    for b, label in zip(BUCKETS_MS + (None,), _LABELS):
+        acc += hist.get(label, 0)
+        if acc >= rank:
+            return float(b) if b is not None else None
+    return None
+
+
+def funnel(values: Dict[str, int], stages: Iterable[str] = ("spin.verify", "spin.commit", "spin.redeem")) -> Dict[str, object]:
+    """Sayaç sözlüğünden (canlı ya da tablodan toplanmış) aşama özeti + verify→commit dönüşümü."""
+    out: Dict[str, object] = {}
+    for st in stages:
+        errs = {k[len(st) + 5:]: v for k, v in values.items() if k.startswith(f"{st}.err.")}
+        hist = {k[len(st) + 4:]: v for k, v in values.items() if k.startswith(f"{st}.ms.")}
+        out[st] = {
+            "ok": values.get(f"{st}.ok", 0),
+            "errors": dict(sorted(errs.items())),
+            "p50_ms": percentile(hist, 50),
+            "p95_ms": percentile(hist, 95),
+            "p99_ms": percentile(hist, 99),
+        }
+    # commit.ok idempotent tekrarları (zaten kullanılmış kod → ok) da içerir; dönüşümde düşülür
+    replays = values.get("spin.commit.replay", 0)
+    v_ok = values.get("spin.verify.ok", 0)
+    c_ok = values.get("spin.commit.ok", 0) - replays
+    out["conversion"] = round(c_ok / v_ok, 4) if v_ok else None
+    out["abandoned"] = values.get("spin.abandoned", 0)
+    out["replays"] = replays
+    return out
+
+
+def read_rollups(db, since: datetime) -> Dict[str, int]:
+    """metric_rollups'tan `since` sonrası toplamlar (tüm worker'lar)."""
+    rows = db.execute(
+        text("SELECT name, SUM(value) FROM metric_rollups WHERE bucket >= :s GROUP BY name"),
+        {"s": since},
+    ).all()
+    return {n: int(v or 0) for n, v in rows}
+
+
+def read_series(db, name_prefix: str, since: datetime) -> List[Tuple[datetime, int]]:
+    """Dakika kovası başına toplam (ör. brute-force izlemek için spin.verify.err.E1001)."""
+    rows = db.execute(
+        text("SELECT bucket, SUM(value) FROM metric_rollups WHERE bucket >= :s AND name LIKE :p GROUP BY bucket ORDER BY bucket"),
+        {"s": since, "p": name_prefix + "%"},
+    ).all()
+    return [(b, int(v or 0)) for b, v in rows]
+
+
+def last(db, hours: float = 24) -> Dict[str, int]:
+    return read_rollups(db, datetime.now(timezone.utc) - timedelta(hours=hours))
@@ -0,0 +1,206 @@
+# app/services/outbox.py
+# Spin sonuçlarını ödeme/CRM sistemine ileten transactional outbox.
+#
+#   enqueue()  : commit_spin / redeem içinde, kod claim'i ile AYNI transaction'da spin_outbox'a
+#                satır ekler (commit olmazsa olay da yok; istek yoluna tek INSERT ekler, ağ yok).
+#   dispatch() : arka plan işi. Bekleyen satırları OUTBOX_BATCH'lik parçalarla kısa süreli
+#                kiralar (next_attempt_at ileri alınır; postgres'te FOR UPDATE SKIP LOCKED ile
+#                worker'lar aynı satırı almaz), OUTBOX_WEBHOOK_URL'e tek POST ile gönderir.
+#                2xx → sent; aksi halde üstel geri çekilme (jitter'lı), OUTBOX_MAX_ATTEMPTS
+#                denemeden sonra dead.
+# Teslim en-az-bir-kez: alıcı olay id'si ile tekilleştirmelidir. İstek gövdesi
+# X-Outbox-Signature: sha256=HMAC(secret, "<timestamp>.<gövde>") ile imzalanır.
+import hashlib
+import hmac
+import json
+import logging
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import httpx
+from sqlalchemy import bindparam, delete, func, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models import OutboxEvent
+from app.db.session import SessionLocal, engine
+from app.services import metrics, prize_catalog
+
+logger = logging.getLogger("uvicorn")
+
+_T = OutboxEvent.__table__
+STATS = {"sent": 0, "failed": 0, "dead": 0, "batches": 0, "last_error": None}
+
+_RETRY = (
+    _T.update()
+    .where(_T.c.id == bindparam("b_id"))
+    .values(
+        attempts=bindparam("b_attempts"),
+        status=bindparam("b_status"),
+        next_attempt_at=bindparam("b_next"),
+        last_error=bindparam("b_error"),
+    )
+)
+
+
+def enabled() -> bool:
+    return bool(settings.OUTBOX_WEBHOOK_URL)
+
+
+def enqueue(db: Session, event: str, payload: Dict[str, object]) -> None:
+    """Olayı çağıranın transaction'ına ekler (commit çağırana aittir)."""
+    if not enabled():
+        return
+    now = datetime.now(timezone.utc)
+    db.add(OutboxEvent(event=event, payload=payload, status="pending", attempts=0,
+                       next_attempt_at=now, created_at=now))
+
+
+def spin_won(db: Session, spin_id: str, code: str, username: Optional[str], prize_id: int, channel: str) -> None:
+    """Kazanılan ödül olayı (commit_spin: channel='commit', redeem: 'redeem')."""
+    if not enabled():
+        return
+    prize = prize_catalog.get(db).prizes.get(prize_id)
+    enqueue(db, "spin.won", {
+        "spin_id": spin_id,
+        "code": code,
+        "username": username or "",
+        "prize_id": prize_id,
+        "prize_label": prize.label if prize else None,
+        "channel": channel,
+    })
+
+
+def sign(body: bytes, ts: str) -> str:
+    secret = (settings.OUTBOX_WEBHOOK_SECRET or settings.SECRET_KEY).encode("utf-8")
+    return "sha256=" + hmac.new(secret, ts.encode("ascii") + b"." + body, hashlib.sha256).hexdigest()
+
+
+def _backoff(attempts: int) -> float:
+    base = settings.OUTBOX_BACKOFF_BASE * (2 ** max(0, attempts - 1))
+    return min(settings.OUTBOX_BACKOFF_MAX, base) * random.uniform(0.5, 1.0)
+
+
+def _lease(now: datetime) -> List:
+    """Sıradaki parçayı kiralar: (id, event, payload, attempts, created_at) satırları."""
+    ids = (
+        select(OutboxEvent.id)
+        .where(OutboxEvent.status == "pending", OutboxEvent.next_attempt_at <= now)
+        .order_by(OutboxEvent.id)
+        .limit(max(1, settings.OUTBOX_BATCH))
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        update(OutboxEvent)
+        .where(OutboxEvent.id.in_(ids.scalar_subquery()))
+        .values(next_attempt_at=now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS))
+        .returning(OutboxEvent.id, OutboxEvent.event, OutboxEvent.payload,
+                   OutboxEvent.attempts, OutboxEvent.created_at)
+        .execution_options(synchronize_session=False)
+    )
+    with engine.begin() as conn:
+        return sorted(conn.execute(stmt).all(), key=lambda r: r.id)
+
+
+def _post(client: httpx.Client, rows: List) -> Optional[str]:
+    """Parçayı gönderir; başarılıysa None, değilse hata metni."""
+    body = json.dumps({
+        "events": [
+            {"id": r.id, "type": r.event, "created_at": r.created_at, "data": r.payload}
+            for r in rows
+        ]
+    }, default=str, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    ts = str(int(time.time()))
+    try:
+        resp = client.post(settings.OUTBOX_WEBHOOK_URL, content=body, headers={
+            "Content-Type": "application/json",
+            "X-Outbox-Timestamp": ts,
+            "X-Outbox-Signature": sign(body, ts),
+        })
+    except httpx.HTTPError as e:
+        return f"{type(e).__name__}: {e}"[:500]
+    if 200 <= resp.status_code < 300:
+        return None
+    return f"HTTP {resp.status_code}: {resp.text[:200]}"
+
+
+def _mark(rows: List, error: Optional[str], now: datetime) -> None:
+    with engine.begin() as conn:
+        if error is None:
+            conn.execute(
+                update(OutboxEvent)
+                .where(OutboxEvent.id.in_([r.id for r in rows]))
+                .values(status="sent", sent_at=now, attempts=OutboxEvent.attempts + 1, last_error=None)
+                .execution_options(synchronize_session=False)
+            )
+            return
+        params = []
+        for r in rows:
+            attempts = r.attempts + 1
+            dead = attempts >= settings.OUTBOX_MAX_ATTEMPTS
+            params.append({
+                "b_id": r.id,
+                "b_attempts": attempts,
+                "b_status": "dead" if dead else "pending",
+                "b_next": now + timedelta(seconds=_backoff(attempts)),
+                "b_error": error,
+            })
+        conn.execute(_RETRY, params)
+    dead = sum(1 for p in params if p["b_status"] == "dead")
+    if dead:
+        STATS["dead"] += dead
+        metrics.incr("outbox.dead", dead)
+        logger.error(f"[OUTBOX] {dead} olay {settings.OUTBOX_MAX_ATTEMPTS} denemeden sonra bırakıldı: {error}")
+
+
+def dispatch() -> int:
+    """Bir tur: en fazla OUTBOX_MAX_BATCHES parça; gönderilen olay sayısı. Hata turu bitirir."""
+    if not enabled():
+        return 0
+    sent = 0
+    with httpx.Client(timeout=settings.OUTBOX_TIMEOUT) as client:
+        for _ in range(max(1, settings.OUTBOX_MAX_BATCHES)):
+            rows = _lease(datetime.now(timezone.utc))
+            if not rows:
+                break
+            error = _post(client, rows)
+            _mark(rows, error, datetime.now(timezone.utc))
+            STATS["batches"] += 1
+            if error is not None:
+                STATS["failed"] += len(rows)
+                STATS["last_error"] = error
+                metrics.incr("outbox.failed", len(rows))
+                logger.warning(f"[OUTBOX] {len(rows)} olay gönderilemedi: {error}")
+                break
+            sent += len(rows)
+            STATS["sent"] += len(rows)
+            metrics.incr("outbox.sent", len(rows))
+            if len(rows) < settings.OUTBOX_BATCH:
+                break
+    return sent
+
+
+def purge() -> int:
+    """Saklama süresini aşan gönderilmiş olayları parça parça siler."""
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.OUTBOX_RETENTION_HOURS)
+    total = 0
+    while True:
+        ids = (
+            select(OutboxEvent.id)
+            .where(OutboxEvent.status == "sent", OutboxEvent.sent_at < cutoff)
+            .limit(5000)
+        )
+        with engine.begin() as conn:
+            n = conn.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(ids.scalar_subquery()))).rowcount or 0
+        total += n
+        if n < 5000:
+            return total
+
+
+def stats() -> Dict[str, object]:
+    # yalnız bekleyenler sayılır (kısmi indeks); sent/dead tüm tabloyu taramayı gerektirir
+    with SessionLocal() as db:
+        pending = db.query(func.count(OutboxEvent.id)).filter(OutboxEvent.status == "pending").scalar()
+    return {**STATS, "enabled": enabled(), "pending": int(pending or 0)}
@@ -0,0 +1,222 @@
+# app/services/prize_catalog.py
+# Sürümlü, process içi ödül kataloğu + seviye başına Vose alias tablosu.
+# verify-spin her istekte PrizeDistribution ⋈ Prize join'i yapmak yerine buradan O(1) çeker.
+#
+# Sürüm: SiteConfig.key='prize_catalog_version'. Admin tarafı değişiklikte `commit(db)` çağırır
+# (sürümü aynı transaction'da artırır + yerel kopyayı düşürür). Diğer worker'lar sürümü en geç
+# CATALOG_CHECK_SECONDS içinde (tek PK okuması) fark edip yeniden kurar.
+import secrets
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from uuid import uuid4
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models import Prize, PrizeDeck, PrizeDistribution, PrizeStockShard, PrizeTier, SiteConfig
+
+VERSION_KEY = "prize_catalog_version"
+
+
+@dataclass(frozen=True)
+class CatalogPrize:
+    id: int
+    label: str
+    wheel_index: int
+    image_url: Optional[str]
+    enabled: bool
+
+
+@dataclass(frozen=True)
+class CatalogTier:
+    key: str
+    label: str
+    sort: int
+    enabled: bool
+
+
+class AliasSampler:
+    """Tam sayı ağırlıklı Vose alias tablosu; `pick(x)` için x ∈ [0, space)."""
+
+    def __init__(self, items: List[Tuple[int, int]]) -> None:
+        items = [(pid, int(w)) for pid, w in items if int(w) > 0]
+        if not items:
+            raise ValueError("boş dağılım")
+        n = len(items)
+        total = sum(w for _, w in items)
+        self.ids = [pid for pid, _ in items]
+        self.weights = {pid: w for pid, w in items}
+        self.total = total
+        self.space = n * total
+
+        scaled = [w * n for _, w in items]  # eşik: total
+        prob = [total] * n
+        alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < total]
+        large = [i for i, p in enumerate(scaled) if p >= total]
+        while small and large:
+            s = small.pop()
+            g = large.pop()
+            prob[s] = scaled[s]
+            alias[s] = g
+            scaled[g] = scaled[g] + scaled[s] - total
+            (small if scaled[g] < total else large).append(g)
+        self._prob = prob
+        self._alias = alias
+
+    def pick(self, x: int) -> int:
+        i, r = divmod(x, self.total)
+        return self.ids[i] if r < self._prob[i] else self.ids[self._alias[i]]
+
+    def draw(self) -> int:
+        return self.pick(secrets.randbelow(self.space))
+
+
+@dataclass
+class Catalog:
+    version: str
+    prizes: Dict[int, CatalogPrize]
+    tiers: Dict[str, CatalogTier]
+    samplers: Dict[str, AliasSampler] = field(default_factory=dict)
+    decks: FrozenSet[str] = frozenset()  # deste modu açık seviyeler (bkz. prize_deck)
+    weights: Dict[str, List[Tuple[int, int]]] = field(default_factory=dict)
+    limited: FrozenSet[int] = frozenset()    # stoklu ödüller (bkz. prize_stock)
+    exhausted: FrozenSet[int] = frozenset()  # stoğu biten ödüller (alias tablolarından çıkarıldı)
+
+    def sampler(self, tier_key: str) -> Optional[AliasSampler]:
+        return self.samplers.get(tier_key)
+
+
+_lock = threading.Lock()
+_catalog: Optional[Catalog] = None
+_dirty = True
+_checked_at = 0.0
+STATS = {"hits": 0, "rebuilds": 0, "version_checks": 0, "exclusions": 0}
+
+
+def _read_version(db: Session) -> str:
+    row = db.get(SiteConfig, VERSION_KEY)
+    return (row.value_text or "") if row else ""
+
+
+def _load(db: Session, version: str) -> Catalog:
+    prizes = {
+        p.id: CatalogPrize(p.id, p.label, int(p.wheel_index), p.image_url, p.enabled is not False)
+        for p in db.query(Prize).all()
+    }
+    tiers = {
+        t.key: CatalogTier(t.key, t.label, int(t.sort or 0), bool(t.enabled))
+        for t in db.query(PrizeTier).all()
+    }
+    by_tier: Dict[str, List[Tuple[int, int]]] = {}
+    rows = db.query(PrizeDistribution).filter(
+        PrizeDistribution.enabled == True,  # noqa: E712
+        PrizeDistribution.weight_bp > 0,
+    ).all()
+    for d in rows:
+        pr = prizes.get(d.prize_id)
+        if pr and pr.enabled:
+            by_tier.setdefault(d.tier_key, []).append((d.prize_id, int(d.weight_bp)))
+    decks = frozenset(
+        k for (k,) in db.query(PrizeDeck.tier_key).filter(PrizeDeck.enabled == True, PrizeDeck.size > 0)  # noqa: E712
+    )
+    stock = dict(
+        db.query(PrizeStockShard.prize_id, func.sum(PrizeStockShard.remaining)).group_by(PrizeStockShard.prize_id).all()
+    )
+    exhausted = frozenset(int(pid) for pid, left in stock.items() if not left)
+    return Catalog(
+        version=version,
+        prizes=prizes,
+        tiers=tiers,
+        samplers=_samplers(by_tier, exhausted),
+        decks=decks,
+        weights=by_tier,
+        limited=frozenset(int(pid) for pid in stock),
+        exhausted=exhausted,
+    )
+
+
+def _samplers(weights: Dict[str, List[Tuple[int, int]]], exhausted: FrozenSet[int]) -> Dict[str, AliasSampler]:
+    out: Dict[str, AliasSampler] = {}
+    for tier, items in weights.items():
+        live = [(pid, w) for pid, w in items if pid not in exhausted]
+        if live:
+            out[tier] = AliasSampler(live)
+    return out
+
+
+def get(db: Session) -> Catalog:
+    """Güncel kataloğu döner; gerekirse (yerel kirli / sürüm değişmiş) yeniden kurar."""
+    global _catalog, _dirty, _checked_at
+    cat = _catalog
+    now = time.monotonic()
+    if cat is not None and not _dirty and now - _checked_at < settings.CATALOG_CHECK_SECONDS:
+        STATS["hits"] += 1
+        return cat
+
+    with _lock:
+        STATS["version_checks"] += 1
+        version = _read_version(db)
+        if _catalog is None or _dirty or _catalog.version != version:
+            _catalog = _load(db, version)
+            _dirty = False
+            STATS["rebuilds"] += 1
+        else:
+            STATS["hits"] += 1
+        _checked_at = now
+        return _catalog
+
+
+def current() -> Optional[Catalog]:
+    return _catalog
+
+
+def exclude(prize_id: int) -> Optional[Catalog]:
+    """Stoğu biten ödülü bu worker'ın alias tablolarından çıkarır (kalan dağılım yeniden normalize olur)."""
+    global _catalog
+    with _lock:
+        cat = _catalog
+        if cat is None or prize_id in cat.exhausted:
+            return cat
+        exhausted = cat.exhausted | {prize_id}
+        _catalog = replace(cat, samplers=_samplers(cat.weights, exhausted), exhausted=exhausted)
+        STATS["exclusions"] += 1
+        return _catalog
+
+
+def invalidate() -> None:
+    global _dirty
+    _dirty = True
+
+
+def bump(db: Session) -> None:
+    """Sürümü çağıranın transaction'ında artırır (commit'i çağıran yapar)."""
+    row = db.get(SiteConfig, VERSION_KEY)
+    val = uuid4().hex
+    if row:
+        row.value_text = val
+        db.add(row)
+    else:
+        db.add(SiteConfig(key=VERSION_KEY, value_text=val))
+
+
+def commit(db: Session) -> None:
+    """Ödül/dağılım/seviye değişikliğini sürüm artışıyla birlikte commit eder."""
+    bump(db)
+    db.commit()
+    invalidate()
+
+
+def stats() -> Dict[str, object]:
+    cat = _catalog
+    return {
+        **STATS,
+        "version": cat.version if cat else None,
+        "prizes": len(cat.prizes) if cat else 0,
+        "tiers": sorted(cat.samplers) if cat else [],
+        "decks": sorted(cat.decks) if cat else [],
+        "exhausted": sorted(cat.exhausted) if cat else [],
+    }
@@ -0,0 +1,220 @@
+# app/services/prize_deck.py
+# Deste modu: seviyenin dağılımı (weight_bp) `size` slotluk karıştırılmış bir diziye dökülür;
+# her çekiliş sıradaki slotu tek atomik UPDATE ... RETURNING ile alır. Böylece her `size`
+# çekilişte ödül oranları birebir tutar (olasılıksal değil).
+#
+# Slot, çağıranın transaction'ında alınır ve çekilen ödül aynı transaction'da koda bağlanır
+# (verify: codes.drawn_prize_id; redeem: claim). Tekrarlanan ya da terk edilen verify yeni slot
+# harcamaz; transaction geri alınırsa slot da geri gelir. Son slot alınınca deste aynı
+# adetlerle yeniden karıştırılır: her tur farklı sıradadır, sıra tahmin edilemez.
+# Toplu üretim slotları pop_many ile tur başına tek seferde alır; kullanılmayan slotlar
+# give_back ile turun kalan bölgesine geri konur.
+#
+# Not: imzalı token modunda çekiliş koda bağlı olmalı (bkz. spin_token.code_pick); orada
+# deste imleci kullanılmaz, seviye alias tablosundan çekilir.
+import secrets
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.db.models import Prize, PrizeDeck, PrizeDeckSlot, PrizeDistribution
+from app.db.session import engine
+
+MAX_DECK_SIZE = 1_000_000
+
+_POP_PG = text("""
+WITH d AS (
+  UPDATE prize_decks SET pos = (pos + 1) % size
+  WHERE tier_key = :t AND enabled AND size > 0
+  RETURNING (pos + size - 1) % size AS slot, size
+)
+SELECT s.prize_id, d.slot, d.size FROM prize_deck_slots s, d
+WHERE s.tier_key = :t AND s.pos = d.slot
+""")
+
+STATS = {"reshuffles": 0}
+
+
+def _is_postgres() -> bool:
+    return engine.dialect.name.lower() in ("postgresql", "postgres")
+
+
+def allocate(weights: Dict[int, int], size: int) -> Dict[int, int]:
+    """Ağırlıkları `size` slota en büyük kalan yöntemiyle dağıtır (toplam tam `size`)."""
+    total = sum(w for w in weights.values() if w > 0)
+    if total <= 0 or size <= 0:
+        return {}
+    counts: Dict[int, int] = {}
+    rema: List[tuple] = []
+    for pid, w in weights.items():
+        if w <= 0:
+            continue
+        q, r = divmod(w * size, total)
+        counts[pid] = q
+        rema.append((r, pid))
+    left = size - sum(counts.values())
+    for _, pid in sorted(rema, reverse=True)[:left]:
+        counts[pid] += 1
+    return counts
+
+
+def tier_weights(db: Session, tier_key: str) -> Dict[int, int]:
+    rows = (
+        db.query(PrizeDistribution.prize_id, PrizeDistribution.weight_bp)
+        .join(Prize, Prize.id == PrizeDistribution.prize_id)
+        .filter(
+            PrizeDistribution.tier_key == tier_key,
+            PrizeDistribution.enabled == True,  # noqa: E712
+            PrizeDistribution.weight_bp > 0,
+            Prize.enabled == True,              # noqa: E712
+        )
+        .all()
+    )
+    return {int(pid): int(w) for pid, w in rows}
+
+
+def build(db: Session, tier_key: str, size: int) -> int:
+    """Desteyi güncel dağılımdan yeniden kurar (imleç sıfırlanır). Commit çağırana aittir."""
+    size = max(0, min(int(size), MAX_DECK_SIZE))
+    counts = allocate(tier_weights(db, tier_key), size)
+    seq: List[int] = [pid for pid, n in counts.items() for _ in range(n)]
+    secrets.SystemRandom().shuffle(seq)
+
+    deck = db.get(PrizeDeck, tier_key)
+    if not deck:
+        deck = PrizeDeck(tier_key=tier_key)
+    deck.size = len(seq)
+    deck.pos = 0
+    deck.enabled = bool(seq)
+    db.add(deck)
+    db.flush()
+
+    db.query(PrizeDeckSlot).filter(PrizeDeckSlot.tier_key == tier_key).delete(synchronize_session=False)
+    if seq:
+        db.execute(
+            PrizeDeckSlot.__table__.insert(),
+            [{"tier_key": tier_key, "pos": i, "prize_id": pid} for i, pid in enumerate(seq)],
+        )
+    return len(seq)
+
+
+def disable(db: Session, tier_key: str) -> None:
+    deck = db.get(PrizeDeck, tier_key)
+    if deck:
+        deck.enabled = False
+        db.add(deck)
+
+
+def rebuild_enabled(db: Session) -> None:
+    """Dağılım değişince açık destelerin hepsini aynı boyutla yeniden kurar."""
+    for deck in db.query(PrizeDeck).filter(PrizeDeck.enabled == True).all():  # noqa: E712
+        build(db, deck.tier_key, deck.size)
+
+
+def _reshuffle(conn, tier_key: str) -> None:
+    """Slotları aynı adetlerle yeniden karıştırır (imleç zaten 0'a dönmüş, deste satırı kilitli)."""
+    seq = [int(pid) for (pid,) in conn.execute(text(
+        "SELECT prize_id FROM prize_deck_slots WHERE tier_key = :t"
+    ), {"t": tier_key})]
+    secrets.SystemRandom().shuffle(seq)
+    conn.execute(text("DELETE FROM prize_deck_slots WHERE tier_key = :t"), {"t": tier_key})
+    if seq:
+        conn.execute(
+            PrizeDeckSlot.__table__.insert(),
+            [{"tier_key": tier_key, "pos": i, "prize_id": pid} for i, pid in enumerate(seq)],
+        )
+    STATS["reshuffles"] += 1
+
+
+def pop(tier_key: str, conn=None) -> Optional[int]:
+    """Sıradaki slotun prize_id'si; deste yok/kapalıysa None.
+
+    `conn` verilirse çağıranın transaction'ında çalışır (slot, ödül koda bağlanana kadar
+    kesinleşmez); verilmezse kendi kısa transaction'ında. Tur biterse deste yeniden karıştırılır.
+    """
+    if conn is None:
+        with engine.begin() as own:
+            return pop(tier_key, own)
+    if _is_postgres():
+        row = conn.execute(_POP_PG, {"t": tier_key}).first()
+        if not row:
+            return None
+        pid, slot, size = int(row[0]), int(row[1]), int(row[2])
+    else:
+        d = conn.execute(text(
+            "UPDATE prize_decks SET pos = (pos + 1) % size WHERE tier_key = :t AND enabled AND size > 0 "
+            "RETURNING (pos + size - 1) % size, size"
+        ), {"t": tier_key}).first()
+        if not d:
+            return None
+        slot, size = int(d[0]), int(d[1])
+        row = conn.execute(text(
+            "SELECT prize_id FROM prize_deck_slots WHERE tier_key = :t AND pos = :p"
+        ), {"t": tier_key, "p": slot}).first()
+        if not row:
+            return None
+        pid = int(row[0])
+    if slot == size - 1:
+        _reshuffle(conn, tier_key)
+    return pid
+
+
+_LOCK = text(
+    "UPDATE prize_decks SET pos = pos WHERE tier_key = :t AND enabled AND size > 0 RETURNING pos, size"
+)
+
+
+def pop_many(tier_key: str, n: int, conn) -> List[int]:
+    """Sıradaki `n` slotun prize_id'leri (toplu üretim); deste yok/kapalıysa [].
+
+    Tur başına tek okuma + tek imleç güncellemesi; tur biterse deste yeniden karıştırılır.
+    """
+    out: List[int] = []
+    while len(out) < n:
+        row = conn.execute(_LOCK, {"t": tier_key}).first()
+        if not row:
+            break
+        pos, size = int(row[0]), int(row[1])
+        k = min(n - len(out), size - pos)
+        out += [int(pid) for (pid,) in conn.execute(text(
+            "SELECT prize_id FROM prize_deck_slots WHERE tier_key = :t AND pos >= :a AND pos < :b ORDER BY pos"
+        ), {"t": tier_key, "a": pos, "b": pos + k})]
+        conn.execute(text("UPDATE prize_decks SET pos = :p WHERE tier_key = :t"), {"t": tier_key, "p": (pos + k) % size})
+        if pos + k == size:
+            _reshuffle(conn, tier_key)
+    return out
+
+
+def give_back(conn, tier_key: str, counts: Dict[int, int]) -> int:
+    """Kullanılmayan slotları (ör. süresi dolan ya da yazılamayan önceden çekilmiş kodlar) desteye döndürür.
+
+    Turun tüketilmiş bölgesinden ([0, pos)) o ödülün slotu imlecin hemen önüne taşınır ve imleç
+    bir geri alınır; kalan bölgedeki adetler böylece birebir geri gelir. Slot önceki bir turdan
+    kaldıysa (bu turda o ödül henüz çıkmadıysa) dönülmez. Geri konan slot sayısı döner.
+    """
+    row = conn.execute(_LOCK, {"t": tier_key}).first()
+    if not row:
+        return 0
+    pos = start = int(row[0])
+    for pid, n in counts.items():
+        for _ in range(max(0, n)):
+            if pos == 0:
+                break
+            i = conn.execute(text(
+                "SELECT max(pos) FROM prize_deck_slots WHERE tier_key = :t AND pos < :p AND prize_id = :pid"
+            ), {"t": tier_key, "p": pos, "pid": pid}).scalar()
+            if i is None:
+                break
+            if i != pos - 1:
+                other = conn.execute(text(
+                    "SELECT prize_id FROM prize_deck_slots WHERE tier_key = :t AND pos = :j"
+                ), {"t": tier_key, "j": pos - 1}).scalar()
+                conn.execute(text(
+                    "UPDATE prize_deck_slots SET prize_id = CASE WHEN pos = :i THEN :o ELSE :pid END "
+                    "WHERE tier_key = :t AND pos IN (:i, :j)"
+                ), {"t": tier_key, "i": i, "j": pos - 1, "o": other, "pid": pid})
+            pos -= 1
+    if pos != start:
+        conn.execute(text("UPDATE prize_decks SET pos = :p WHERE tier_key = :t"), {"t": tier_key, "p": pos})
+    return start - pos
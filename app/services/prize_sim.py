@@ -0,0 +1,190 @@
+# app/services/prize_sim.py
+# Ödül dağılımı Monte Carlo simülatörü (admin "Ödüller" sekmesi).
+# K kodluk bir kampanya R kez oynatılır: her tekrarda ödül başına isabet sayısı tek bir
+# multinomial çekimle üretilir (numpy), yani maliyet spin sayısından değil R × ödül sayısından gelir.
+#
+# Ağırlıklar verify-spin'in kullandığı katalogdan gelir (prize_catalog → seviye alias tablosu;
+# stoğu biten ödüller orada zaten çıkarılmıştır). Önerilen ağırlıklar verilirse onlar kullanılır.
+# numpy opsiyoneldir; yoksa saf Python (random.choices) ile daha az tekrar yapılır.
+import math
+import random
+import re
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+from app.services.prize_catalog import Catalog
+
+try:
+    import numpy as np  # opsiyonel bağımlılık
+except ImportError:  # pragma: no cover
+    np = None
+
+MAX_RUNS = 100_000
+BANDS = (1, 5, 25, 50, 75, 95, 99)
+
+_NUM = re.compile(r"\d[\d.,]*")
+
+
+class SimError(ValueError):
+    pass
+
+
+def payout_of(label: str) -> float:
+    """Etiketten tutar: "₺1.000" → 1000, "250 TL" → 250, "12,5 FS" → 12.5; sayı yoksa 0."""
+    m = _NUM.search(label or "")
+    if not m:
+        return 0.0
+    raw = m.group(0).rstrip(".,")
+    # TR biçimi: nokta binlik ayırıcı, virgül ondalık
+    if "," in raw:
+        raw = raw.replace(".", "").replace(",", ".")
+    elif raw.count(".") > 1 or re.fullmatch(r"\d{1,3}(\.\d{3})+", raw):
+        raw = raw.replace(".", "")
+    try:
+        return float(raw)
+    except ValueError:
+        return 0.0
+
+
+def tier_weights(catalog: Catalog, tier_key: str) -> List[Tuple[int, int]]:
+    """verify-spin'in o an kullandığı (prize_id, weight_bp) listesi."""
+    sampler = catalog.sampler(tier_key)
+    if sampler is None:
+        return []
+    return [(pid, sampler.weights[pid]) for pid in sampler.ids]
+
+
+def proposed_weights(catalog: Catalog, pct: Dict[int, float]) -> List[Tuple[int, int]]:
+    """Formdaki yüzdeleri dist/save ile aynı yuvarlamayla baz puana çevirir."""
+    out = []
+    for pid, v in pct.items():
+        bp = max(0, int(round(float(v) * 100)))
+        if bp > 0 and pid in catalog.prizes:
+            out.append((pid, bp))
+    return out
+
+
+def _pct_sorted(vals: Sequence[float], p: float) -> float:
+    # en yakın sıra (nearest-rank)
+    i = min(len(vals) - 1, max(0, math.ceil(p / 100 * len(vals)) - 1))
+    return float(vals[i])
+
+
+def _counts_numpy(probs: List[float], codes: int, runs: int, seed: Optional[int]):
+    rng = np.random.default_rng(seed)
+    p = np.asarray(probs, dtype=np.float64)
+    # bellek sınırı: parça başına ~4M hücre
+    step = max(1, 4_000_000 // len(p))
+    parts = [rng.multinomial(codes, p, size=min(step, runs - i)) for i in range(0, runs, step)]
+    return np.concatenate(parts).astype(np.int64)
+
+
+def _counts_python(weights: List[int], codes: int, runs: int, seed: Optional[int]) -> List[List[int]]:
+    rng = random.Random(seed)
+    n = len(weights)
+    cum = []
+    acc = 0
+    for w in weights:
+        acc += w
+        cum.append(acc)
+    idx = range(n)
+    out = []
+    for _ in range(runs):
+        row = [0] * n
+        for i in rng.choices(idx, cum_weights=cum, k=codes):
+            row[i] += 1
+        out.append(row)
+    return out
+
+
+def simulate(
+    catalog: Catalog,
+    weights: List[Tuple[int, int]],
+    codes: int,
+    runs: int,
+    over: Optional[Dict[int, int]] = None,
+    values: Optional[Dict[int, float]] = None,
+    seed: Optional[int] = None,
+) -> Dict[str, object]:
+    """`codes` kodluk kampanyayı `runs` kez simüle eder.
+
+    over: prize_id → X; "X'ten fazla isabet" olasılığı. Verilmeyen ödüllerde X = beklenen isabet.
+    values: prize_id → tutar; verilmeyenlerde etiketten (`payout_of`).
+    """
+    weights = [(pid, int(w)) for pid, w in weights if int(w) > 0]
+    if not weights:
+        raise SimError("Bu seviye için dağılım yok.")
+    if codes <= 0 or runs <= 0:
+        raise SimError("Kod ve tekrar sayısı pozitif olmalı.")
+
+    runs = min(runs, MAX_RUNS)
+    cap = settings.PRIZE_SIM_MAX_SPINS if np is not None else settings.PRIZE_SIM_FALLBACK_MAX_SPINS
+    if codes > cap:
+        # saf Python yolu tek tekrarda `codes` elemanlı liste kurar; üst sınır tek tekrar için de geçerli
+        raise SimError(f"Kod sayısı en fazla {cap} olabilir.")
+    runs = max(1, min(runs, cap // codes))
+
+    over = over or {}
+    values = values or {}
+    ids = [pid for pid, _ in weights]
+    total_w = sum(w for _, w in weights)
+    probs = [w / total_w for _, w in weights]
+    vals = [float(values.get(pid, payout_of(catalog.prizes[pid].label if pid in catalog.prizes else ""))) for pid in ids]
+    thresholds = [int(over.get(pid, math.floor(codes * p))) for pid, p in zip(ids, probs)]
+
+    t0 = time.perf_counter()
+    if np is not None:
+        counts = _counts_numpy(probs, codes, runs, seed)
+        totals = np.sort(counts @ np.asarray(vals))
+        per_prize = []
+        for i in range(len(ids)):
+            col = counts[:, i]
+            per_prize.append((
+                [float(np.percentile(col, b, method="inverted_cdf")) for b in (5, 50, 95)],
+                float((col > thresholds[i]).mean()),
+            ))
+        bands = {f"p{b}": float(np.percentile(totals, b, method="inverted_cdf")) for b in BANDS}
+        engine = "numpy"
+    else:
+        counts = _counts_python([w for _, w in weights], codes, runs, seed)
+        totals = sorted(sum(c * v for c, v in zip(row, vals)) for row in counts)
+        per_prize = []
+        for i in range(len(ids)):
+            col = sorted(row[i] for row in counts)
+            per_prize.append((
+                [_pct_sorted(col, b) for b in (5, 50, 95)],
+                sum(1 for c in col if c > thresholds[i]) / runs,
+            ))
+        bands = {f"p{b}": _pct_sorted(totals, b) for b in BANDS}
+        engine = "python"
+    elapsed = time.perf_counter() - t0
+
+    ev = sum(p * v for p, v in zip(probs, vals))
+    var = sum(p * v * v for p, v in zip(probs, vals)) - ev * ev
+    return {
+        "engine": engine,
+        "codes": codes,
+        "runs": runs,
+        "spins": codes * runs,
+        "elapsed_ms": round(elapsed * 1000, 1),
+        "expected_per_spin": ev,
+        "expected_total": ev * codes,
+        "std_total": math.sqrt(max(var, 0.0) * codes),
+        "total_bands": bands,
+        "prizes": [
+            {
+                "prize_id": pid,
+                "label": catalog.prizes[pid].label if pid in catalog.prizes else str(pid),
+                "value": v,
+                "p": p,
+                "expected_hits": codes * p,
+                "hits_p5": hp[0],
+                "hits_p50": hp[1],
+                "hits_p95": hp[2],
+                "over": x,
+                "p_over": po,
+            }
+            for pid, p, v, x, (hp, po) in zip(ids, probs, vals, thresholds, per_prize)
+        ],
+    }
@@ -0,0 +1,136 @@
+# app/services/prize_stock.py
+# Stok sınırlı ödüller: ödül başına PRIZE_STOCK_SHARDS adet sayaç satırı (prize_stock_shards).
+# Düşüm ödülün parçalarından rastgele birinde tek atomik UPDATE ile yapılır; tek sıcak satır her
+# spin'i sıraya sokmaz. Parça boşsa dolu bir parçaya geçilir (kilitliyse beklenir). Ödül yalnız
+# parçaların toplamı 0 iken tükenmiş sayılır (left); anlık kilit yarışı ödülü katalogdan çıkarmaz.
+# Hiç parça satırı olmayan ödül sınırsızdır.
+#
+# Düşüm çağıranın transaction'ında yapılır ve çekilen ödül aynı transaction'da koda bağlanır
+# (verify: codes.drawn_prize_id; redeem: claim): tekrar verify yeni adet harcamaz, geri alınan
+# transaction adedi de geri verir. Ödülü bağlı kod kullanılmadan süresi dolarsa adet
+# give_back ile stoğa döner (bkz. code_expiry.sweep).
+import secrets
+from typing import Dict, Optional
+
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models import PrizeStockShard
+from app.db.session import engine
+
+# :r rastgele; parça ödülün kendi parça sayısı içinden seçilir (PRIZE_STOCK_SHARDS sonradan
+# değişmiş olabilir). Parçası olmayan ödülde NULLIF → eşleşme yok.
+_TAKE_SHARD = text("""
+UPDATE prize_stock_shards SET remaining = remaining - 1
+WHERE prize_id = :p AND remaining > 0 AND shard = :r % NULLIF(
+  (SELECT count(*) FROM prize_stock_shards WHERE prize_id = :p), 0
+)
+RETURNING remaining
+""")
+
+# SKIP LOCKED yok: kilitli parça beklenir (meşgul parça "boş" sayılmaz). Dış WHERE'deki
+# remaining > 0, bekleme sırasında başkasının sıfırladığı parçayı eksiye düşürmez.
+_TAKE_ANY = text("""
+UPDATE prize_stock_shards SET remaining = remaining - 1
+WHERE prize_id = :p AND remaining > 0 AND shard = (
+  SELECT shard FROM prize_stock_shards WHERE prize_id = :p AND remaining > 0
+  ORDER BY remaining DESC LIMIT 1
+)
+RETURNING remaining
+""")
+
+_TAKE_N = text("""
+UPDATE prize_stock_shards SET remaining = remaining - :k
+WHERE prize_id = :p AND shard = :s AND remaining >= :k
+RETURNING remaining
+""")
+
+_LEFT = text("SELECT COALESCE(SUM(remaining), 0) FROM prize_stock_shards WHERE prize_id = :p")
+
+_GIVE_BACK = text("""
+UPDATE prize_stock_shards SET remaining = remaining + :n
+WHERE prize_id = :p AND shard = (
+  SELECT shard FROM prize_stock_shards WHERE prize_id = :p ORDER BY remaining LIMIT 1
+)
+""")
+
+
+def set_stock(db: Session, prize_id: int, total: Optional[int], shards: Optional[int] = None) -> None:
+    """Stoğu `total` olarak parçalara böler; None → sınırsız. Commit çağırana aittir."""
+    db.query(PrizeStockShard).filter(PrizeStockShard.prize_id == prize_id).delete(synchronize_session=False)
+    if total is None:
+        return
+    n = max(1, int(shards or settings.PRIZE_STOCK_SHARDS))
+    q, r = divmod(max(0, int(total)), n)
+    db.add_all([PrizeStockShard(prize_id=prize_id, shard=i, remaining=q + (1 if i < r else 0)) for i in range(n)])
+
+
+def remaining(db: Session) -> Dict[int, int]:
+    """Stoklu ödüllerin kalan toplamı: {prize_id: kalan}."""
+    rows = db.query(PrizeStockShard.prize_id, func.sum(PrizeStockShard.remaining)).group_by(PrizeStockShard.prize_id)
+    return {int(pid): int(total or 0) for pid, total in rows}
+
+
+def take(prize_id: int, conn=None) -> bool:
+    """Bir adet düşer; düşülemediyse False.
+
+    False "stok bitti" demek değildir (seçilen parçalar o an başka transaction'larca
+    boşaltılmış olabilir); kesin karar için left(). `conn` verilirse çağıranın transaction'ında
+    (geri alınırsa adet de döner); verilmezse kendi kısa transaction'ında.
+    """
+    if conn is None:
+        with engine.begin() as own:
+            return take(prize_id, own)
+    if conn.execute(_TAKE_SHARD, {"p": prize_id, "r": secrets.randbelow(1 << 30)}).first():
+        return True
+    # seçilen parça boş: dolu bir parçaya geç; yarışı kaybedersek stok bitene kadar tekrar dene
+    for _ in range(3):
+        if conn.execute(_TAKE_ANY, {"p": prize_id}).first():
+            return True
+        if not left(prize_id, conn):
+            return False
+    return False
+
+
+def take_many(prize_id: int, n: int, conn) -> int:
+    """En fazla `n` adet düşer (toplu üretim); düşülen adet döner.
+
+    Adet başına değil parça başına tek koşullu UPDATE; az döndüyse kalan stok yetmemiştir ya da
+    parçalar o an yarıştadır (kesin karar için left()).
+    """
+    taken = 0
+    for _ in range(3):
+        shards = conn.execute(text(
+            "SELECT shard, remaining FROM prize_stock_shards WHERE prize_id = :p AND remaining > 0 "
+            "ORDER BY remaining DESC"
+        ), {"p": prize_id}).all()
+        for shard, rem in shards:
+            k = min(int(rem), n - taken)
+            if k <= 0:
+                break
+            if conn.execute(_TAKE_N, {"p": prize_id, "s": shard, "k": k}).first():
+                taken += k
+        if taken >= n or not shards:
+            break
+    return taken
+
+
+def left(prize_id: int, conn=None) -> int:
+    """Ödülün tüm parçalarındaki kalan toplam (parçası yoksa 0)."""
+    if conn is None:
+        with engine.connect() as own:
+            return left(prize_id, own)
+    return int(conn.execute(_LEFT, {"p": prize_id}).scalar() or 0)
+
+
+def give_back(conn, counts: Dict[int, int]) -> int:
+    """Kullanılmadan düşen adetleri (ör. süresi dolan kodlar) en boş parçaya geri ekler.
+
+    Stoksuz (parçası olmayan) ödüller atlanır; geri verilen toplam adet döner.
+    """
+    back = 0
+    for pid, n in counts.items():
+        if n > 0 and conn.execute(_GIVE_BACK, {"p": pid, "n": n}).rowcount:
+            back += n
+    return back
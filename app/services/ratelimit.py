@@ -0,0 +1,141 @@
+# app/services/ratelimit.py
+# verify-spin / redeem için token-bucket hız sınırı: istemci IP'si, kullanıcı adı ve kod öneki.
+#   RATE_LIMIT_MODE=memory   : process içi, LRU ile sınırlı kova tablosu (varsayılan)
+#   RATE_LIMIT_MODE=postgres : önce yerel kova (ucuz ret), sonra worker'lar arası paylaşılan
+#                              UNLOGGED rate_limits tablosunda tek ifadelik atomik düşüm
+#   RATE_LIMIT_MODE=off      : kapalı
+# Limitler "adet/saniye" biçiminde: RATE_LIMIT_IP="20/60" → 60 sn'de 20 istek (patlama 20).
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.session import engine
+
+logger = logging.getLogger("uvicorn")
+
+_SHARED_TAKE = text("""
+INSERT INTO rate_limits(key, tokens, ts) VALUES (:k, :cap - 1, :now)
+ON CONFLICT (key) DO UPDATE
+SET tokens = LEAST(:cap, rate_limits.tokens + (:now - rate_limits.ts) * :rate) - 1,
+    ts = :now
+WHERE LEAST(:cap, rate_limits.tokens + (:now - rate_limits.ts) * :rate) >= 1
+RETURNING tokens
+""")
+
+
+def _parse(spec: str) -> Optional[Tuple[float, float]]:
+    """'20/60' → (kapasite=20, dolum=20/60 jeton/sn); boş/0 → sınırsız."""
+    try:
+        n, per = (spec or "").split("/", 1)
+        cap, period = float(n), float(per)
+    except ValueError:
+        return None
+    if cap <= 0 or period <= 0:
+        return None
+    return cap, cap / period
+
+
+class TokenBuckets:
+    """Sabit üst sınırlı kova tablosu: key -> (jeton, son_zaman); en eski kullanılan atılır."""
+
+    def __init__(self, cap: float, rate: float, max_keys: int) -> None:
+        self.cap = cap
+        self.rate = rate
+        self.max_keys = max(1, max_keys)
+        self._data: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, now: float) -> float:
+        """Jeton düşer; 0 → izin, >0 → reddedildi, bu kadar saniye sonra tekrar denenebilir."""
+        with self._lock:
+            tokens, ts = self._data.pop(key, (self.cap, now))
+            tokens = min(self.cap, tokens + (now - ts) * self.rate)
+            if tokens >= 1:
+                self._data[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._data[key] = (tokens, now)
+                wait = (1 - tokens) / self.rate
+            while len(self._data) > self.max_keys:
+                self._data.popitem(last=False)
+            return wait
+
+
+class Limit:
+    def __init__(self, name: str, spec: str) -> None:
+        parsed = _parse(spec)
+        self.name = name
+        self.cap, self.rate = parsed or (0.0, 0.0)
+        self.buckets = TokenBuckets(self.cap, self.rate, settings.RATE_LIMIT_MAX_KEYS) if parsed else None
+
+
+LIMITS: Dict[str, Limit] = {
+    "ip": Limit("ip", settings.RATE_LIMIT_IP),
+    "user": Limit("user", settings.RATE_LIMIT_USER),
+    "prefix": Limit("prefix", settings.RATE_LIMIT_PREFIX),
+}
+STATS = {"allowed": 0, "rejected": 0, "shared_errors": 0}
+
+
+def _mode() -> str:
+    return (settings.RATE_LIMIT_MODE or "memory").strip().lower()
+
+
+def _shared_take(key: str, lim: Limit, now: float) -> float:
+    try:
+        with engine.begin() as conn:
+            row = conn.execute(_SHARED_TAKE, {"k": key, "cap": lim.cap, "rate": lim.rate, "now": now}).first()
+    except Exception:
+        # paylaşılan tablo erişilemiyorsa yerel kova yeterli: servis durmasın
+        STATS["shared_errors"] += 1
+        return 0.0
+    return 0.0 if row else 1.0 / lim.rate
+
+
+def check(client_ip: Optional[str], username: str, code: str) -> float:
+    """İzin varsa 0, yoksa Retry-After saniyesi. Yerel kovalar DB'ye hiç gitmez."""
+    mode = _mode()
+    if mode == "off":
+        return 0.0
+    ip = (client_ip or "").strip()  # çağıran güvenilir hop'tan çözer (bkz. routers/spin._client_ip)
+    keys: List[Tuple[Limit, str]] = []
+    if ip:
+        keys.append((LIMITS["ip"], ip))
+    if username:
+        keys.append((LIMITS["user"], username.lower()))
+    if code:
+        keys.append((LIMITS["prefix"], code[: settings.RATE_LIMIT_PREFIX_LEN].upper()))
+
+    now = time.time()
+    for lim, key in keys:
+        if not lim.buckets:
+            continue
+        wait = lim.buckets.take(key, now)
+        if wait <= 0 and mode == "postgres":
+            wait = _shared_take(f"{lim.name}:{key}", lim, now)
+        if wait > 0:
+            STATS["rejected"] += 1
+            return wait
+    STATS["allowed"] += 1
+    return 0.0
+
+
+def sweep() -> int:
+    """Paylaşılan tabloda bir saattir dokunulmayan kovaları siler."""
+    if _mode() != "postgres":
+        return 0
+    with engine.begin() as conn:
+        return conn.execute(text("DELETE FROM rate_limits WHERE ts < :t"), {"t": time.time() - 3600}).rowcount or 0
+
+
+def stats() -> Dict[str, object]:
+    return {
+        **STATS,
+        "mode": _mode(),
+        "keys": {n: len(l.buckets._data) if l.buckets else 0 for n, l in LIMITS.items()},
+    }
@@ -1,9 +1,275 @@
+from datetime import datetime, timezone
 from uuid import uuid4
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
+import secrets
+
+from sqlalchemy import Row, func, or_, update
+from sqlalchemy.orm import Session
+
+from app.db.models import Code
+from app.services import outbox, prize_catalog, prize_deck, prize_stock, spin_audit, spin_token
+from app.services.prize_catalog import Catalog, CatalogPrize
+
+# verify→commit arası rezervasyonlar artık TTL'li, paylaşılabilir bir depoda tutulur
+# (bkz. app/services/spin_store.py; SPIN_STORE=memory|postgres|redis).
+from app.services.spin_store import STORE, reserve  # noqa: F401
+
+
+class SpinError(Exception):
+    """Router'da ERRORS tablosuna çevrilen hata (ör. E1004, 400)."""
+
+    def __init__(self, code: str, http_status: int) -> None:
+        super().__init__(code)
+        self.code = code
+        self.http_status = http_status
 
-# verify→commit arası geçici rezerve token (memory)
-# Not: ileride Redis/DB'ye taşıyacağız.
-RESERVED: Dict[str, str] = {}
 
 def new_token() -> str:
     return str(uuid4())
+
+
+def check_code(row: Optional[Code], username: str) -> Code:
+    """verify/redeem ortak kontrolleri (E1001, E1002, E1003, E1006)."""
+    if not row:
+        raise SpinError("E1001", 400)
+    if row.status == "used":
+        raise SpinError("E1002", 409)
+    if row.status == "expired" or (row.expires_at and row.expires_at < datetime.now(timezone.utc)):
+        raise SpinError("E1003", 410)
+    if row.username and row.username.strip() and row.username != username:
+        raise SpinError("E1006", 400)
+    return row
+
+
+def find_code(db: Session, candidates: List[str], lock: bool = False) -> Optional[Code]:
+    """codes.code_candidates sırasıyla ilk bulunan kod satırı; `lock` → SELECT ... FOR UPDATE."""
+    q = db.query(Code).filter(Code.code == candidates[0] if len(candidates) == 1 else Code.code.in_(candidates))
+    if lock:
+        # kimlik haritasındaki satır da tazelenir: kilidi bekletirken başkasının yazdığı görülür
+        q = q.with_for_update().populate_existing()
+    rows = {r.code: r for r in q}
+    return next((rows[c] for c in candidates if c in rows), None)
+
+
+def choose_prize(catalog: Catalog, row: Code, conn=None) -> CatalogPrize:
+    """Kod için ödülü seçer: manuel > önceden çekilmiş > seviye dağılımı > (seviyesiz) prize_id.
+
+    `conn`: dağılımdan çekilişin (deste slotu) yazılacağı transaction; bkz. draw_for_tier.
+    """
+    # 1) Manuel ödül
+    if row.manual_prize_id:
+        pr = catalog.prizes.get(row.manual_prize_id)
+        if not pr or not pr.enabled:
+            raise SpinError("E1004", 400)
+        return pr
+
+    # 2) Kod oluştururken önceden çekilmiş ödül (taahhüt edildi; enabled'a bakılmaz)
+    if row.drawn_prize_id:
+        pr = catalog.prizes.get(row.drawn_prize_id)
+        if not pr:
+            raise SpinError("E1004", 400)
+        return pr
+
+    # 3) Otomatik dağılım
+    tier = (row.tier_key or "").strip()
+    if not tier:
+        pr = catalog.prizes.get(row.prize_id) if row.prize_id else None
+        if not pr:
+            raise SpinError("E1004", 400)
+        return pr
+    return draw_for_tier(catalog, tier, row.code, conn)
+
+
+def draw_for_tier(catalog: Catalog, tier_key: str, code: str, conn=None) -> CatalogPrize:
+    """Seviye dağılımından bir ödül çeker (imzalı token modunda koda bağlı, deterministik).
+
+    Stoklu ödülde bir adet düşülür; stok bittiyse ödül katalogdan çıkarılır ve kalan
+    dağılımdan yeniden çekilir. Deste slotu ve stok adedi `conn`'un transaction'ında alınır
+    (verilmezse kendi transaction'ında): çağıran sonucu koda bağlamadan geri alırsa ikisi de
+    geri gelir.
+    """
+    # Deste modu: sıradaki slot (kesin oranlar). İmzalı modda çekiliş koda bağlı kalmalı.
+    if uses_deck(catalog, tier_key):
+        pid = prize_deck.pop(tier_key, conn)
+        pr = catalog.prizes.get(pid) if pid else None
+        if pr and _take(pr.id, catalog, conn):
+            return pr
+
+    for _ in range(len(catalog.prizes) + 1):
+        sampler = catalog.sampler(tier_key)
+        if not sampler:
+            break
+        x = spin_token.code_pick(code, sampler.space) if spin_token.enabled() else secrets.randbelow(sampler.space)
+        pr = catalog.prizes.get(sampler.pick(x))
+        if not pr:
+            break
+        if _take(pr.id, catalog, conn):
+            return pr
+        catalog = prize_catalog.current() or catalog
+    raise SpinError("E1004", 400)
+
+
+def draw_many(
+    catalog: Catalog, tier_key: str, codes: List[str], conn,
+) -> Tuple[List[CatalogPrize], Dict[int, int], Dict[int, int]]:
+    """draw_for_tier'ın toplu hali (toplu üretimde predraw): (ödüller, deste slotları, düşülen stok).
+
+    Deste slotları tek seferde (prize_deck.pop_many), stok ödül başına tek seferde
+    (prize_stock.take_many) alınır; stoğu yetmeyen kodlar kalan dağılımdan yeniden çekilir.
+    Son iki sözlük (prize_id → adet), kodlar yazılamazsa geri vermek içindir.
+    """
+    n = len(codes)
+    picks: List[Optional[int]] = [None] * n
+    deck: Dict[int, int] = {}
+    if uses_deck(catalog, tier_key):
+        for i, pid in enumerate(prize_deck.pop_many(tier_key, n, conn)):
+            picks[i] = pid
+            deck[pid] = deck.get(pid, 0) + 1
+    out: List[Optional[CatalogPrize]] = [None] * n
+    stock: Dict[int, int] = {}
+    for _ in range(len(catalog.prizes) + 2):
+        todo = [i for i in range(n) if out[i] is None]
+        if not todo:
+            break
+        sampler = catalog.sampler(tier_key)
+        want: Dict[int, List[int]] = {}
+        for i in todo:
+            if picks[i] is None and sampler:
+                x = spin_token.code_pick(codes[i], sampler.space) if spin_token.enabled() else secrets.randbelow(sampler.space)
+                picks[i] = sampler.pick(x)
+            if picks[i] is not None:
+                want.setdefault(picks[i], []).append(i)
+        if not want:
+            break
+        for pid, idxs in want.items():
+            pr = catalog.prizes.get(pid)
+            got = len(idxs) if pr else 0
+            if pr and pid in catalog.limited:
+                got = 0 if pid in catalog.exhausted else prize_stock.take_many(pid, len(idxs), conn)
+                if got:
+                    stock[pid] = stock.get(pid, 0) + got
+                if got < len(idxs) and not prize_stock.left(pid, conn):
+                    prize_catalog.exclude(pid)
+            for i in idxs[:got]:
+                out[i] = pr
+            for i in idxs[got:]:
+                picks[i] = None
+        catalog = prize_catalog.current() or catalog
+    if any(pr is None for pr in out):
+        raise SpinError("E1004", 400)
+    return out, deck, stock
+
+
+def uses_deck(catalog: Catalog, tier_key: str) -> bool:
+    return tier_key in catalog.decks and not spin_token.enabled()
+
+
+def _may_consume(catalog: Catalog, row: Code) -> bool:
+    """Çekiliş paylaşılan bir kaynak (deste slotu, stok adedi) tüketebilir mi (çekilişten önce)."""
+    if row.manual_prize_id or row.drawn_prize_id:
+        return False
+    tier = (row.tier_key or "").strip()
+    return bool(tier) and (uses_deck(catalog, tier) or bool(catalog.limited))
+
+
+def verify_draw(db: Session, catalog: Catalog, row: Code, username: str) -> CatalogPrize:
+    """verify-spin için ödül: kaynak tüketen çekiliş aynı transaction'da koda bağlanır.
+
+    Kilit sırası redeem ile aynıdır: önce kod satırı (SELECT ... FOR UPDATE), sonra deste imleci /
+    stok parçası; eşzamanlı verify ve redeem birbirini kilitlenmeye (deadlock) sokmaz. Kilit
+    alındıktan sonra kod yeniden kontrol edilir: başka istek ödülü bağladıysa o döner. Deste slotu /
+    stok adedi ve codes.drawn_prize_id birlikte commit edilir; sonraki verify'lar bağlı ödülü döner
+    (yeni slot/adet harcanmaz). Kullanılmadan süresi dolan kodun adedi stoğa, slotu desteye döner (code_expiry).
+    Commit bu fonksiyondadır.
+    """
+    if not _may_consume(catalog, row):
+        return choose_prize(catalog, row)
+    row = check_code(find_code(db, [row.code], lock=True), username)
+    prize = choose_prize(catalog, row, db.connection())
+    if not _consumes(catalog, row, prize):
+        db.rollback()
+        return prize
+    # koşullu: FOR UPDATE'i yok sayan sürücülerde (sqlite) de kod bir kez bağlanır
+    bound = db.execute(
+        update(Code)
+        .where(Code.code == row.code, Code.status == "issued", Code.drawn_prize_id.is_(None))
+        .values(drawn_prize_id=prize.id)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if bound:
+        db.commit()
+        return prize
+    db.rollback()
+    row = check_code(db.get(Code, row.code, populate_existing=True), username)
+    return choose_prize(catalog, row)
+
+
+def _consumes(catalog: Catalog, row: Code, prize: CatalogPrize) -> bool:
+    """Çekiliş paylaşılan bir kaynak tükettiyse (deste slotu, stok adedi) sonuç koda bağlanmalı."""
+    if row.manual_prize_id or row.drawn_prize_id:
+        return False
+    tier = (row.tier_key or "").strip()
+    return bool(tier) and (uses_deck(catalog, tier) or prize.id in catalog.limited)
+
+
+def _take(prize_id: int, catalog: Catalog, conn=None) -> bool:
+    if prize_id not in catalog.limited:
+        return True
+    if prize_id in catalog.exhausted:
+        return False
+    if prize_stock.take(prize_id, conn):
+        return True
+    # yalnız stok gerçekten bittiyse çıkar; parça yarışında kaybetmek ödülü durdurmaz
+    if not prize_stock.left(prize_id, conn):
+        prize_catalog.exclude(prize_id)
+    return False
+
+
+def claim_code(db: Session, code: str, prize_id: int) -> Optional[Row]:
+    """Kodu tek koşullu UPDATE ile kullanıldı yapar; (username,) döner ya da None.
+
+    Kontrol ve yazma aynı ifadede olduğu için eşzamanlı iki commit'ten yalnızca biri satırı
+    günceller. Commit çağırana aittir.
+    """
+    stmt = (
+        update(Code)
+        .where(
+            Code.code == code,
+            Code.status == "issued",
+            or_(Code.expires_at.is_(None), Code.expires_at > func.now()),
+        )
+        .values(status="used", used_at=func.now(), prize_id=prize_id)
+        .returning(Code.username)
+        .execution_options(synchronize_session=False)
+    )
+    return db.execute(stmt).first()
+
+
+def redeem(db: Session, candidates: List[str], username: str, client_ip: Optional[str], user_agent: Optional[str]) -> CatalogPrize:
+    """Tek adımlı kullanım (çark animasyonu olmayan istemciler).
+
+    Kod satırı (adaylardan ilk bulunan, bkz. find_code) bir kez kilitlenir
+    (SELECT ... FOR UPDATE), ödül çekilir ve tek transaction'da commit edilir; rezervasyon
+    deposuna dokunulmaz. Spin kaydı için bkz. spin_audit.
+    """
+    row = check_code(find_code(db, candidates, lock=True), username)
+    code = row.code
+    # deste slotu / stok adedi claim ile aynı transaction'da: claim olmazsa geri gelir
+    prize = choose_prize(prize_catalog.get(db), row, db.connection())
+
+    # Yazma yine koşullu: FOR UPDATE'i yok sayan sürücülerde (sqlite) de tek kazanan kalır
+    if claim_code(db, code, prize.id) is None:
+        raise SpinError("E1002", 409)
+    spin_id = new_token()
+    spin_audit.record(
+        db,
+        id=spin_id,
+        code=code,
+        username=row.username or "",
+        prize_id=prize.id,
+        client_ip=client_ip,
+        user_agent=user_agent,
+    )
+    outbox.spin_won(db, spin_id, code, row.username, prize.id, "redeem")
+    db.commit()
+    return prize
@@ -0,0 +1,219 @@
+# app/services/spin_audit.py
+# Spin denetim kayıtları (spins) için write-behind kuyruk.
+#   SPIN_AUDIT_MODE=sync  : Spin satırı isteğin transaction'ında yazılır (eski davranış)
+#   SPIN_AUDIT_MODE=async : satır, isteğin commit'i başarılı olunca sınırlı kuyruğa alınır;
+#                           arka plan thread'i her SPIN_AUDIT_BATCH satırda ya da
+#                           SPIN_AUDIT_FLUSH_MS'de bir çok satırlı INSERT ile yazar.
+# Kod durumunun (codes.status) değişimi her iki modda da senkron kalır.
+# Kuyruk doluysa satır istek thread'inde doğrudan yazılır; DB yazımı başarısız olursa satırlar
+# SPIN_AUDIT_FALLBACK_PATH dosyasına NDJSON olarak eklenir; dosya startup'ta ve periyodik olarak
+# replay() ile spins'e geri yazılır (id çakışanlar atlanır), başarıyla yazılınca silinir.
+# Kapanışta kuyruk boşaltılır.
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models import Spin
+from app.db.session import SessionLocal, engine
+from app.services import spin_rollup
+
+logger = logging.getLogger("uvicorn")
+
+_PENDING = "spin_audit_pending"
+_Q: "queue.Queue[Dict]" = queue.Queue(maxsize=max(1, settings.SPIN_AUDIT_QUEUE_MAX))
+_wake = threading.Event()
+_stop = threading.Event()
+_thread: Optional[threading.Thread] = None
+STATS = {"enqueued": 0, "flushed": 0, "flushes": 0, "sync_fallback": 0, "file_fallback": 0, "replayed": 0}
+
+
+def _async() -> bool:
+    return (settings.SPIN_AUDIT_MODE or "").strip().lower() == "async"
+
+
+def record(db: Session, **row) -> None:
+    """Spin satırını kaydeder; async modda commit sonrası kuyruğa gider (çağıran commit eder)."""
+    row.setdefault("created_at", datetime.now(timezone.utc))
+    if not _async():
+        db.add(Spin(**row))
+        return
+    db.info.setdefault(_PENDING, []).append(row)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _after_commit(session: Session) -> None:
+    for row in session.info.pop(_PENDING, None) or ():
+        _enqueue(row)
+
+
+@event.listens_for(SessionLocal, "after_soft_rollback")
+def _after_rollback(session: Session, previous_transaction) -> None:
+    session.info.pop(_PENDING, None)
+
+
+def _enqueue(row: Dict) -> None:
+    try:
+        _Q.put_nowait(row)
+    except queue.Full:
+        STATS["sync_fallback"] += 1
+        _write([row])
+        return
+    STATS["enqueued"] += 1
+    if _Q.qsize() >= settings.SPIN_AUDIT_BATCH:
+        _wake.set()
+
+
+def _write(rows: List[Dict]) -> None:
+    try:
+        with engine.begin() as conn:
+            conn.execute(Spin.__table__.insert(), rows)
+        STATS["flushed"] += len(rows)
+        STATS["flushes"] += 1
+    except Exception:
+        logger.exception(f"[SPIN-AUDIT] {len(rows)} satır yazılamadı; dosyaya ekleniyor")
+        _spill(rows)
+
+
+def _spill(rows: List[Dict]) -> None:
+    try:
+        with open(settings.SPIN_AUDIT_FALLBACK_PATH, "a", encoding="utf-8") as f:
+            for r in rows:
+                f.write(json.dumps(r, default=str, ensure_ascii=False) + "\n")
+        STATS["file_fallback"] += len(rows)
+    except Exception:
+        logger.exception(f"[SPIN-AUDIT] {len(rows)} satır kaybedildi")
+
+
+def _insert_ignore():
+    # replay tekrar çalışırsa (yarıda kalan tur, iki worker) aynı id ikinci kez yazılmaz
+    pg = engine.dialect.name.lower() in ("postgresql", "postgres")
+    return (postgresql.insert if pg else sqlite.insert)(Spin.__table__).on_conflict_do_nothing()
+
+
+def _replay_rows(rows: List[Dict]) -> int:
+    try:
+        with engine.begin() as conn:
+            n = conn.execute(_insert_ignore(), rows).rowcount
+        return n if n is not None and n >= 0 else len(rows)  # çakışıp atlananlar sayılmaz
+    except Exception:
+        logger.exception(f"[SPIN-AUDIT] {len(rows)} satır yeniden yazılamadı; dosyada kalıyor")
+        _spill(rows)
+        return 0
+
+
+def replay() -> int:
+    """Dosyaya düşmüş satırları spins'e geri yazar; yazılan satır sayısı.
+
+    Dosya önce yana alınır (bu sırada düşenler yeni dosyaya gider); yazılamayan parçalar yeniden
+    dosyaya eklenir, okunamayan satırlar loglanıp atlanır. Yana alınmış dosya silinince iş biter;
+    yarıda kalan bir önceki tur önce tamamlanır.
+    """
+    try:
+        return _replay(settings.SPIN_AUDIT_FALLBACK_PATH)
+    except OSError:
+        # dosya erişilemiyor: startup'ı durdurmaz, satırlar dosyada bekler
+        logger.exception("[SPIN-AUDIT] dosya replay edilemedi")
+        return 0
+
+
+def _replay(path: str) -> int:
+    work = path + ".replay"
+    if not os.path.exists(work):
+        try:
+            os.replace(path, work)
+        except FileNotFoundError:
+            return 0
+    done = 0
+    rows: List[Dict] = []
+    span: List[datetime] = []
+    with open(work, encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                r = json.loads(line)
+                r["created_at"] = datetime.fromisoformat(r["created_at"])
+            except (ValueError, KeyError, TypeError):
+                logger.error(f"[SPIN-AUDIT] {work}:{n} okunamadı, atlandı: {line.strip()[:200]}")
+                continue
+            rows.append(r)
+            span = [min(span[0], r["created_at"]), max(span[1], r["created_at"])] if span else [r["created_at"]] * 2
+            if len(rows) >= settings.SPIN_AUDIT_BATCH:
+                done += _replay_rows(rows)
+                rows = []
+    if rows:
+        done += _replay_rows(rows)
+    try:
+        os.remove(work)
+    except FileNotFoundError:
+        pass  # başka worker aynı dosyayı bitirdi
+    STATS["replayed"] += done
+    if done:
+        logger.info(f"[SPIN-AUDIT] dosyadan {done} satır spins'e yazıldı")
+        # Geç gelen satırlar özetlerin yüksek su işaretinin gerisinde kalabilir; o günleri yeniden topla.
+        try:
+            spin_rollup.rebuild(span[0], span[1])
+        except Exception as e:
+            logger.error(f"[SPIN-AUDIT] özet yeniden toplanamadı ({span[0]} – {span[1]}): {e}")
+    return done
+
+
+def flush() -> int:
+    """Kuyruktaki her şeyi SPIN_AUDIT_BATCH'lik parçalarla yazar; yazılan satır sayısı."""
+    total = 0
+    while True:
+        rows: List[Dict] = []
+        try:
+            while len(rows) < settings.SPIN_AUDIT_BATCH:
+                rows.append(_Q.get_nowait())
+        except queue.Empty:
+            pass
+        if not rows:
+            return total
+        _write(rows)
+        total += len(rows)
+
+
+def _loop() -> None:
+    interval = max(0.01, settings.SPIN_AUDIT_FLUSH_MS / 1000.0)
+    while not _stop.is_set():
+        _wake.wait(interval)
+        _wake.clear()
+        flush()
+
+
+def start() -> None:
+    global _thread
+    if not _async() or (_thread and _thread.is_alive()):
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_loop, name="spin-audit", daemon=True)
+    _thread.start()
+
+
+def stop() -> None:
+    """Thread'i durdurur ve kuyrukta kalanları yazar."""
+    global _thread
+    _stop.set()
+    _wake.set()
+    if _thread:
+        _thread.join(5.0)
+        _thread = None
+    flush()
+
+
+def stats() -> Dict[str, object]:
+    return {**STATS, "mode": "async" if _async() else "sync", "depth": _Q.qsize(), "capacity": _Q.maxsize}
+
+
+atexit.register(flush)
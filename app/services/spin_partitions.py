@@ -0,0 +1,226 @@
+# app/services/spin_partitions.py
+# spins tablosu için aylık range partition (Postgres) + saklama/arşiv.
+#
+#   SPINS_PARTITIONING=1 : startup'ta spins bir kez partitioned tabloya çevrilir. Mevcut tablo
+#                          kopyalanmaz; spins_legacy adıyla (MINVALUE → içindeki en yeni satırın
+#                          ertesi ayı, en az gelecek ay) ilk bölüm olarak eklenir; aylık bölümler
+#                          oradan başlar. Dönüşüm başarısızsa durum stats()'ta "failed" görünür.
+#   Bakım işi (günlük)   : SPINS_PARTITION_AHEAD ay ilerisi için bölüm açar; üst sınırı
+#                          SPINS_RETENTION_MONTHS aydan eski bölümleri DETACH → SPINS_ARCHIVE_DIR
+#                          altına gzip NDJSON → DROP. Özet işinin (spin_rollup) henüz işlemediği
+#                          bölümlere dokunulmaz.
+# Not: partitioned tabloda birincil anahtar bölüm anahtarını içermek zorunda: (id, created_at).
+import gzip
+import json
+import logging
+import os
+import re
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.core.config import settings
+from app.db.session import engine
+from app.services import spin_rollup
+
+logger = logging.getLogger("uvicorn")
+
+_LOCK_ID = 72_410_017
+_TO = re.compile(r"TO \('([^']+)'\)")
+STATS = {"state": "pending", "created": 0, "archived": 0, "archived_rows": 0, "last_error": None}
+
+
+def enabled() -> bool:
+    return settings.SPINS_PARTITIONING and engine.dialect.name.lower() in ("postgresql", "postgres")
+
+
+def _month(d: date, add: int = 0) -> date:
+    y, m = divmod(d.year * 12 + d.month - 1 + add, 12)
+    return date(y, m + 1, 1)
+
+
+def _is_partitioned(conn: Connection) -> bool:
+    return bool(conn.execute(text("""
+        SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid
+        WHERE c.relname = 'spins' AND c.relnamespace = 'public'::regnamespace
+    """)).first())
+
+
+def convert() -> bool:
+    """spins'i (partitioned değilse) aylık partitioned tabloya çevirir; çevrildiyse True."""
+    this_month = _month(datetime.now(timezone.utc).date())
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": _LOCK_ID})
+        if _is_partitioned(conn):
+            return False
+        conn.execute(text("ALTER TABLE spins RENAME TO spins_legacy"))
+        conn.execute(text("ALTER INDEX IF EXISTS ix_spins_created_at RENAME TO ix_spins_legacy_created_at"))
+        conn.execute(text("ALTER INDEX IF EXISTS spins_pkey RENAME TO spins_legacy_pkey"))
+        conn.execute(text("""
+            CREATE TABLE spins (
+              id VARCHAR(36) NOT NULL,
+              code VARCHAR(64) NOT NULL,
+              username VARCHAR(128) NOT NULL,
+              prize_id INTEGER NOT NULL,
+              created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+              client_ip TEXT,
+              user_agent TEXT,
+              PRIMARY KEY (id, created_at)
+            ) PARTITION BY RANGE (created_at)
+        """))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_spins_created_at ON spins(created_at)"))
+        # eski satırlar yerinde kalır: bölüm anahtarı NOT NULL + PK'ya uyan benzersiz indeks gerekir
+        conn.execute(text("UPDATE spins_legacy SET created_at = now() WHERE created_at IS NULL"))
+        conn.execute(text("ALTER TABLE spins_legacy ALTER COLUMN created_at SET NOT NULL"))
+        conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ux_spins_legacy_id_created ON spins_legacy(id, created_at)"))
+        # üst sınır tüm mevcut satırları kapsamalı (bu ayınkiler dahil); yoksa ATTACH reddedilir.
+        # Ay sınırı, bölüm sınırı literal'leri gibi oturum saat diliminde hesaplanır.
+        upper = conn.execute(text(
+            "SELECT (date_trunc('month', greatest(max(created_at), now())) + interval '1 month')::date FROM spins_legacy"
+        )).scalar()
+        conn.execute(text(
+            f"ALTER TABLE spins ATTACH PARTITION spins_legacy FOR VALUES FROM (MINVALUE) TO ('{upper.isoformat()}')"
+        ))
+        conn.execute(text("CREATE TABLE IF NOT EXISTS spins_default PARTITION OF spins DEFAULT"))
+        _ensure_ahead(conn, this_month)
+    logger.info("[SPINS] spins aylık partitioned tabloya çevrildi")
+    return True
+
+
+def migrate() -> None:
+    """Startup: dönüşüm hatası uygulamayı durdurmaz (spins eski haliyle çalışmaya devam eder),
+    ama gizlenmez: ERROR log + stats()["state"] == "failed" (/api/spin/metrics'te görünür).
+    Bakım işi her turda tekrar uyarır."""
+    try:
+        convert()
+        STATS["state"] = "partitioned"
+    except Exception as e:
+        STATS["state"] = "failed"
+        STATS["last_error"] = f"convert: {e!r}"[:500]
+        logger.exception("[SPINS] SPINS_PARTITIONING açık ama dönüşüm BAŞARISIZ; spins bölümlenmeden çalışıyor")
+
+
+def _ensure_ahead(conn: Connection, this_month: date) -> int:
+    """Bu aydan SPINS_PARTITION_AHEAD ay ilerisine kadar eksik aylık bölümleri açar.
+
+    Mevcut bölümlerin (ör. spins_legacy) kapsadığı aylar atlanır: başlangıç, en büyük üst sınır.
+    """
+    made = 0
+    covered = max((u for _, _, u in partitions(conn) if u is not None), default=None)
+    start = max(this_month, covered.date()) if covered else this_month
+    end = _month(this_month, max(0, settings.SPINS_PARTITION_AHEAD) + 1)
+    lo = start
+    while lo < end:
+        hi = _month(lo, 1)
+        name = f"spins_p{lo:%Y%m}"
+        if not conn.execute(text("SELECT to_regclass(:n)"), {"n": f"public.{name}"}).scalar():
+            conn.execute(text(
+                f"CREATE TABLE {name} PARTITION OF spins FOR VALUES FROM ('{lo.isoformat()}') TO ('{hi.isoformat()}')"
+            ))
+            made += 1
+        lo = hi
+    return made
+
+
+def partitions(conn: Connection) -> List[Tuple[str, str, Optional[datetime]]]:
+    """(bölüm adı, sınır ifadesi, üst sınır) listesi; DEFAULT bölüm için üst sınır None."""
+    rows = conn.execute(text("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = 'spins'
+        ORDER BY c.relname
+    """)).all()
+    out = []
+    for name, bound in rows:
+        m = _TO.search(bound or "")
+        upper = datetime.fromisoformat(m.group(1)) if m else None
+        if upper is not None and upper.tzinfo is None:
+            upper = upper.replace(tzinfo=timezone.utc)
+        out.append((name, bound or "", upper))
+    return out
+
+
+def _export(conn: Connection, name: str) -> Tuple[str, int]:
+    os.makedirs(settings.SPINS_ARCHIVE_DIR, exist_ok=True)
+    path = os.path.join(settings.SPINS_ARCHIVE_DIR, f"{name}.ndjson.gz")
+    tmp = path + ".part"
+    n = 0
+    result = conn.execution_options(stream_results=True, yield_per=5000).execute(text(f"SELECT * FROM {name}"))
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        for row in result.mappings():
+            f.write(json.dumps(dict(row), default=str, ensure_ascii=False) + "\n")
+            n += 1
+    os.replace(tmp, path)
+    return path, n
+
+
+def archive_old() -> int:
+    """Saklama süresini aşan bölümleri ayırır, arşivler ve siler; arşivlenen bölüm sayısı."""
+    cutoff = _month(datetime.now(timezone.utc).date(), -max(1, settings.SPINS_RETENTION_MONTHS))
+    cutoff_dt = datetime(cutoff.year, cutoff.month, 1, tzinfo=timezone.utc)
+    done = 0
+    with engine.connect() as conn:
+        if not conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": _LOCK_ID + 1}).scalar():
+            conn.rollback()
+            return 0
+        try:
+            conn.commit()
+            with conn.begin():
+                rows = partitions(conn)
+                hwm_raw = conn.execute(
+                    text("SELECT value_text FROM site_config WHERE key = :k"), {"k": spin_rollup.HWM_KEY}
+                ).scalar()
+            hwm = datetime.fromisoformat(hwm_raw) if hwm_raw else None
+            for name, bound, upper in rows:
+                if upper is None or upper > cutoff_dt:
+                    continue
+                if hwm is None or upper > hwm:
+                    logger.warning(f"[SPINS] {name} henüz özetlenmedi; arşiv atlandı")
+                    continue
+                with conn.begin():
+                    conn.execute(text(f"ALTER TABLE spins DETACH PARTITION {name}"))
+                try:
+                    with conn.begin():
+                        path, n = _export(conn, name)
+                except Exception as e:
+                    # dışa aktarılamadıysa tabloyu aynı sınırla geri bağla; veri kaybolmasın
+                    STATS["last_error"] = repr(e)
+                    logger.exception(f"[SPINS] {name} arşivlenemedi; bölüm geri ekleniyor")
+                    with conn.begin():
+                        conn.execute(text(f"ALTER TABLE spins ATTACH PARTITION {name} {bound}"))
+                    continue
+                with conn.begin():
+                    conn.execute(text(f"DROP TABLE {name}"))
+                STATS["archived"] += 1
+                STATS["archived_rows"] += n
+                logger.info(f"[SPINS] {name} arşivlendi ({n} satır) → {path}")
+                done += 1
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": _LOCK_ID + 1})
+            conn.commit()
+    return done
+
+
+def maintain() -> None:
+    """Bakım işi: ileri bölümler + saklama."""
+    if not enabled():
+        return
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": _LOCK_ID})
+        if not _is_partitioned(conn):
+            STATS["state"] = "failed" if STATS["state"] == "failed" else "not_partitioned"
+            logger.error(f"[SPINS] SPINS_PARTITIONING açık ama spins bölümlü değil (durum: {STATS['state']}, "
+                         f"hata: {STATS['last_error']}); bakım atlandı")
+            return
+        STATS["state"] = "partitioned"
+        STATS["created"] += _ensure_ahead(conn, _month(datetime.now(timezone.utc).date()))
+    if settings.SPINS_RETENTION_MONTHS > 0:
+        archive_old()
+
+
+def stats() -> Dict[str, object]:
+    return {**STATS, "enabled": enabled()}
@@ -0,0 +1,164 @@
+# app/services/spin_rollup.py
+# spins ⋈ codes.tier_key → saatlik / günlük (seviye × ödül) özet tabloları, artımlı.
+#
+# Yüksek su işareti (SiteConfig.key='spin_rollup_hwm'): her tur yalnızca [hwm, şimdi - gecikme)
+# aralığındaki spin'leri toplar ve işareti aynı transaction'da ilerletir. Gecikme
+# (SPIN_ROLLUP_LAG_SECONDS), write-behind kuyruğundan geç düşen satırlar için pay bırakır.
+# Postgres'te advisory lock ile aynı anda tek worker çalışır. Geç gelen (ör. dosya yedeğinden
+# geri yüklenen) satırlar için `rebuild()` ilgili aralığı sıfırdan yeniden hesaplar.
+# Raporlar/dışa aktarımlar bu tablolardan okur; ham spins taranmaz.
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import Date, cast, func, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+
+from app.core.config import settings
+from app.db.models import Code, SiteConfig, Spin, SpinRollupDaily, SpinRollupHourly
+from app.db.session import engine
+
+HWM_KEY = "spin_rollup_hwm"
+_LOCK_ID = 72_410_015  # pg advisory lock anahtarı
+STATS = {"runs": 0, "skipped_locked": 0, "spins": 0, "last_hwm": None}
+
+
+def _pg() -> bool:
+    return engine.dialect.name.lower() in ("postgresql", "postgres")
+
+
+def _hour(col):
+    if _pg():
+        return func.date_trunc("hour", col)
+    return func.strftime("%Y-%m-%d %H:00:00.000000", col)  # SQLAlchemy'nin sqlite DateTime biçimi
+
+
+def _day(col):
+    if _pg():
+        return cast(func.timezone("UTC", col), Date)
+    return func.strftime("%Y-%m-%d", col)
+
+
+def _upsert(conn: Connection, table, bucket_col: str, bucket_expr, lo: datetime, hi: datetime) -> None:
+    tier = func.coalesce(Code.tier_key, "")
+    sel = (
+        select(bucket_expr, tier, Spin.prize_id, func.count())
+        .select_from(Spin)
+        .outerjoin(Code, Code.code == Spin.code)
+        .where(Spin.created_at >= lo, Spin.created_at < hi)
+        .group_by(bucket_expr, tier, Spin.prize_id)
+    )
+    ins = (postgresql.insert if _pg() else sqlite.insert)(table).from_select(
+        [bucket_col, "tier_key", "prize_id", "spins"], sel
+    )
+    conn.execute(ins.on_conflict_do_update(
+        index_elements=[bucket_col, "tier_key", "prize_id"],
+        set_={"spins": table.c.spins + ins.excluded.spins},
+    ))
+
+
+def _read_hwm(conn: Connection) -> Optional[datetime]:
+    raw = conn.execute(select(SiteConfig.value_text).where(SiteConfig.key == HWM_KEY)).scalar()
+    if raw:
+        return datetime.fromisoformat(raw)
+    first = conn.execute(select(func.min(Spin.created_at))).scalar()
+    if first is None:
+        return None
+    if isinstance(first, str):  # sqlite
+        first = datetime.fromisoformat(first)
+    if first.tzinfo is None:
+        first = first.replace(tzinfo=timezone.utc)
+    return first.replace(minute=0, second=0, microsecond=0)
+
+
+def _write_hwm(conn: Connection, hwm: datetime) -> None:
+    val = hwm.isoformat()
+    if conn.execute(select(SiteConfig.key).where(SiteConfig.key == HWM_KEY)).first():
+        conn.execute(SiteConfig.__table__.update().where(SiteConfig.key == HWM_KEY).values(value_text=val))
+    else:
+        conn.execute(SiteConfig.__table__.insert().values(key=HWM_KEY, value_text=val))
+
+
+def _aggregate(conn: Connection, lo: datetime, hi: datetime) -> int:
+    n = conn.execute(
+        select(func.count()).select_from(Spin).where(Spin.created_at >= lo, Spin.created_at < hi)
+    ).scalar() or 0
+    if n:
+        _upsert(conn, SpinRollupHourly.__table__, "bucket", _hour(Spin.created_at), lo, hi)
+        _upsert(conn, SpinRollupDaily.__table__, "day", _day(Spin.created_at), lo, hi)
+    return n
+
+
+def run() -> int:
+    """Yüksek su işaretinden bu yana biriken spin'leri özetlere ekler; işlenen spin sayısı."""
+    hi_limit = datetime.now(timezone.utc) - timedelta(seconds=settings.SPIN_ROLLUP_LAG_SECONDS)
+    step = timedelta(hours=max(1, settings.SPIN_ROLLUP_CHUNK_HOURS))
+    total = 0
+    with engine.connect() as conn:
+        if _pg() and not conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": _LOCK_ID}).scalar():
+            conn.rollback()
+            STATS["skipped_locked"] += 1
+            return 0
+        try:
+            conn.commit()
+            hwm = _read_hwm(conn)
+            conn.commit()
+            while hwm is not None and hwm < hi_limit:
+                hi = min(hwm + step, hi_limit)
+                with conn.begin():  # parça başına tek transaction: özet + işaret birlikte
+                    total += _aggregate(conn, hwm, hi)
+                    _write_hwm(conn, hi)
+                hwm = hi
+            STATS["last_hwm"] = hwm.isoformat() if hwm else None
+        finally:
+            if _pg():
+                conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": _LOCK_ID})
+                conn.commit()
+    STATS["runs"] += 1
+    STATS["spins"] += total
+    return total
+
+
+def rebuild(start: datetime, end: datetime) -> int:
+    """[start, end) aralığını gün sınırlarına genişletip sıfırdan yeniden toplar.
+
+    `end` yüksek su işaretinin günüyle sınırlanır (yarım gün silinip eklenirse günlük özet ikiye
+    katlanırdı); işaretin ötesi zaten bir sonraki `run()`a kalır.
+    """
+    start = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    end = end.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    H, D = SpinRollupHourly.__table__, SpinRollupDaily.__table__
+    with engine.begin() as conn:
+        hwm = _read_hwm(conn)
+        if hwm is None:
+            return 0
+        end = min(end, hwm.replace(hour=0, minute=0, second=0, microsecond=0))
+        if end <= start:
+            return 0
+        conn.execute(H.delete().where(H.c.bucket >= start, H.c.bucket < end))
+        conn.execute(D.delete().where(D.c.day >= start.date(), D.c.day < end.date()))
+        return _aggregate(conn, start, end)
+
+
+def hourly(db, since: datetime, until: Optional[datetime] = None) -> List[SpinRollupHourly]:
+    q = db.query(SpinRollupHourly).filter(SpinRollupHourly.bucket >= since)
+    if until is not None:
+        q = q.filter(SpinRollupHourly.bucket < until)
+    return q.order_by(SpinRollupHourly.bucket, SpinRollupHourly.tier_key, SpinRollupHourly.prize_id).all()
+
+
+def daily(db, since: date, until: Optional[date] = None) -> List[SpinRollupDaily]:
+    q = db.query(SpinRollupDaily).filter(SpinRollupDaily.day >= since)
+    if until is not None:
+        q = q.filter(SpinRollupDaily.day < until)
+    return q.order_by(SpinRollupDaily.day, SpinRollupDaily.tier_key, SpinRollupDaily.prize_id).all()
+
+
+def processed_until(db) -> Optional[datetime]:
+    """Kalıcı yüksek su işareti (site_config): özetler bu ana kadar tam. Tüm worker'larda aynı."""
+    row = db.get(SiteConfig, HWM_KEY)
+    return datetime.fromisoformat(row.value_text) if row and row.value_text else None
+
+
+def stats() -> Dict[str, object]:
+    return dict(STATS)
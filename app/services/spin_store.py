@@ -0,0 +1,159 @@
+# app/services/spin_store.py
+# verify→commit arası rezervasyon deposu (TTL'li).
+#   memory   : tek worker / geliştirme (process içi dict)
+#   postgres : çok worker; UNLOGGED tablo (spin_reservations), tablo main.py startup'ta oluşur
+#   redis    : çok worker/çok node; anahtarlar Redis'in kendi TTL'i ile düşer
+# Seçim: SPIN_STORE env (varsayılan memory).
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, asdict
+from typing import Dict, Optional
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.session import engine
+
+logger = logging.getLogger("uvicorn")
+
+
+@dataclass
+class Reservation:
+    token: str
+    prize_id: int
+    wheel_index: int
+    expires_at: float  # epoch saniye
+
+
+class ReservationStore(ABC):
+    @abstractmethod
+    def put(self, code: str, res: Reservation) -> None: ...
+
+    @abstractmethod
+    def get(self, code: str) -> Optional[Reservation]: ...
+
+    @abstractmethod
+    def pop(self, code: str) -> None: ...
+
+    def sweep(self) -> int:
+        """Süresi dolanları temizler; silinen kayıt sayısını döner."""
+        return 0
+
+
+class MemoryReservationStore(ReservationStore):
+    def __init__(self) -> None:
+        self._data: Dict[str, Reservation] = {}
+        self._lock = threading.Lock()
+
+    def put(self, code: str, res: Reservation) -> None:
+        with self._lock:
+            self._data[code] = res
+
+    def get(self, code: str) -> Optional[Reservation]:
+        res = self._data.get(code)
+        if res and res.expires_at <= time.time():
+            return None
+        return res
+
+    def pop(self, code: str) -> None:
+        with self._lock:
+            self._data.pop(code, None)
+
+    def sweep(self) -> int:
+        now = time.time()
+        with self._lock:
+            dead = [c for c, r in self._data.items() if r.expires_at <= now]
+            for c in dead:
+                del self._data[c]
+        return len(dead)
+
+
+class PostgresReservationStore(ReservationStore):
+    def put(self, code: str, res: Reservation) -> None:
+        with engine.begin() as conn:
+            conn.execute(text("""
+                INSERT INTO spin_reservations(code, token, prize_id, wheel_index, expires_at)
+                VALUES (:c, :t, :p, :w, to_timestamp(:e))
+                ON CONFLICT (code) DO UPDATE
+                SET token = EXCLUDED.token, prize_id = EXCLUDED.prize_id,
+                    wheel_index = EXCLUDED.wheel_index, expires_at = EXCLUDED.expires_at
+            """), {"c": code, "t": res.token, "p": res.prize_id, "w": res.wheel_index, "e": res.expires_at})
+
+    def get(self, code: str) -> Optional[Reservation]:
+        with engine.connect() as conn:
+            row = conn.execute(text("""
+                SELECT token, prize_id, wheel_index, extract(epoch FROM expires_at)
+                FROM spin_reservations
+                WHERE code = :c AND expires_at > now()
+            """), {"c": code}).first()
+        if not row:
+            return None
+        return Reservation(token=row[0], prize_id=int(row[1]), wheel_index=int(row[2]), expires_at=float(row[3]))
+
+    def pop(self, code: str) -> None:
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM spin_reservations WHERE code = :c"), {"c": code})
+
+    def sweep(self) -> int:
+        with engine.begin() as conn:
+            return conn.execute(text("DELETE FROM spin_reservations WHERE expires_at <= now()")).rowcount or 0
+
+
+class RedisReservationStore(ReservationStore):
+    PREFIX = "spin:res:"
+
+    def __init__(self, url: str) -> None:
+        import redis  # opsiyonel bağımlılık
+        self._r = redis.Redis.from_url(url, socket_connect_timeout=2)
+        # from_url bağlanmaz: ulaşılamayan Redis her verify/commit'te 500 olmasın, burada anlaşılsın
+        self._r.ping()
+
+    def put(self, code: str, res: Reservation) -> None:
+        ttl = max(1, int(res.expires_at - time.time()))
+        self._r.set(self.PREFIX + code, json.dumps(asdict(res)), ex=ttl)
+
+    def get(self, code: str) -> Optional[Reservation]:
+        raw = self._r.get(self.PREFIX + code)
+        if not raw:
+            return None
+        return Reservation(**json.loads(raw))
+
+    def pop(self, code: str) -> None:
+        self._r.delete(self.PREFIX + code)
+
+
+def _is_postgres() -> bool:
+    try:
+        return engine.dialect.name.lower() in ("postgresql", "postgres")
+    except Exception:
+        return False
+
+
+def _build_store() -> ReservationStore:
+    kind = (settings.SPIN_STORE or "memory").strip().lower()
+    if kind == "postgres":
+        if _is_postgres():
+            return PostgresReservationStore()
+        logger.warning("[SPIN] SPIN_STORE=postgres ama veritabanı Postgres değil; memory kullanılıyor")
+    elif kind == "redis":
+        try:
+            return RedisReservationStore(settings.REDIS_URL)
+        except Exception as e:
+            # çok worker'da memory deposu commit'leri bozar (token başka worker'da): yüksek sesle
+            logger.error(f"[SPIN] Redis store kurulamadı ({e!r}); memory kullanılıyor (yalnız tek worker'da güvenli)")
+    return MemoryReservationStore()
+
+
+STORE: ReservationStore = _build_store()
+
+
+def reserve(code: str, token: str, prize_id: int, wheel_index: int) -> None:
+    STORE.put(code, Reservation(
+        token=token,
+        prize_id=int(prize_id),
+        wheel_index=int(wheel_index),
+        expires_at=time.time() + settings.SPIN_TOKEN_TTL,
+    ))
@@ -0,0 +1,54 @@
+# app/services/spin_token.py
+# İmzalı (HMAC, SECRET_KEY) ve süreli spin tokenı: sunucuda durum tutmadan verify→commit.
+# Zarf: {"c": code, "p": prize_id, "w": wheel_index, "s": spin_id} + itsdangerous zaman damgası.
+import hashlib
+import hmac
+from typing import Optional, TypedDict
+from uuid import uuid4
+
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+from app.core.config import settings
+
+_SERIALIZER = URLSafeTimedSerializer(settings.SECRET_KEY, salt="spin-token")
+
+
+class SpinClaim(TypedDict):
+    c: str
+    p: int
+    w: int
+    s: str
+
+
+def enabled() -> bool:
+    return (settings.SPIN_TOKEN_MODE or "").strip().lower() == "signed"
+
+
+def sign(code: str, prize_id: int, wheel_index: int) -> str:
+    return _SERIALIZER.dumps({"c": code, "p": int(prize_id), "w": int(wheel_index), "s": str(uuid4())})
+
+
+def looks_signed(token: str) -> bool:
+    # uuid4 tokenlarında nokta yok; imzalı tokenlar payload.timestamp.signature biçiminde
+    return token.count(".") == 2
+
+
+def load(token: str) -> Optional[SpinClaim]:
+    """İmza ve süre (SPIN_TOKEN_TTL) geçerliyse zarfı döner; aksi halde None."""
+    try:
+        data = _SERIALIZER.loads(token, max_age=settings.SPIN_TOKEN_TTL)
+    except BadSignature:  # SignatureExpired da buraya düşer
+        return None
+    if not isinstance(data, dict) or not {"c", "p", "w", "s"} <= data.keys():
+        return None
+    return data  # type: ignore[return-value]
+
+
+def code_pick(code: str, n: int) -> int:
+    """Koda bağlı deterministik [0, n) seçimi.
+
+    İmzalı modda aynı kod için birden çok geçerli token olabilir; çekiliş koda bağlı
+    olmazsa kullanıcı verify'ı tekrarlayıp en iyi ödülü commit edebilirdi.
+    """
+    digest = hmac.new(settings.SECRET_KEY.encode("utf-8"), f"draw:{code}".encode("utf-8"), hashlib.sha256).digest()
+    return int.from_bytes(digest, "big") % n
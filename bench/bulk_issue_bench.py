@@ -0,0 +1,95 @@
+# bench/bulk_issue_bench.py
+# Toplu kod üretimi ölçümü: bulk_issue (çok satırlı INSERT ... ON CONFLICT DO NOTHING) ile
+# tek tek gen_code + INSERT (eski create_code yolu) karşılaştırılır.
+#
+#   DATABASE_URL=postgresql://... python -m bench.bulk_issue_bench --codes 100000 --naive 2000
+#   DATABASE_URL=sqlite:///bench.db python -m bench.bulk_issue_bench --codes 100000 --length 4
+#
+# --length küçük verilirse (ör. 4 → 36^4 ≈ 1.7M olası kod) çakışmalar ve yeniden üretim de ölçülür.
+# Rapor: süre, kod/s, DB round trip. Üretilen kodlar sonunda silinir (--keep ile bırakılır).
+import argparse
+import threading
+import time
+from typing import List
+
+from sqlalchemy import event
+
+from app.db.models import Code, PrizeTier
+from app.db.session import SessionLocal, engine
+from app.services import codes as codes_svc
+
+
+class _RoundTrips:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.n = 0
+
+    def __call__(self, *args) -> None:
+        with self._lock:
+            self.n += 1
+
+
+def _cleanup(created: List[str]) -> None:
+    with SessionLocal() as db:
+        for i in range(0, len(created), 5000):
+            db.query(Code).filter(Code.code.in_(created[i:i + 5000])).delete(synchronize_session=False)
+        db.commit()
+
+
+def _naive(n: int, tier: str, length: int) -> List[str]:
+    out = []
+    with SessionLocal() as db:
+        for _ in range(n):
+            c = codes_svc.gen_code(length)
+            db.add(Code(code=c, tier_key=tier, status="issued"))
+            db.commit()
+            out.append(c)
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--codes", type=int, default=100000)
+    ap.add_argument("--naive", type=int, default=0, help="karşılaştırma için tek tek üretilecek kod sayısı")
+    ap.add_argument("--length", type=int, default=8)
+    ap.add_argument("--predraw", action="store_true")
+    ap.add_argument("--keep", action="store_true")
+    args = ap.parse_args()
+
+    rt = _RoundTrips()
+    event.listen(engine, "before_cursor_execute", rt)
+
+    with SessionLocal() as db:
+        tiers = [t.key for t in db.query(PrizeTier).filter(PrizeTier.enabled.is_(True)).order_by(PrizeTier.sort)]
+    if not tiers:
+        raise SystemExit("Etkin seviye yok.")
+    ratios = {t: len(tiers) - i for i, t in enumerate(tiers)}
+
+    # kod uzunluğu yalnız bu çalıştırma için
+    gen = codes_svc.gen_codes
+    codes_svc.gen_codes = lambda count, n=8: gen(count, args.length)
+    created: List[str] = []
+    try:
+        rt.n = 0
+        t0 = time.perf_counter()
+        with SessionLocal() as db:
+            issued = codes_svc.bulk_issue(db, codes_svc.rows_by_ratio(args.codes, ratios), predraw=args.predraw)
+        dt = time.perf_counter() - t0
+        created += [r["code"] for r in issued]
+        split = {t: sum(1 for r in issued if r["tier_key"] == t) for t in tiers}
+        print(f"bulk    n={len(issued)} süre={dt:.2f}s verim={len(issued) / dt:.0f} kod/s db_rt={rt.n} dağılım={split}")
+
+        if args.naive:
+            rt.n = 0
+            t0 = time.perf_counter()
+            created += _naive(args.naive, tiers[0], args.length)
+            dt = time.perf_counter() - t0
+            print(f"tek-tek n={args.naive} süre={dt:.2f}s verim={args.naive / dt:.0f} kod/s db_rt={rt.n}")
+    finally:
+        codes_svc.gen_codes = gen
+        if not args.keep:
+            _cleanup(created)
+
+
+if __name__ == "__main__":
+    main()
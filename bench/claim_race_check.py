@@ -0,0 +1,85 @@
+# bench/claim_race_check.py
+# "Kod başına tam olarak bir kazanan" kontrolü: aynı koda N thread aynı anda istek atar.
+#   commit : tek verify-spin, aynı tokenla N paralel commit-spin
+#   redeem : N paralel /api/spin/redeem
+# Her senaryodan sonra kodun tam bir spins satırı olmalı ve kod 'used' olmalı; redeem'de ayrıca
+# yalnız bir istek ödül almalı. İhlalde çıkış kodu 1 (CI'da çalıştırılabilir).
+#
+#   DATABASE_URL=sqlite:///check.db python -m bench.claim_race_check --threads 32 --rounds 5
+#   DATABASE_URL=postgresql://... SPIN_TOKEN_MODE=signed python -m bench.claim_race_check
+import argparse
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+from fastapi.testclient import TestClient
+
+from bench.spin_bench import _cleanup, _seed, _tiers, _violations
+from app.main import app
+
+
+def _together(n: int, fn) -> list:
+    """fn'i n thread'de aynı anda başlatır (barrier), sonuçları döner."""
+    barrier = threading.Barrier(n)
+
+    def one(_):
+        barrier.wait()
+        return fn()
+
+    with ThreadPoolExecutor(max_workers=n) as ex:
+        return list(ex.map(one, range(n)))
+
+
+def _commit_round(client: TestClient, tiers: list, n: int) -> list:
+    code = _seed(1, tiers, f"CC{uuid4().hex[:6]}")[0]
+    r = client.post("/api/verify-spin", json={"username": "", "code": code})
+    if r.status_code != 200:
+        return [f"commit {code}: verify {r.status_code} {r.text}"]
+    body = {"code": code, "spinToken": r.json()["spinToken"]}
+    rs = _together(n, lambda: client.post("/api/commit-spin", json=body))
+    errors = []
+    if any(x.status_code != 200 for x in rs):
+        errors.append(f"commit {code}: HTTP {sorted({x.status_code for x in rs})}")
+    v = _violations([code])
+    if v["spins"] != 1 or v["used"] != 1:
+        errors.append(f"commit {code}: spins={v['spins']} used={v['used']}")
+    return errors
+
+
+def _redeem_round(client: TestClient, tiers: list, n: int) -> list:
+    code = _seed(1, tiers, f"CR{uuid4().hex[:6]}")[0]
+    rs = _together(n, lambda: client.post("/api/spin/redeem", json={"username": "", "code": code}))
+    winners = sum(1 for x in rs if x.status_code == 200 and "prize" in x.json())
+    v = _violations([code])
+    if winners != 1 or v["spins"] != 1 or v["used"] != 1:
+        return [f"redeem {code}: kazanan={winners} spins={v['spins']} used={v['used']}"]
+    return []
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--threads", type=int, default=16, help="aynı koda paralel istek sayısı")
+    ap.add_argument("--rounds", type=int, default=3, help="senaryo başına tekrar (her turda yeni kod)")
+    ap.add_argument("--keep", action="store_true", help="BENCH- kodlarını silme")
+    args = ap.parse_args()
+
+    errors: list = []
+    with TestClient(app) as client:
+        tiers = _tiers("")
+        try:
+            for _ in range(args.rounds):
+                errors += _commit_round(client, tiers, args.threads)
+                errors += _redeem_round(client, tiers, args.threads)
+        finally:
+            if not args.keep:
+                _cleanup()
+
+    for e in errors:
+        print(f"İHLAL {e}")
+    print(f"{'HATA' if errors else 'OK'}: {args.rounds} tur × (commit-spin, redeem), {args.threads} thread")
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
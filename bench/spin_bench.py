@@ -0,0 +1,250 @@
+# bench/spin_bench.py
+# Spin akışı yük testi: ASGI uygulamasına süreç içi istemciyle (httpx + ASGITransport) istek atar.
+# Senaryolar:
+#   two-step : /api/verify-spin → /api/commit-spin (RadiCark.tsx akışı)
+#   redeem   : /api/spin/redeem (tek adım)
+#   race     : aynı koda eşzamanlı N commit / N redeem → tam olarak bir kazanan olmalı
+#
+#   DATABASE_URL=postgresql://... python -m bench.spin_bench --codes 5000 --concurrency 64
+#   DATABASE_URL=sqlite:///bench.db python -m bench.spin_bench --codes 500 --concurrency 4
+#
+# Tablolar uygulamanın startup'ında oluşur; dağılımı olan seviye yoksa (boş veritabanı) geçici bir
+# BENCH seviyesi (tüm ödüller eşit ağırlık) eklenir ve sonunda silinir.
+# Rapor: p50/p95/p99 gecikme, verim (spin/s), spin başına DB round trip ve çift claim ihlalleri.
+# Geçici kodlar BENCH- önekiyle yazılır ve sonunda silinir (--keep ile bırakılır).
+import argparse
+import asyncio
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from uuid import uuid4
+
+# Hız sınırı ölçümü bozmasın; önceden ayarlanmışsa dokunma
+os.environ.setdefault("RATE_LIMIT_MODE", "off")
+
+import httpx
+from sqlalchemy import event, func
+
+from app.db.models import Code, Prize, PrizeDistribution, PrizeTier, Spin
+from app.db.session import SessionLocal, engine
+from app.main import app
+from app.services import prize_catalog, spin_audit
+
+BENCH_TIER = "bench"
+
+
+# ----------------------------- DB round trip sayacı -----------------------------
+class _RoundTrips:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.n = 0
+
+    def __call__(self, *args) -> None:
+        with self._lock:
+            self.n += 1
+
+
+ROUND_TRIPS = _RoundTrips()
+event.listen(engine, "before_cursor_execute", ROUND_TRIPS)
+
+if engine.dialect.name == "sqlite":
+    # models/servisler now() kullanıyor; sqlite'ta yok
+    @event.listens_for(engine, "connect")
+    def _sqlite_now(dbapi_conn, _rec) -> None:
+        dbapi_conn.create_function("now", 0, lambda: datetime.now(timezone.utc).isoformat(" "))
+
+
+# ----------------------------- veri -----------------------------
+def _distributed(db) -> list:
+    return sorted(k for (k,) in db.query(PrizeDistribution.tier_key).filter(
+        PrizeDistribution.enabled == True,  # noqa: E712
+        PrizeDistribution.weight_bp > 0,
+    ).distinct())
+
+
+def _ensure_tier() -> None:
+    """Dağılımı olan seviye yoksa geçici BENCH seviyesi (etkin ödüllere eşit ağırlık)."""
+    with SessionLocal() as db:
+        if _distributed(db):
+            return
+        prizes = [p.id for p in db.query(Prize).filter(Prize.enabled == True)]  # noqa: E712
+        if not prizes:
+            raise SystemExit("etkin ödül yok")
+        if not db.get(PrizeTier, BENCH_TIER):
+            db.add(PrizeTier(key=BENCH_TIER, label="BENCH", sort=999, enabled=True))
+            db.flush()
+        db.add_all([
+            PrizeDistribution(tier_key=BENCH_TIER, prize_id=pid, weight_bp=10000 // len(prizes), enabled=True)
+            for pid in prizes
+        ])
+        prize_catalog.commit(db)
+
+
+def _tiers(wanted: str) -> list:
+    _ensure_tier()
+    with SessionLocal() as db:
+        have = _distributed(db)
+    if wanted:
+        have = [t for t in wanted.split(",") if t in have]
+    if not have:
+        raise SystemExit("dağılımı olan seviye yok (prize_distributions boş?)")
+    return have
+
+
+def _seed(n: int, tiers: list, tag: str) -> list:
+    codes = [f"BENCH-{tag}-{i:07d}" for i in range(n)]
+    with SessionLocal() as db:
+        db.bulk_insert_mappings(Code, [
+            {"code": c, "tier_key": tiers[i % len(tiers)], "status": "issued"} for i, c in enumerate(codes)
+        ])
+        db.commit()
+    return codes
+
+
+def _cleanup() -> None:
+    spin_audit.flush()
+    with SessionLocal() as db:
+        db.query(Spin).filter(Spin.code.like("BENCH-%")).delete(synchronize_session=False)
+        db.query(Code).filter(Code.code.like("BENCH-%")).delete(synchronize_session=False)
+        if db.get(PrizeTier, BENCH_TIER):
+            db.query(PrizeDistribution).filter(PrizeDistribution.tier_key == BENCH_TIER).delete(synchronize_session=False)
+            db.query(PrizeTier).filter(PrizeTier.key == BENCH_TIER).delete(synchronize_session=False)
+            prize_catalog.commit(db)
+        else:
+            db.commit()
+
+
+def _violations(codes: list) -> dict:
+    """Çift claim: aynı koda birden fazla spins satırı / used olmayan ama spin'i olan kod."""
+    spin_audit.flush()
+    with SessionLocal() as db:
+        prefix = codes[0].rsplit("-", 1)[0] + "-%"
+        dup = db.query(Spin.code).filter(Spin.code.like(prefix)).group_by(Spin.code).having(func.count() > 1).count()
+        spins = db.query(func.count(Spin.id)).filter(Spin.code.like(prefix)).scalar() or 0
+        used = db.query(func.count(Code.code)).filter(Code.code.like(prefix), Code.status == "used").scalar() or 0
+    return {"dup": dup, "spins": spins, "used": used}
+
+
+# ----------------------------- istek akışları -----------------------------
+async def _two_step(client: httpx.AsyncClient, code: str) -> bool:
+    r = await client.post("/api/verify-spin", json={"username": "", "code": code})
+    if r.status_code != 200:
+        return False
+    r = await client.post("/api/commit-spin", json={"code": code, "spinToken": r.json()["spinToken"]})
+    return r.status_code == 200 and r.json().get("ok") is True
+
+
+async def _redeem(client: httpx.AsyncClient, code: str) -> bool:
+    r = await client.post("/api/spin/redeem", json={"username": "", "code": code})
+    return r.status_code == 200 and "prize" in r.json()
+
+
+async def _drive(client: httpx.AsyncClient, flow, codes: list, concurrency: int) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    lat: list = []
+
+    async def one(code: str) -> bool:
+        async with sem:
+            t = time.perf_counter()
+            try:
+                ok = await flow(client, code)
+            except Exception:
+                ok = False
+            lat.append(time.perf_counter() - t)
+            return ok
+
+    rt0 = ROUND_TRIPS.n
+    t0 = time.perf_counter()
+    oks = await asyncio.gather(*(one(c) for c in codes))
+    dt = time.perf_counter() - t0
+    return {"ok": sum(oks), "n": len(codes), "secs": dt, "lat": sorted(lat), "rt": ROUND_TRIPS.n - rt0}
+
+
+def _pct(sorted_vals: list, p: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    i = min(len(sorted_vals) - 1, max(0, round(p / 100 * len(sorted_vals)) - 1))
+    return sorted_vals[i]
+
+
+def _report(name: str, res: dict, viol: dict) -> None:
+    lat = res["lat"]
+    ok = res["ok"]
+    print(
+        f"{name:9s} ok={ok}/{res['n']} süre={res['secs']:.2f}s verim={ok / res['secs']:.0f} spin/s "
+        f"p50={_pct(lat, 50) * 1000:.1f}ms p95={_pct(lat, 95) * 1000:.1f}ms p99={_pct(lat, 99) * 1000:.1f}ms "
+        f"db_rt/spin={res['rt'] / max(ok, 1):.1f} "
+        f"çift_claim={viol['dup']} spins={viol['spins']} used={viol['used']}"
+    )
+
+
+# ----------------------------- yarış -----------------------------
+async def _race(client: httpx.AsyncClient, tiers: list, n: int) -> None:
+    # commit: tek verify, aynı tokenla N paralel commit → tek claim, tek spins satırı (diğerleri idempotent ok)
+    code = _seed(1, tiers, f"RC{uuid4().hex[:6]}")[0]
+    r = await client.post("/api/verify-spin", json={"username": "", "code": code})
+    token = r.json().get("spinToken", "")
+    rs = await asyncio.gather(*(
+        client.post("/api/commit-spin", json={"code": code, "spinToken": token}) for _ in range(n)
+    ))
+    statuses = Counter(x.status_code for x in rs)
+    viol = _violations([code])
+    bad = viol["spins"] != 1 or viol["used"] != 1
+    print(f"race-commit  n={n} http={dict(statuses)} spins={viol['spins']} used={viol['used']} {'İHLAL' if bad else 'OK'}")
+
+    # redeem: aynı koda N paralel redeem → tam olarak bir "prize" cevabı
+    code = _seed(1, tiers, f"RR{uuid4().hex[:6]}")[0]
+    rs = await asyncio.gather(*(
+        client.post("/api/spin/redeem", json={"username": "", "code": code}) for _ in range(n)
+    ))
+    winners = sum(1 for x in rs if x.status_code == 200 and "prize" in x.json())
+    viol = _violations([code])
+    bad = winners != 1 or viol["spins"] != 1
+    print(f"race-redeem  n={n} kazanan={winners} spins={viol['spins']} used={viol['used']} {'İHLAL' if bad else 'OK'}")
+
+
+# ----------------------------- main -----------------------------
+async def _main(args) -> None:
+    scenarios = ["two-step", "redeem", "race"] if args.scenario == "all" else [args.scenario]
+    flows = {"two-step": _two_step, "redeem": _redeem}
+
+    # ASGITransport lifespan çalıştırmaz; startup/shutdown (tablolar, migrasyon, audit kuyruğu) elle.
+    # Seviye okuması da tablolar oluştuktan sonra (boş veritabanında da çalışsın).
+    async with app.router.lifespan_context(app):
+        tiers = _tiers(args.tiers)
+        print(f"db={engine.dialect.name} seviyeler={','.join(tiers)} kod={args.codes} eşzamanlılık={args.concurrency}")
+        try:
+            await _run(args, scenarios, flows, tiers)
+        finally:
+            if not args.keep:
+                _cleanup()
+
+
+async def _run(args, scenarios: list, flows: dict, tiers: list) -> None:
+    transport = httpx.ASGITransport(app=app, client=("127.0.0.1", 40000))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name in scenarios:
+            if name == "race":
+                await _race(client, tiers, args.race)
+                continue
+            codes = _seed(args.codes, tiers, f"{name[:2].upper()}{uuid4().hex[:6]}")
+            res = await _drive(client, flows[name], codes, args.concurrency)
+            _report(name, res, _violations(codes))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--codes", type=int, default=2000, help="senaryo başına kod sayısı")
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--tiers", default="", help="virgülle ayrılmış; boşsa dağılımı olan tüm seviyeler")
+    ap.add_argument("--scenario", choices=("all", "two-step", "redeem", "race"), default="all")
+    ap.add_argument("--race", type=int, default=50, help="yarış senaryosunda aynı koda paralel istek sayısı")
+    ap.add_argument("--keep", action="store_true", help="BENCH- kodlarını silme")
+    args = ap.parse_args()
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
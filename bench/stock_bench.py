@@ -0,0 +1,84 @@
+# bench/stock_bench.py
+# Stok sınırının commit (redeem) verimine etkisi: önce stoksuz, sonra tüm ödüller stoklu
+# (parçalı sayaç) olarak aynı sayıda kod eşzamanlı kullanılır.
+#
+#   DATABASE_URL=postgresql://... python -m bench.stock_bench --codes 5000 --workers 32 --tier gold
+#
+# Geçici kodlar BENCH- önekiyle yazılır ve sonunda silinir; mevcut stok ayarları geri yüklenir.
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.db.models import Code, Prize, PrizeStockShard, Spin
+from app.db.session import SessionLocal
+from app.services import prize_catalog, prize_stock
+from app.services.spin import SpinError, redeem
+
+
+def _seed(tier: str, n: int, tag: str) -> list:
+    codes = [f"BENCH-{tag}-{i:07d}" for i in range(n)]
+    with SessionLocal() as db:
+        db.bulk_insert_mappings(Code, [{"code": c, "tier_key": tier, "status": "issued"} for c in codes])
+        db.commit()
+    return codes
+
+
+def _cleanup() -> None:
+    with SessionLocal() as db:
+        db.query(Spin).filter(Spin.code.like("BENCH-%")).delete(synchronize_session=False)
+        db.query(Code).filter(Code.code.like("BENCH-%")).delete(synchronize_session=False)
+        db.commit()
+
+
+def _one(code: str) -> bool:
+    with SessionLocal() as db:
+        try:
+            redeem(db, [code], "", "127.0.0.1", "stock-bench")
+            return True
+        except SpinError:
+            db.rollback()
+            return False
+
+
+def _run(codes: list, workers: int) -> tuple:
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        ok = sum(ex.map(_one, codes))
+    return ok, time.perf_counter() - t0
+
+
+def _set_all_stock(total) -> None:
+    with SessionLocal() as db:
+        for p in db.query(Prize).all():
+            prize_stock.set_stock(db, p.id, total)
+        prize_catalog.commit(db)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--codes", type=int, default=2000)
+    ap.add_argument("--workers", type=int, default=16)
+    ap.add_argument("--tier", default="gold")
+    args = ap.parse_args()
+
+    with SessionLocal() as db:
+        saved = [(s.prize_id, s.shard, s.remaining) for s in db.query(PrizeStockShard).all()]
+
+    try:
+        for label, stock in (("stoksuz", None), ("stoklu", 10 * args.codes)):
+            _set_all_stock(stock)
+            codes = _seed(args.tier, args.codes, label)
+            ok, dt = _run(codes, args.workers)
+            print(f"{label:8s} ok={ok}/{len(codes)} süre={dt:.2f}s verim={ok / dt:.0f} spin/s")
+    finally:
+        _cleanup()
+        with SessionLocal() as db:
+            db.query(PrizeStockShard).delete(synchronize_session=False)
+            db.bulk_insert_mappings(PrizeStockShard, [
+                {"prize_id": p, "shard": s, "remaining": r} for p, s, r in saved
+            ])
+            prize_catalog.commit(db)
+
+
+if __name__ == "__main__":
+    main()